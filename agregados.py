@@ -0,0 +1,160 @@
+"""
+Agregados do dashboard pré-calculados por versão dos dados.
+
+Cada tabela guarda somas e contagens (não médias), de modo que linhas novas ou
+reavaliadas podem ser incorporadas somando o agregado parcial das linhas alteradas,
+sem reprocessar o catálogo inteiro. As médias, filtros e ordenações que o dashboard
+exibe são derivados dessas tabelas na hora.
+"""
+
+import polars as pl
+
+from cache_disco import carregar_frames, salvar_frames
+
+# tabela -> colunas-chave do group_by (None = tabela de uma linha, os KPIs)
+TABELAS = {
+    'agregado_kpis': None,
+    'agregado_generos': ['Genres'],
+    'agregado_combinacoes': ['Genres_combination'],
+    'agregado_estudios': ['Studios'],
+    'agregado_notas': ['ScoreArredondado'],
+}
+
+
+def _planos_parciais(df, sinal=1):
+    """Planos lazy das somas/contagens de `df` (sinal=-1 para linhas removidas), sobre um único scan."""
+    base = df.lazy().select(['Genres', 'Genres_combination', 'Studios', 'Score', 'Members'])
+    contagem = pl.len().cast(pl.Int64) * sinal
+    return {
+        'agregado_kpis': base.select(
+            contagem.alias('Qtd'),
+            (pl.col('Members').sum() * sinal).alias('TotalMembros'),
+            (pl.col('Score').sum() * sinal).alias('SomaScore'),
+        ),
+        'agregado_generos': base.explode('Genres').group_by('Genres').agg(
+            contagem.alias('Frequencia'), (pl.col('Score').sum() * sinal).alias('SomaScore'),
+        ),
+        'agregado_combinacoes': base.filter(pl.col('Genres').list.len() > 1).group_by('Genres_combination').agg(
+            contagem.alias('Frequencia'),
+        ),
+        'agregado_estudios': base.filter(pl.col('Studios').is_not_null()).group_by('Studios').agg(
+            contagem.alias('Qtd'), (pl.col('Score').sum() * sinal).alias('SomaScore'),
+        ),
+        'agregado_notas': base.group_by(pl.col('Score').round(0).alias('ScoreArredondado')).agg(
+            contagem.alias('Qtd'), (pl.col('Members').sum() * sinal).alias('TotalMembros'),
+        ),
+    }
+
+
+def _coletar(planos):
+    # collect_all executa os planos juntos: o scan/seleção em comum é calculado uma vez só
+    return dict(zip(planos, pl.collect_all(list(planos.values()))))
+
+
+class AgregadosDashboard:
+    """tabelas: dict nome -> DataFrame com as somas/contagens de TABELAS."""
+
+    def __init__(self, tabelas):
+        self.tabelas = tabelas
+
+    @classmethod
+    def calcular(cls, df_clean):
+        return cls(_coletar(_planos_parciais(df_clean)))
+
+    def atualizar(self, adicionadas=None, removidas=None):
+        """
+        Novos agregados incorporando as linhas `adicionadas` e retirando as `removidas`
+        (mesmo esquema do df_clean). Uma reavaliação é a linha antiga em `removidas` e a nova em `adicionadas`.
+        """
+        partes = {nome: [df] for nome, df in self.tabelas.items()}
+        for delta, sinal in ((adicionadas, 1), (removidas, -1)):
+            if delta is not None and not delta.is_empty():
+                for nome, df in _coletar(_planos_parciais(delta, sinal)).items():
+                    partes[nome].append(df.cast(self.tabelas[nome].schema))
+        tabelas = {}
+        for nome, dfs in partes.items():
+            chaves = TABELAS[nome]
+            juntas = pl.concat(dfs)
+            if chaves is None:
+                tabelas[nome] = juntas.sum()
+            else:
+                contagem = 'Frequencia' if 'Frequencia' in juntas.columns else 'Qtd'
+                tabelas[nome] = (
+                    juntas.group_by(chaves).agg(pl.all().sum()).filter(pl.col(contagem) > 0)
+                )
+        return AgregadosDashboard(tabelas)
+
+    # --------- Visões exibidas no dashboard
+    def kpis(self):
+        linha = self.tabelas['agregado_kpis'].row(0, named=True)
+        return {
+            'total_animes': linha['Qtd'],
+            'total_membros': linha['TotalMembros'],
+            'media_nota': linha['SomaScore'] / linha['Qtd'] if linha['Qtd'] else 0.0,
+            'total_generos': self.tabelas['agregado_generos'].height,
+        }
+
+    def genero_freq(self):
+        return self.tabelas['agregado_generos'].select('Genres', 'Frequencia').sort('Frequencia', descending=True)
+
+    def genero_score(self):
+        return self.tabelas['agregado_generos'].select(
+            'Genres', (pl.col('SomaScore') / pl.col('Frequencia')).alias('Nota Média')
+        ).sort('Nota Média', descending=True)
+
+    def combo_freq(self):
+        return self.tabelas['agregado_combinacoes'].sort('Frequencia', descending=True)
+
+    def studio_avg(self):
+        return self.tabelas['agregado_estudios'].select(
+            'Studios', (pl.col('SomaScore') / pl.col('Qtd')).alias('Nota Média'), 'Qtd'
+        ).filter(pl.col('Qtd') >= 5).sort('Nota Média', descending=True)
+
+    def studio_avg_simples(self):
+        return self.studio_avg().filter(~pl.col('Studios').str.contains(','))
+
+    def score_dist(self):
+        return self.tabelas['agregado_notas'].select('ScoreArredondado', 'TotalMembros').sort('ScoreArredondado')
+
+
+# Colunas que entram nos agregados: uma linha cujo valor em alguma delas mudou é uma reavaliação
+COLUNAS_AGREGADAS = ['MAL_ID', 'Genres_combination', 'Studios', 'Score', 'Members']
+
+
+def diferenca_linhas(df_anterior, df_atual):
+    """
+    (adicionadas, removidas): linhas de `df_atual` que não estão em `df_anterior` e vice-versa,
+    comparando COLUNAS_AGREGADAS. Uma reavaliação aparece nas duas (a linha nova e a antiga).
+    """
+    anterior, atual = df_anterior.select(COLUNAS_AGREGADAS), df_atual.select(COLUNAS_AGREGADAS)
+    adicionadas = atual.join(anterior, on=COLUNAS_AGREGADAS, how='anti', nulls_equal=True)
+    removidas = anterior.join(atual, on=COLUNAS_AGREGADAS, how='anti', nulls_equal=True)
+    # as linhas completas (com Genres) só das que mudaram
+    return (
+        df_atual.join(adicionadas.select('MAL_ID'), on='MAL_ID', how='semi'),
+        df_anterior.join(removidas.select('MAL_ID'), on='MAL_ID', how='semi'),
+    )
+
+
+def carregar_agregados(versao):
+    """Agregados da versão `versao` já gravados no cache em disco, ou None."""
+    tabelas = carregar_frames(versao, list(TABELAS))
+    return AgregadosDashboard(tabelas) if tabelas is not None else None
+
+
+def obter_agregados(versao, df_clean, anteriores=None, df_anterior=None):
+    """
+    Agregados da versão `versao` dos dados: lidos do cache em disco ou calculados e gravados.
+    anteriores, df_anterior: agregados e df_clean da versão anterior; com eles só as linhas
+    que mudaram são processadas (AgregadosDashboard.atualizar) em vez do catálogo inteiro
+    """
+    agregados = carregar_agregados(versao)
+    if agregados is not None:
+        return agregados
+    if anteriores is not None and df_anterior is not None:
+        adicionadas, removidas = diferenca_linhas(df_anterior, df_clean)
+        agregados = anteriores.atualizar(adicionadas, removidas)
+    else:
+        agregados = AgregadosDashboard.calcular(df_clean)
+    salvar_frames(versao, agregados.tabelas)
+    return agregados
@@ -27,10 +27,40 @@ Download dos arquivos via API do kaggle e criação do dataframe inicial
 import polars as pl
 import numpy as np
 from sklearn.model_selection import KFold
-from sklearn.neighbors import KNeighborsRegressor
 from sklearn.metrics import mean_squared_error
+from joblib import Parallel, delayed
 from numpy import mean
+import logging
 import os
+import threading
+from functools import cached_property
+
+from agregados import carregar_agregados, obter_agregados
+from artefatos_modelo import listar_modelos, obter_modelo, publicar_modelo
+from cache_disco import chave_arquivo, carregar_frames, salvar_frames
+from cache_resultados import CacheLRU
+from filtragem_colaborativa import obter_vizinhos_itens
+from indices import GenerosEmpacotados, IndiceGeneros, IndiceInvertido, IndicePorId, chave_generos
+from preparo_dados import preparo
+from similaridade import K_SIMILARES, obter_similares, obter_similaridade
+from snapshots import GerenciadorSnapshots
+from tabela_predicoes import obter_tabela
+from visoes import VisoesDerivadas
+from vizinhos import criar_regressor, entrada_regressor
+
+logger = logging.getLogger(__name__)
+
+# Limites dos caches de resultados (predições e top-N) de cada versão dos dados
+TAMANHO_CACHE_RESULTADOS = 2048
+TTL_CACHE_RESULTADOS = 6 * 60 * 60
+# Preditor compilado: ANIME_PREDITOR_COMPILADO=k pré-calcula as notas das combinações do catálogo
+# e de todas as combinações de até k gêneros (0 = só as do catálogo). Sem a variável, fica desligado.
+PREDITOR_COMPILADO = os.environ.get("ANIME_PREDITOR_COMPILADO")
+# Backend de vizinhos do preditor: sklearn (padrão), hamming, arvore ou lsh (ver vizinhos.py)
+BACKEND_VIZINHOS = os.environ.get("ANIME_BACKEND_VIZINHOS", "sklearn")
+N_NEIGHBORS = 5
+
+CAMINHO_ANIME_CSV = os.path.join("databases", "anime.csv")
 
 """# 4. Modelo SVM para predição de notas
 
@@ -38,34 +68,36 @@ import os
 """
 
 
-def carregar_dados_anime():
+def baixar_dataset_se_necessario():
     # download do arquivo anime.csv via API do kaggle caso ele não esteja presente
-    if not os.path.exists("databases/anime.csv"):
-        os.makedirs("databases", exist_ok=True)
-        import kaggle
-        kaggle.api.dataset_download_files('hernan4444/anime-recommendation-database-2020', path='databases', unzip=True)
-    # leitura do arquivo anime.csv e filtragem das colunas necessárias
-    df = pl.read_csv("databases/anime.csv", null_values="Unknown")
-    df = df.filter(pl.col('Score').is_not_null() & pl.col('Genres').is_not_null())
-    df = df.with_columns([
-        pl.col('Genres').str.split(', ').alias('Genres')
-    ])
-    df = df.with_columns([
-        pl.col('Genres').list.eval(
-            pl.when(pl.element() == pl.lit("Hentai")).then(pl.lit("Adult Content")).otherwise(pl.element())
-        ).alias("Genres")
-    ])
-    df = df.with_columns(
-        pl.col("Genres").map_elements(lambda genres: ", ".join(sorted(genres)), return_dtype=pl.String).alias("Genres_combination")
+    # (um único download por host, mesmo com vários processos; ver preparo_dados.py)
+    preparo.garantir((os.path.basename(CAMINHO_ANIME_CSV),))
+
+
+# Colunas de anime.csv usadas pelo app; as demais nem são lidas do CSV (projection pushdown)
+COLUNAS_ANIME = ['MAL_ID', 'Name', 'Score', 'Genres', 'Studios', 'Type', 'Source', 'Members']
+
+
+def carregar_dados_anime(caminho=CAMINHO_ANIME_CSV):
+    if caminho == CAMINHO_ANIME_CSV:
+        baixar_dataset_se_necessario()
+    # leitura preguiçosa do anime.csv: a limpeza inteira é um único plano de expressões nativas do polars
+    df = (
+        pl.scan_csv(caminho, null_values="Unknown")
+        .select(COLUNAS_ANIME)
+        .filter(pl.col('Score').is_not_null() & pl.col('Genres').is_not_null())
+        .with_columns(
+            pl.col('Genres').str.split(', ').list.eval(
+                pl.when(pl.element() == pl.lit("Hentai")).then(pl.lit("Adult Content")).otherwise(pl.element())
+            ).alias('Genres')
+        )
+        .with_columns(
+            pl.col('Genres').list.sort().list.join(', ').alias('Genres_combination')
+        )
     )
-    return df
-
+    # um único chunk por coluna: gathers de poucas linhas (recomendações) ficam baratos
+    return df.collect().rechunk()
 
-df_clean = carregar_dados_anime()
-
-df_para_ml = df_clean.select(
-    ['MAL_ID', 'Name', 'Genres', 'Score']
-)
 
 """### 4.2. One-Hot Encoding nos generos das listas de cada linha
 
@@ -74,22 +106,13 @@ Uso de Machine Learning utilizando a database a fim de validar as transformaçõ
 
 
 def one_hot_encode(df, column_name):
-    # Get all unique genres
-    all_genres = df[column_name].explode().unique().sort()
-
-    expressions = []
-    for genre in all_genres:
-        expressions.append(
-            pl.col(column_name).list.contains(genre).alias(f"{column_name}_{genre}")
-        )
-
-    df = df.with_columns(expressions)
-    return df.drop(column_name)
-
+    # Gêneros empacotados numa única passada pela coluna de listas (em vez de um list.contains por gênero);
+    # cada coluna booleana sai dos bits
+    generos = GenerosEmpacotados.de_listas(df[column_name], prefixo=f"{column_name}_")
+    return df.drop(column_name).with_columns(
+        pl.Series(coluna, generos.coluna(j)) for j, coluna in enumerate(generos.colunas)
+    )
 
-df_para_ml = one_hot_encode(df_para_ml, 'Genres')
-df_para_encontrar = df_para_ml.drop('Name')
-df_para_ml = df_para_ml.drop('Name', 'MAL_ID')
 
 
 """### 4.3. Função de treinamento e teste
@@ -98,101 +121,524 @@ Implementação de modelo de KNN utilizando 10-10-fold para predição da nota b
 """
 
 
-def train_and_evaluate_knn(df, n_neighbors=5):
-        X = df.drop('Score').to_numpy()
-        y = df['Score'].to_numpy()
-        n_folds = 10
-        kf = KFold(n_splits=n_folds, shuffle=True, random_state=42)
-        mse_scores_temp = []
-        last_model = None
-
-        for train_index, test_index in kf.split(X):
-            X_train, X_test = X[train_index], X[test_index]
-            y_train, y_test = y[train_index], y[test_index]
-            model = KNeighborsRegressor(n_neighbors=n_neighbors)
-            model.fit(X_train, y_train)
-            y_pred = model.predict(X_test)
-            mse = mean_squared_error(y_test, y_pred)
-            mse_scores_temp.append(mse)
-            last_model = model  # Salva o último modelo treinado
+def _avaliar_fold(X, y, train_index, test_index, n_neighbors, devolver_modelo, backend):
+    # Executado nos workers do joblib; X (bits) e y chegam como memmap compartilhado, não como cópia
+    X_train, X_test = X[train_index], X[test_index]
+    y_train, y_test = y[train_index], y[test_index]
+    model = criar_regressor(backend, n_neighbors)
+    model.fit(entrada_regressor(backend, X_train), y_train)
+    y_pred = model.predict(entrada_regressor(backend, X_test, consultas=True))
+    mse = mean_squared_error(y_test, y_pred)
+    return mse, model if devolver_modelo else None
+
+
+def _features(df, generos):
+    # Gêneros empacotados (GenerosEmpacotados) e notas de df; generos já montados são reaproveitados
+    if generos is None:
+        generos = GenerosEmpacotados.de_colunas(df.drop('Score'))
+    return generos, df['Score'].to_numpy()
+
+
+def _executar_folds(X, y, grade_n_neighbors, n_jobs, backend):
+    """Roda o 10-fold para cada n_neighbors da grade numa única execução paralela."""
+    kf = KFold(n_splits=10, shuffle=True, random_state=42)
+    splits = list(kf.split(np.empty((len(X), 0))))
+    tarefas = [
+        delayed(_avaliar_fold)(X, y, train_index, test_index, k, i == len(splits) - 1, backend)
+        for k in grade_n_neighbors
+        for i, (train_index, test_index) in enumerate(splits)
+    ]
+    # max_nbytes=0: todo array vira memmap no disco temporário, compartilhado por todos os workers
+    resultados = Parallel(n_jobs=n_jobs, max_nbytes=0)(tarefas)
+    return {
+        k: resultados[j * len(splits):(j + 1) * len(splits)]
+        for j, k in enumerate(grade_n_neighbors)
+    }
+
+
+def train_and_evaluate_knn(df, n_neighbors=N_NEIGHBORS, n_jobs=1, backend=None, generos=None):
+        """
+        n_jobs: número de processos para os folds (1 = sequencial, -1 = todos os núcleos)
+        backend: backend de vizinhos (padrão: BACKEND_VIZINHOS)
+        generos: GenerosEmpacotados das linhas de df (padrão: empacotados a partir das colunas de df)
+        """
+        X, y = _features(df, generos)
+        resultados = _executar_folds(X, y, [n_neighbors], n_jobs, backend or BACKEND_VIZINHOS)[n_neighbors]
+        mse_scores_temp = [mse for mse, _ in resultados]
+        last_model = resultados[-1][1]  # Salva o último modelo treinado
 
         average_mse_temp = mean(mse_scores_temp)
         return average_mse_temp, mse_scores_temp, last_model
 
 
-_, _, modelo = train_and_evaluate_knn(df_para_ml)
+def varrer_n_neighbors(df, grade=(1, 3, 5, 7, 9, 15, 25), n_jobs=-1, backend=None, generos=None):
+    """
+    Avalia o 10-fold para cada n_neighbors de `grade` numa só execução paralela.
+    Retorna: dict n_neighbors -> (mse médio, mse por fold)
+    """
+    X, y = _features(df, generos)
+    resultados = _executar_folds(X, y, list(grade), n_jobs, backend or BACKEND_VIZINHOS)
+    return {
+        k: (mean([mse for mse, _ in folds]), [mse for mse, _ in folds])
+        for k, folds in resultados.items()
+    }
+
+
+def treinar_modelo_knn(df, n_neighbors=N_NEIGHBORS, backend=None, generos=None):
+    """
+    Treina apenas o modelo que train_and_evaluate_knn devolve como last_model
+    (mesmo split do último fold), sem avaliar os outros nove folds.
+    """
+    X, y = _features(df, generos)
+    kf = KFold(n_splits=10, shuffle=True, random_state=42)
+    *_, (train_index, _) = kf.split(np.empty((len(X), 0)))
+    backend = backend or BACKEND_VIZINHOS
+    model = criar_regressor(backend, n_neighbors)
+    model.fit(entrada_regressor(backend, X[train_index]), y[train_index])
+    return model
+
+
+"""### Registro de dados e modelo do processo
+
+Os dados e o modelo são construídos uma única vez, no primeiro uso, e compartilhados
+por preditor, recomendacoes e dashboard (importar este módulo não carrega nada).
+"""
+
+
+class RecursosAnime:
+    """
+    Dados derivados de anime.csv compartilhados pelo processo.
+    `versao` identifica o conteúdo do anime.csv de origem (ver cache_disco.chave_arquivo).
+    O modelo só é treinado no primeiro acesso a `modelo` (o dashboard não precisa dele).
+    Os caches de resultados pertencem a esta versão: recarregar os recursos os descarta.
+    """
+
+    def __init__(self, df_clean, df_para_ml, df_para_encontrar, versao=None):
+        self.versao = versao
+        self.df_clean = df_clean
+        self.df_para_ml = df_para_ml
+        self.df_para_encontrar = df_para_encontrar
+        self._modelo = None
+        # diretório do artefato publicado de onde veio o modelo (ver artefatos_modelo.py)
+        self.artefato_modelo = None
+        self._modelo_lock = threading.Lock()
+        self.cache_predicoes = CacheLRU(TAMANHO_CACHE_RESULTADOS, TTL_CACHE_RESULTADOS)
+        self.cache_consultas = CacheLRU(TAMANHO_CACHE_RESULTADOS, TTL_CACHE_RESULTADOS)
+
+    @property
+    def modelo(self):
+        if self._modelo is None:
+            with self._modelo_lock:
+                if self._modelo is None:
+                    # artefato publicado em disco (memory map) ou treino na hora, publicado para os próximos
+                    modelo, self.artefato_modelo = obter_modelo(
+                        self.versao, self.colunas_features, BACKEND_VIZINHOS, N_NEIGHBORS,
+                        lambda: treinar_modelo_knn(self.df_para_ml, generos=self.generos_empacotados),
+                    )
+                    self._modelo = modelo
+        return self._modelo
+
+    @property
+    def colunas_features(self):
+        """Colunas de entrada do modelo, na ordem do treino."""
+        return self.df_para_ml.drop('Score').columns
+
+    @cached_property
+    def generos_empacotados(self):
+        """Matriz de gêneros com um bit por (anime, gênero), nas linhas e colunas de df_para_ml (ver indices.py)."""
+        return GenerosEmpacotados.de_listas(self.df_clean['Genres'], self.colunas_features)
+
+    @cached_property
+    def indice_generos(self):
+        return IndiceGeneros(self.df_para_encontrar, self.generos_empacotados)
+
+    @cached_property
+    def indice_invertido(self):
+        return IndiceInvertido(self.indice_generos)
+
+    @cached_property
+    def indice_ids(self):
+        """MAL_ID -> linha do df_clean (get_anime_info)."""
+        return IndicePorId(self.df_clean['MAL_ID'].to_numpy())
+
+    @cached_property
+    def agregados(self):
+        """Agregados do dashboard desta versão (ver agregados.py)."""
+        return obter_agregados(self.versao, self.df_clean)
+
+    @cached_property
+    def visoes(self):
+        """Lista de gêneros, índice gênero -> coluna e nomes dos animes desta versão (ver visoes.py)."""
+        return VisoesDerivadas(self.df_clean, self.df_para_ml.drop('Score').columns)
+
+    @cached_property
+    def vizinhos_itens(self):
+        """Tabela de vizinhos item–item das avaliações do Kaggle (ver filtragem_colaborativa.py)."""
+        return obter_vizinhos_itens()
+
+    @cached_property
+    def similaridade_conteudo(self):
+        """Matriz de conteúdo (gêneros, estúdios, tipo, fonte, sinopse) desta versão (ver similaridade.py)."""
+        return obter_similaridade(self.versao, self.df_clean, self.generos_empacotados)
+
+    @cached_property
+    def similares_conteudo(self):
+        """Tabela pré-calculada dos K_SIMILARES animes mais parecidos com cada um (conteúdo)."""
+        return obter_similares(self.versao, self.similaridade_conteudo)
+
+    @cached_property
+    def tabela_predicoes(self):
+        """Tabela do preditor compilado (None quando PREDITOR_COMPILADO está desligado)."""
+        if PREDITOR_COMPILADO is None:
+            return None
+        return compilar_preditor(self, int(PREDITOR_COMPILADO))
+
+
+def construir_recursos():
+    """
+    Lê df_clean e a matriz one-hot do cache em disco (Arrow IPC com memory map) quando
+    ele corresponde ao anime.csv atual; caso contrário processa o CSV e grava o cache.
+    """
+    baixar_dataset_se_necessario()
+    versao = chave_arquivo(CAMINHO_ANIME_CSV)
+    frames = carregar_frames(versao, ['df_clean', 'df_para_encontrar'])
+    if frames is None:
+        df_clean = carregar_dados_anime()
+        df_para_encontrar = one_hot_encode(df_clean.select(['MAL_ID', 'Genres', 'Score']), 'Genres')
+        frames = {'df_clean': df_clean, 'df_para_encontrar': df_para_encontrar}
+        salvar_frames(versao, frames)
+    df_para_encontrar = frames['df_para_encontrar']
+    df_para_ml = df_para_encontrar.drop('MAL_ID')
+    return RecursosAnime(frames['df_clean'], df_para_ml, df_para_encontrar, versao=versao)
+
+
+# Artefatos montados no snapshot novo antes da troca, para a primeira requisição não pagar por eles
+# (além destes, tudo o que o snapshot anterior já tinha montado)
+PROPRIEDADES_AQUECIDAS = ('generos_empacotados', 'indice_generos', 'indice_invertido', 'indice_ids',
+                          'agregados', 'visoes', 'modelo', 'tabela_predicoes')
+
+
+def _propriedades_montadas(objeto):
+    # cached_properties já calculadas ficam no __dict__ da instância
+    return {nome for nome in vars(objeto) if isinstance(getattr(type(objeto), nome, None), cached_property)}
+
+
+def aquecer_recursos(novo, atual=None):
+    """Materializa em `novo` as PROPRIEDADES_AQUECIDAS e o que `atual` (snapshot anterior) já tinha montado."""
+    nomes = set(PROPRIEDADES_AQUECIDAS)
+    if atual is not None:
+        nomes |= _propriedades_montadas(atual)
+        # agregados do dashboard: só as linhas que mudaram desde o snapshot anterior
+        anteriores = vars(atual).get('agregados')
+        if anteriores is None:
+            anteriores = carregar_agregados(atual.versao)
+        if anteriores is not None and 'agregados' not in vars(novo):
+            novo.agregados = obter_agregados(novo.versao, novo.df_clean, anteriores, atual.df_clean)
+    for nome in nomes:
+        getattr(novo, nome)
+    if atual is not None and 'visoes' in vars(atual):
+        for nome in _propriedades_montadas(atual.visoes):
+            getattr(novo.visoes, nome)
+
+
+def versao_dados_atual():
+    """Versão do anime.csv em disco agora (levanta OSError se ele não existir)."""
+    return chave_arquivo(CAMINHO_ANIME_CSV)
+
+
+# Snapshot dos dados, índices e modelo do processo, com troca a quente (ver snapshots.py)
+snapshots = GerenciadorSnapshots(construir_recursos, aquecer_recursos, versao_dados_atual)
+
+
+def obter_recursos():
+    """
+    Retorna os RecursosAnime atuais do processo, construindo-os na primeira chamada.
+    Pegue-os uma vez por requisição: uma recarga pode trocá-los entre duas chamadas.
+    """
+    return snapshots.atual()
+
+
+def recursos_carregados():
+    """True se os recursos do processo já foram construídos (obter_recursos não vai bloquear)."""
+    return snapshots.carregado
+
+
+def compilar_preditor(recursos, max_generos=0):
+    """
+    Pré-calcula (ou lê do cache em disco) a nota do modelo do processo para cada combinação
+    de gêneros do catálogo e, opcionalmente, para todas as de até `max_generos` gêneros.
+    A tabela gravada é a do artefato do modelo em uso: um modelo publicado depois para os
+    mesmos dados (python anime.py publicar) compila uma tabela própria.
+    """
+    modelo = recursos.modelo
+    return obter_tabela(
+        recursos.versao,
+        np.ascontiguousarray(recursos.indice_generos.mascaras.T),
+        len(recursos.indice_generos.colunas),
+        lambda matriz: predict_score_knn_lote(matriz, model=modelo, df_treino=recursos.df_para_ml),
+        f"{BACKEND_VIZINHOS}_knn{modelo.n_neighbors}_{recursos.artefato_modelo}",
+        max_generos,
+    )
+
+
+def recarregar_recursos(esperar=True):
+    """
+    Reconstrói os recursos (ex.: anime.csv atualizado) em segundo plano e os troca já aquecidos;
+    os caches de resultados antigos são descartados com o snapshot anterior.
+    esperar: bloqueia até a troca e retorna os recursos novos (False: retorna a thread da recarga)
+    """
+    thread = snapshots.recarregar(esperar)
+    return obter_recursos() if esperar else thread
+
+
+def estatisticas_cache():
+    """Contadores de acertos/falhas/despejos dos caches de resultados da versão atual."""
+    recursos = obter_recursos()
+    return {
+        'versao': recursos.versao,
+        'predicoes': recursos.cache_predicoes.estatisticas(),
+        'consultas': recursos.cache_consultas.estatisticas(),
+    }
+
+
+def __getattr__(nome):
+    # Mantém anime.df_clean, anime.modelo etc. acessíveis, agora carregados sob demanda
+    if nome in ('df_clean', 'df_para_ml', 'df_para_encontrar', 'modelo'):
+        return getattr(obter_recursos(), nome)
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
 
-def predict_score_knn(generos_booleans, model=modelo, df_treino=df_para_ml):
+
+def predict_score_knn(generos_booleans, model=None, df_treino=None):
         """
-        model: modelo KNeighborsRegressor já treinado
+        model: regressor de vizinhos já treinado (padrão: modelo do processo)
         generos_booleans: list[bool], presença dos gêneros na ordem de generos_lista
         df_treino: DataFrame usado no treino (para pegar nomes das colunas)
         """
+        recursos = obter_recursos()
+        # Só o modelo do processo usa o cache (a predição depende apenas da combinação de gêneros)
+        usa_cache = model is None and df_treino is None
+        if model is None:
+            model = recursos.modelo
+        if df_treino is None:
+            df_treino = recursos.df_para_ml
         # Monta o vetor de entrada (gêneros + membros)
         X_input = np.array([*generos_booleans]).reshape(1, -1)
-        # Identifica colunas True
-        colunas_true = [col for col, val in zip(df_treino.drop('Score').columns, generos_booleans) if val]
-        print("Colunas com valor True:", colunas_true)
+        # Identifica colunas True (só com o log de depuração ligado: este caminho atende a API e o preditor compilado)
+        if logger.isEnabledFor(logging.DEBUG):
+            colunas_true = [col for col, val in zip(df_treino.drop('Score').columns, generos_booleans) if val]
+            logger.debug("Colunas com valor True: %s", colunas_true)
         # Faz a predição
+        if usa_cache:
+            chave = chave_generos(generos_booleans)
+            tabela = recursos.tabela_predicoes
+            if tabela is not None:
+                nota = tabela.get(chave)
+                if nota is not None:
+                    return nota
+            # fora da tabela (ou sem preditor compilado): KNN ao vivo, com cache LRU
+            return recursos.cache_predicoes.obter(chave, lambda: model.predict(X_input)[0])
         predicted_score = model.predict(X_input)[0]
         return predicted_score
 
+
+def matriz_generos(generos, colunas):
+    """
+    Converte `generos` numa matriz booleana (n, len(colunas)).
+    generos: matriz/lista de listas de booleans na ordem de `colunas`, ou lista de conjuntos de nomes de gêneros
+    """
+    if isinstance(generos, np.ndarray):
+        return generos.astype(bool, copy=False).reshape(-1, len(colunas))
+    generos = list(generos)
+    por_nome = generos and (
+        isinstance(generos[0], (set, frozenset)) or any(isinstance(g, str) for g in generos[0])
+    )
+    if not por_nome:
+        return np.asarray(generos, dtype=bool).reshape(-1, len(colunas))
+    posicoes = {col.removeprefix('Genres_'): i for i, col in enumerate(colunas)}
+    matriz = np.zeros((len(generos), len(colunas)), dtype=bool)
+    for linha, nomes in enumerate(generos):
+        desconhecidos = [nome for nome in nomes if nome not in posicoes]
+        if desconhecidos:
+            raise ValueError(f"Gêneros desconhecidos: {', '.join(desconhecidos)}")
+        matriz[linha, [posicoes[nome] for nome in nomes]] = True
+    return matriz
+
+
+def predict_score_knn_lote(generos, model=None, df_treino=None, tamanho_lote=4096):
+    """
+    Prediz as notas de várias combinações de gêneros de uma vez.
+    generos: matriz booleana (n, gêneros) ou lista de conjuntos de nomes de gêneros
+    tamanho_lote: linhas por chamada de model.predict (limita a memória usada pelo KNN)
+    Retorna: np.ndarray com uma nota por linha
+    """
+    if model is None or df_treino is None:
+        # modelo e colunas do mesmo snapshot, mesmo que uma recarga aconteça no meio
+        recursos = obter_recursos()
+        model = recursos.modelo if model is None else model
+        df_treino = recursos.df_para_ml if df_treino is None else df_treino
+    X = matriz_generos(generos, df_treino.drop('Score').columns)
+    notas = np.empty(len(X), dtype=np.float64)
+    for inicio in range(0, len(X), tamanho_lote):
+        notas[inicio:inicio + tamanho_lote] = model.predict(X[inicio:inicio + tamanho_lote])
+    return notas
+
 # =====================
 # Funções utilitárias para recomendação de animes
 # =====================
 
-def get_top_animes_by_genres(generos_booleans, n=10, df_treino=df_para_encontrar):
+def get_top_animes_by_genres(generos_booleans, n=10, df_treino=None):
     """
     Retorna os "n" animes com maior Score que possuem todos os gêneros marcados como True em generos_booleans.
     Prioriza combinações exatas, depois inclui os que têm gêneros extras.
     """
-    generos_cols = df_treino.drop('Score','MAL_ID').columns
-    generos_array = np.array(df_treino[generos_cols]) == True
-    generos_booleans = np.array(generos_booleans, dtype=bool)
-
-    # Máscara para combinação exata
-    mask_exata = np.all(generos_array == generos_booleans, axis=1)
-    # Máscara para conter todos os gêneros selecionados (mas pode ter extras)
-    mask_contem = np.all(generos_array[:, generos_booleans] == True, axis=1)
-
-    # Filtra e ordena
-    df_exato = df_treino.filter(mask_exata).sort('Score', descending=True)
-    df_extra = df_treino.filter(mask_contem & ~mask_exata).sort('Score', descending=True)
-
-    # Junta e retorna apenas os MAL_IDs
-    top_animes = pl.concat([df_exato, df_extra]).head(n)
-    return top_animes.select(['MAL_ID'])
+    # Índice de bits pré-computado na carga; um DataFrame explícito ganha um índice próprio
+    if df_treino is None:
+        indice = obter_recursos().indice_generos
+    else:
+        indice = IndiceGeneros(df_treino)
+    return pl.DataFrame({'MAL_ID': indice.top_mal_ids(generos_booleans, n)})
 
 
 # função que baseado numa lista de generos, retorna 5 animes com a maior nota que possuam estes generos
-def get_top_animes(generos_booleans, n=10):
+def get_top_animes(generos_booleans, n=10, recursos=None):
     """
     generos_booleans: list[bool], presença dos gêneros na ordem de generos_lista
     "n": número de animes a serem retornados
+    recursos: snapshot já obtido pela requisição (padrão: o atual do processo)
     Retorna: DataFrame polars com coluna 'MAL_ID' dos animes selecionados
     """
-    return get_top_animes_by_genres(generos_booleans, n=n)
+    # Interseção das listas de postagem por gênero, parando nos "n" primeiros (memorizada por combinação)
+    if recursos is None:
+        recursos = obter_recursos()
+    indice = recursos.indice_invertido
+    posicoes = recursos.cache_consultas.obter(
+        ('todos', chave_generos(generos_booleans), n),
+        lambda: indice.posicoes_contem_todos(generos_booleans, n),
+    )
+    return pl.DataFrame({'MAL_ID': indice.mal_ids[posicoes]})
+
+
+def obter_recomendacoes_por_filtros(df_clean, generos_selecionados, min_score=6.0, max_results=10, recursos=None):
+    """
+    Os "max_results" animes de `df_clean` com Score >= min_score e pelo menos um dos gêneros
+    de `generos_selecionados` (nomes), por Score decrescente
+    recursos: snapshot já obtido pela requisição (padrão: o atual do processo)
+    """
+    # Com o df_clean do snapshot, usa a união das listas de postagem do índice invertido
+    if recursos is None:
+        recursos = obter_recursos()
+    if df_clean is recursos.df_clean:
+        indice = recursos.indice_invertido
+        posicoes = recursos.cache_consultas.obter(
+            ('algum', indice.chave_nomes(generos_selecionados), max_results, min_score),
+            lambda: indice.posicoes_contem_algum(generos_selecionados, max_results, min_score),
+        )
+        return df_clean[indice.ordem[posicoes]]
+
+    # Outro DataFrame: varredura com list.contains (um OR por gênero)
+    filtro_generos = pl.lit(False)
+    for genero in generos_selecionados:
+        filtro_generos = filtro_generos | pl.col("Genres").list.contains(genero)
+    return (
+        df_clean.filter(filtro_generos & (pl.col("Score") >= min_score))
+        .sort("Score", descending=True)
+        .head(max_results)
+    )
+
+
+COLUNAS_INFO = ['Name', 'Score', 'Genres_combination']
+
+
+def _indice_info(df_treino, recursos=None):
+    # Índice por MAL_ID pré-computado na carga; um DataFrame explícito ganha um índice próprio
+    if df_treino is None:
+        if recursos is None:
+            recursos = obter_recursos()
+        return recursos.indice_ids, recursos.df_clean
+    return IndicePorId(df_treino['MAL_ID'].to_numpy()), df_treino
+
 
 # Função para obter informações detalhadas dos animes a partir de um DataFrame polars de MAL_IDs
-def get_anime_info(mal_id_df, df_treino=df_clean):
+def get_anime_info(mal_id_df, df_treino=None, recursos=None):
     """
     mal_id_df: DataFrame polars com coluna 'MAL_ID' (resultado de get_top_animes)
-    df_treino: DataFrame polars com informações completas dos animes
-    Retorna: DataFrame polars com colunas ['Name', 'Score', 'Genres_combination']
+    df_treino: DataFrame polars com informações completas dos animes (padrão: df_clean do processo)
+    recursos: snapshot já obtido pela requisição (padrão: o atual do processo)
+    Retorna: DataFrame polars com colunas ['Name', 'Score', 'Genres_combination'], na ordem de mal_id_df
     """
     if mal_id_df.is_empty():
         return pl.DataFrame({'Name': [], 'Score': [], 'Genres_combination': []})
-    mal_ids = mal_id_df['MAL_ID'].to_list()
-    df_filtrado = df_treino.filter(pl.col('MAL_ID').is_in(mal_ids))
-    df_info = df_filtrado.select(['Name', 'Score', 'Genres_combination'])
-    return df_info
+    indice, df_treino = _indice_info(df_treino, recursos)
+    # gather das k linhas pelo índice, em vez de um filtro sobre o catálogo inteiro
+    return df_treino.select(COLUNAS_INFO)[indice.linhas(mal_id_df['MAL_ID'].to_numpy())]
 
-if __name__ == "__main__":
-    """### 4.4. Resultados do modelo
-    
-    4.4.1. Modelo somente com Score e generos
+
+def get_anime_info_lote(mal_id_dfs, df_treino=None):
+    """
+    get_anime_info de várias listas de resultados de uma vez (uma busca e um gather para todas).
+    mal_id_dfs: lista de DataFrames polars com coluna 'MAL_ID'
+    Retorna: lista de DataFrames polars, um por entrada de mal_id_dfs
+    """
+    indice, df_treino = _indice_info(df_treino)
+    linhas = indice.linhas_lote([df['MAL_ID'].to_numpy() for df in mal_id_dfs])
+    if not linhas:
+        return []
+    info = df_treino.select(COLUNAS_INFO)[np.concatenate(linhas)]
+    inicios = np.concatenate([[0], np.cumsum([len(l) for l in linhas])])
+    return [info.slice(inicio, len(l)) for inicio, l in zip(inicios, linhas)]
+
+def animes_similares(mal_id, n=10, precomputado=True):
     """
+    Os "n" animes com conteúdo mais parecido com o de `mal_id` (similaridade de cosseno).
+    precomputado: usa a tabela all-pairs gravada em disco (só vale para n <= K_SIMILARES);
+    com False (ou n maior), calcula a consulta na hora sobre a matriz de conteúdo.
+    Retorna: DataFrame polars com colunas 'MAL_ID' e 'Similaridade', do mais para o menos parecido
+    """
+    recursos = obter_recursos()
+    if precomputado and n <= K_SIMILARES:
+        mal_ids, similaridades = recursos.similares_conteudo.recomendar([mal_id], n=n)
+    else:
+        mal_ids, similaridades = recursos.similaridade_conteudo.similares(mal_id, n)
+    return pl.DataFrame({'MAL_ID': mal_ids, 'Similaridade': similaridades}).cast(
+        {'MAL_ID': recursos.df_clean.schema['MAL_ID']}
+    )
 
-    average_mse, mse_scores, _ = train_and_evaluate_knn(df_para_ml)
+"""### 4.4. Resultados do modelo
+
+4.4.1. Modelo somente com Score e generos, publicado como artefato (ver artefatos_modelo.py)
+"""
+
+
+def publicar(n_neighbors=N_NEIGHBORS, backend=None, n_jobs=-1):
+    """
+    Avalia o modelo no 10-fold, imprime o MSE e publica o último modelo treinado
+    como artefato da versão atual dos dados. Retorna o diretório do artefato.
+    """
+    recursos = obter_recursos()
+    backend = backend or BACKEND_VIZINHOS
+    average_mse, mse_scores, modelo = train_and_evaluate_knn(
+        recursos.df_para_ml, n_neighbors, n_jobs, backend, generos=recursos.generos_empacotados
+    )
     print("MSE por fold:", mse_scores)
-    print("Média do erro quadrático médio:", average_mse)
\ No newline at end of file
+    print("Média do erro quadrático médio:", average_mse)
+    return publicar_modelo(modelo, recursos.versao, recursos.colunas_features, backend,
+                           metricas={'mse_10fold': average_mse, 'mse_por_fold': mse_scores})
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Treina e publica o modelo de notas (artefatos em databases/cache).")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    comando_publicar = comandos.add_parser("publicar", help="avalia no 10-fold, treina e publica um novo artefato")
+    comando_listar = comandos.add_parser("listar", help="lista os artefatos publicados para os dados atuais")
+    for comando in (comando_publicar, comando_listar):
+        comando.add_argument("--backend", default=BACKEND_VIZINHOS, help="backend de vizinhos (ver vizinhos.py)")
+        comando.add_argument("--n-neighbors", type=int, default=N_NEIGHBORS)
+    comando_publicar.add_argument("--n-jobs", type=int, default=-1)
+    args = parser.parse_args()
+    if args.comando == "publicar":
+        print("Artefato publicado em", publicar(args.n_neighbors, args.backend, args.n_jobs))
+    else:
+        for caminho, meta in listar_modelos(obter_recursos().versao, args.backend, args.n_neighbors):
+            print(caminho, meta['criado_em'], meta['metricas'].get('mse_10fold'))
@@ -0,0 +1,252 @@
+"""
+API HTTP/JSON local (tornado) para a predição de notas e as recomendações por gênero.
+
+Outros serviços consultam o mesmo modelo e índices do app sem passar pelo Streamlit:
+
+    POST /predicao        {"generos": ["Action", "Comedy"]}               -> {"nota": 7.1}
+    POST /top             {"generos": [...], "n": 10}                      -> {"animes": [...]}
+    POST /recomendacoes   {"generos": [...], "nota_minima": 6.0, "n": 10}  -> {"animes": [...]}
+    GET  /saude                                                            -> versão dos dados, lotes e recargas
+
+As predições que chegam dentro de uma janela curta (JANELA_LOTE) são agrupadas pelo
+LotePredicoes numa única chamada vetorizada de predict_score_knn_lote, rodada fora do
+loop de eventos; as combinações do preditor compilado (se ligado) respondem direto.
+Cada requisição usa um único snapshot dos recursos; um anime.csv novo é recarregado e
+trocado em segundo plano (ver snapshots.py) sem derrubar o serviço.
+
+Uso:
+    python api.py [--endereco 127.0.0.1] [--porta 8765] [--janela-ms 2] [--max-lote 256]
+"""
+
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import tornado.web
+
+from anime import (
+    aquecer_recursos, get_anime_info, get_top_animes, matriz_generos, obter_recomendacoes_por_filtros, obter_recursos,
+    predict_score_knn_lote, snapshots,
+)
+from indices import chave_generos
+
+# Só a máquina local por padrão; outro endereço (ex.: 0.0.0.0) tem de ser pedido explicitamente
+ENDERECO = "127.0.0.1"
+PORTA = 8765
+# Quanto uma predição espera por outras para sair no mesmo lote, e o tamanho máximo do lote
+JANELA_LOTE = 0.002
+MAX_LOTE = 256
+MAX_RESULTADOS = 100
+
+
+class LotePredicoes:
+    """
+    Agrupa predições concorrentes: a primeira de um lote abre uma janela de `janela`
+    segundos e o lote sai quando ela fecha (ou ao chegar a `max_lote` pedidos), numa
+    chamada de prever_lote(matriz booleana, recursos) -> notas, executada numa thread.
+    Pedidos feitos sobre snapshots diferentes (antes e depois de uma recarga) saem em lotes separados.
+    """
+
+    def __init__(self, prever_lote, janela=JANELA_LOTE, max_lote=MAX_LOTE):
+        self.prever_lote = prever_lote
+        self.janela = janela
+        self.max_lote = max_lote
+        # uma thread só: enquanto um lote roda, os pedidos seguintes se acumulam no próximo
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="lote-predicoes")
+        self._pendentes = []
+        self._timer = None
+        self.lotes = 0
+        self.predicoes = 0
+
+    def prever(self, linha, recursos):
+        """Future com a nota da linha booleana `linha` (uma combinação de gêneros) no modelo de `recursos`."""
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        self._pendentes.append((linha, recursos, futuro))
+        if len(self._pendentes) >= self.max_lote:
+            self._despachar()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.janela, self._despachar)
+        return futuro
+
+    def _despachar(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pendentes, self._pendentes = self._pendentes, []
+        por_snapshot = {}
+        for linha, recursos, futuro in pendentes:
+            por_snapshot.setdefault(id(recursos), (recursos, []))[1].append((linha, futuro))
+        for recursos, itens in por_snapshot.values():
+            asyncio.ensure_future(self._executar(recursos, itens))
+
+    async def _executar(self, recursos, pendentes):
+        matriz = np.array([linha for linha, _ in pendentes], dtype=bool)
+        try:
+            notas = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self.prever_lote, matriz, recursos)
+        except Exception as e:
+            for _, futuro in pendentes:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+        self.lotes += 1
+        self.predicoes += len(pendentes)
+        for (_, futuro), nota in zip(pendentes, notas):
+            if not futuro.done():
+                futuro.set_result(float(nota))
+
+    def estatisticas(self):
+        return {
+            'lotes': self.lotes,
+            'predicoes': self.predicoes,
+            'media_por_lote': self.predicoes / self.lotes if self.lotes else 0.0,
+        }
+
+
+def _animes_json(df):
+    return df.select([c for c in ('MAL_ID', 'Name', 'Score', 'Genres_combination') if c in df.columns]).to_dicts()
+
+
+class ErroPedido(tornado.web.HTTPError):
+    """Pedido inválido (400); a mensagem volta no corpo JSON."""
+
+    def __init__(self, mensagem):
+        super().__init__(400)
+        self.mensagem = mensagem
+
+
+class HandlerJSON(tornado.web.RequestHandler):
+    def initialize(self, lote):
+        self.lote = lote
+
+    def corpo(self):
+        try:
+            corpo = json.loads(self.request.body or b"{}")
+        except ValueError:
+            raise ErroPedido("Corpo não é JSON")
+        if not isinstance(corpo, dict):
+            raise ErroPedido("Corpo deve ser um objeto JSON")
+        return corpo
+
+    def prepare(self):
+        # um snapshot por requisição: uma recarga no meio não mistura dados de versões diferentes
+        self.recursos = obter_recursos()
+
+    def on_finish(self):
+        # o handler pode sobreviver à resposta (ciclos com a conexão): não segura o snapshot antigo
+        self.recursos = None
+
+    def nomes_generos(self, corpo, obrigatorio=False):
+        """Nomes de "generos" do pedido: lista de strings, todos gêneros conhecidos (não vazia se `obrigatorio`)."""
+        generos = corpo.get('generos', [])
+        if not isinstance(generos, list) or not all(isinstance(g, str) for g in generos) or (
+                obrigatorio and not generos):
+            raise ErroPedido("generos deve ser uma lista " + ("não vazia " if obrigatorio else "") + "de nomes de gêneros")
+        desconhecidos = [g for g in generos if g not in self.recursos.indice_invertido.posicao_genero]
+        if desconhecidos:
+            raise ErroPedido(f"Gêneros desconhecidos: {', '.join(desconhecidos)}")
+        return generos
+
+    def generos(self, corpo):
+        """Linha booleana de gêneros do pedido ("generos": nomes, ou "booleans" na ordem das colunas)."""
+        colunas = self.recursos.colunas_features
+        if 'booleans' not in corpo:
+            return matriz_generos([set(self.nomes_generos(corpo))], colunas)[0]
+        booleans = corpo['booleans']
+        if not isinstance(booleans, list) or not all(isinstance(b, bool) for b in booleans):
+            raise ErroPedido("booleans deve ser uma lista de true/false na ordem das colunas de gêneros")
+        try:
+            return matriz_generos([booleans], colunas)[0]
+        except ValueError as e:
+            raise ErroPedido(str(e))
+
+    def n(self, corpo, padrao=10):
+        try:
+            return max(1, min(int(corpo.get('n', padrao)), MAX_RESULTADOS))
+        except (ValueError, TypeError):
+            raise ErroPedido("n deve ser um inteiro")
+
+    def write_error(self, status_code, **kwargs):
+        # a mensagem vai no corpo (JSON), não na linha de status
+        erro = kwargs.get('exc_info', (None, None, None))[1]
+        if isinstance(erro, ErroPedido):
+            self.finish({'erro': erro.mensagem})
+        else:
+            self.finish({'erro': self._reason})
+
+
+class HandlerPredicao(HandlerJSON):
+    async def post(self):
+        linha = self.generos(self.corpo())
+        # combinações do preditor compilado não passam pelo KNN; a tabela é montada no
+        # aquecimento (aquecer_recursos) e nunca aqui, no loop de eventos
+        tabela = vars(self.recursos).get('tabela_predicoes')
+        nota = tabela.get(chave_generos(linha)) if tabela is not None else None
+        if nota is None:
+            nota = await self.lote.prever(linha, self.recursos)
+        self.write({'nota': float(nota)})
+
+
+class HandlerTop(HandlerJSON):
+    def post(self):
+        corpo = self.corpo()
+        top = get_top_animes(self.generos(corpo).tolist(), self.n(corpo), recursos=self.recursos)
+        info = get_anime_info(top, recursos=self.recursos)
+        self.write({'animes': _animes_json(info.insert_column(0, top['MAL_ID']))})
+
+
+class HandlerRecomendacoes(HandlerJSON):
+    def post(self):
+        corpo = self.corpo()
+        generos = self.nomes_generos(corpo, obrigatorio=True)
+        try:
+            nota_minima = float(corpo.get('nota_minima', 6.0))
+        except (ValueError, TypeError):
+            raise ErroPedido("nota_minima deve ser um número")
+        df = obter_recomendacoes_por_filtros(self.recursos.df_clean, generos, nota_minima, self.n(corpo),
+                                             recursos=self.recursos)
+        self.write({'animes': _animes_json(df)})
+
+
+class HandlerSaude(HandlerJSON):
+    def get(self):
+        self.write({'status': 'ok', 'versao': self.recursos.versao, 'lotes': self.lote.estatisticas(),
+                    'snapshots': snapshots.estatisticas()})
+
+
+def criar_aplicacao(janela=JANELA_LOTE, max_lote=MAX_LOTE):
+    lote = LotePredicoes(
+        lambda matriz, recursos: predict_score_knn_lote(matriz, recursos.modelo, recursos.df_para_ml), janela, max_lote
+    )
+    rotas = [
+        (r"/predicao", HandlerPredicao),
+        (r"/top", HandlerTop),
+        (r"/recomendacoes", HandlerRecomendacoes),
+        (r"/saude", HandlerSaude),
+    ]
+    return tornado.web.Application([(rota, handler, {'lote': lote}) for rota, handler in rotas])
+
+
+async def servir(porta=PORTA, janela=JANELA_LOTE, max_lote=MAX_LOTE, endereco=ENDERECO):
+    # dados, índices e modelo prontos antes de aceitar conexões
+    # (sem guardar o snapshot aqui: esta corrotina vive até o fim e o seguraria após uma recarga)
+    aquecer_recursos(obter_recursos())
+    # anime.csv atualizado é recarregado em segundo plano e trocado sem parar o serviço
+    snapshots.monitorar()
+    criar_aplicacao(janela, max_lote).listen(porta, address=endereco)
+    print(f"API ouvindo em http://{endereco}:{porta}", flush=True)
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API HTTP/JSON de predição e recomendações.")
+    parser.add_argument("--endereco", default=ENDERECO, help="interface em que a API escuta")
+    parser.add_argument("--porta", type=int, default=PORTA)
+    parser.add_argument("--janela-ms", type=float, default=JANELA_LOTE * 1000,
+                        help="espera máxima para agrupar predições num lote")
+    parser.add_argument("--max-lote", type=int, default=MAX_LOTE, help="1 desliga o agrupamento")
+    args = parser.parse_args()
+    asyncio.run(servir(args.porta, args.janela_ms / 1000, args.max_lote, args.endereco))
@@ -0,0 +1,134 @@
+"""
+Artefatos do modelo de notas gravados em disco, versionados pelos dados de origem.
+
+Cada publicação fica em
+<cache>/<versão dos dados>/modelos/<backend>_knn<k>/<AAAAmmdd-HHMMSS>-<pid>/ com:
+- modelo.joblib: o regressor treinado, com os arrays numpy sem compressão, reabertos com
+  memory map (joblib.load(mmap_mode='r')): carregar não copia a base de treino, e vários
+  workers no mesmo host compartilham as mesmas páginas;
+- meta.json: colunas de features na ordem do treino, versão dos dados (hash do anime.csv,
+  ver cache_disco.chave_arquivo), backend, n_neighbors, versões das bibliotecas e métricas.
+
+Um worker usa o artefato mais recente compatível com os seus dados e colunas (e com as
+versões do sklearn/numpy instaladas, já que o pickle não é portável entre elas); sem
+nenhum, treina e publica. `python anime.py publicar` treina, avalia e publica.
+"""
+
+import json
+import os
+import shutil
+import time
+
+import joblib
+import numpy as np
+import sklearn
+
+from cache_disco import DIRETORIO_CACHE
+
+# Incrementar quando o conteúdo dos artefatos mudar
+FORMATO_ARTEFATO = 1
+ARQUIVO_MODELO = "modelo.joblib"
+ARQUIVO_META = "meta.json"
+
+
+def diretorio_modelos(versao, backend, n_neighbors, diretorio_cache=DIRETORIO_CACHE):
+    return os.path.join(diretorio_cache, versao, "modelos", f"{backend}_knn{n_neighbors}")
+
+
+def _ler_meta(caminho):
+    try:
+        with open(os.path.join(caminho, ARQUIVO_META), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def compativel(meta, versao, colunas):
+    """True se o artefato de `meta` foi treinado com estes dados e colunas e pode ser lido aqui."""
+    return (
+        meta.get('formato') == FORMATO_ARTEFATO
+        and meta.get('versao_dados') == versao
+        and meta.get('colunas') == list(colunas)
+        and meta.get('sklearn') == sklearn.__version__
+        and meta.get('numpy') == np.__version__
+    )
+
+
+def publicar_modelo(modelo, versao, colunas, backend, metricas=None, diretorio_cache=DIRETORIO_CACHE):
+    """
+    Grava `modelo` (regressor já treinado) como um novo artefato da versão `versao` dos dados.
+    colunas: colunas de features na ordem usada no treino
+    metricas: dict opcional gravado no meta.json (ex.: MSE do 10-fold)
+    Retorna o diretório do artefato.
+    """
+    base = diretorio_modelos(versao, backend, modelo.n_neighbors, diretorio_cache)
+    destino = os.path.join(base, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+    # grava num diretório temporário e renomeia no fim: leitores nunca veem um artefato pela metade
+    tmp = f"{destino}.tmp"
+    os.makedirs(tmp, exist_ok=True)
+    try:
+        joblib.dump(modelo, os.path.join(tmp, ARQUIVO_MODELO))
+        meta = {
+            'formato': FORMATO_ARTEFATO,
+            'versao_dados': versao,
+            'backend': backend,
+            'n_neighbors': modelo.n_neighbors,
+            'colunas': list(colunas),
+            'sklearn': sklearn.__version__,
+            'numpy': np.__version__,
+            'criado_em': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'metricas': metricas or {},
+        }
+        with open(os.path.join(tmp, ARQUIVO_META), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp, destino)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return destino
+
+
+def listar_modelos(versao, backend, n_neighbors, diretorio_cache=DIRETORIO_CACHE):
+    """(diretório, meta) dos artefatos publicados para esta versão/configuração, do mais recente ao mais antigo."""
+    base = diretorio_modelos(versao, backend, n_neighbors, diretorio_cache)
+    if not os.path.isdir(base):
+        return []
+    artefatos = []
+    # os nomes começam pelo carimbo de data/hora: a ordem alfabética é a cronológica
+    for nome in sorted(os.listdir(base), reverse=True):
+        caminho = os.path.join(base, nome)
+        meta = None if nome.endswith(".tmp") else _ler_meta(caminho)
+        if meta is not None:
+            artefatos.append((caminho, meta))
+    return artefatos
+
+
+def carregar_modelo(versao, colunas, backend, n_neighbors, diretorio_cache=DIRETORIO_CACHE):
+    """
+    Abre (com memory map) o artefato mais recente compatível com `versao` e `colunas`.
+    Retorna (modelo, meta), ou None se não houver nenhum.
+    """
+    for caminho, meta in listar_modelos(versao, backend, n_neighbors, diretorio_cache):
+        if not compativel(meta, versao, colunas):
+            continue
+        try:
+            modelo = joblib.load(os.path.join(caminho, ARQUIVO_MODELO), mmap_mode='r')
+        except (OSError, ValueError, EOFError):
+            continue
+        return modelo, dict(meta, caminho=caminho)
+    return None
+
+
+def obter_modelo(versao, colunas, backend, n_neighbors, treinar, diretorio_cache=DIRETORIO_CACHE):
+    """
+    Modelo do artefato mais recente compatível; sem nenhum, treinar() e publica o resultado.
+    Retorna (modelo, id do artefato): o nome do diretório da publicação, ou None sem `versao`.
+    """
+    if versao is not None:
+        artefato = carregar_modelo(versao, colunas, backend, n_neighbors, diretorio_cache)
+        if artefato is not None:
+            return artefato[0], os.path.basename(artefato[1]['caminho'])
+    modelo = treinar()
+    if versao is None:
+        return modelo, None
+    destino = publicar_modelo(modelo, versao, colunas, backend, diretorio_cache=diretorio_cache)
+    return modelo, os.path.basename(destino)
@@ -0,0 +1,157 @@
+"""
+Ingestão em streaming das avaliações usuário–anime do dataset do Kaggle
+(rating_complete.csv e animelist.csv, dezenas de milhões de linhas).
+
+O CSV nunca é carregado inteiro: o plano lazy (scan_csv com tipos compactos já na leitura)
+é executado pelo engine de streaming e gravado direto em partições de tamanho fixo em
+<cache>/<versão do CSV>/<tabela>-<formato>/parte-NNNNN.<formato>, sem compressão.
+
+O formato padrão é Arrow IPC, como o resto do cache (cache_disco.py): carregar_avaliacoes
+reabre as partições com memory map, sem copiar nada para a memória do processo. Em Parquet
+(formato="parquet", para levar os dados a outras ferramentas) o polars lê as partições
+copiando-as, mesmo sem compressão.
+
+Uso:
+    python avaliacoes.py rating_complete [--formato ipc] [--linhas-por-particao 8000000]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import threading
+
+import polars as pl
+
+from cache_disco import DIRETORIO_CACHE, chave_arquivo
+from preparo_dados import preparo
+
+CAMINHOS_AVALIACOES = {
+    'rating_complete': os.path.join("databases", "rating_complete.csv"),
+    'animelist': os.path.join("databases", "animelist.csv"),
+}
+
+# Tipos na leitura do CSV. Ids do MAL cabem em uint32 e notas (0-10) em uint8.
+# Em animelist.csv, rating 0 significa "não avaliado".
+ESQUEMAS_CSV = {
+    'rating_complete': {'user_id': pl.UInt32, 'anime_id': pl.UInt32, 'rating': pl.UInt8},
+    'animelist': {
+        'user_id': pl.UInt32, 'anime_id': pl.UInt32, 'rating': pl.UInt8,
+        'watching_status': pl.UInt8, 'watched_episodes': pl.UInt32,
+    },
+}
+
+# ~8M linhas x 9-12 bytes por partição: arquivos de ~100 MB
+LINHAS_POR_PARTICAO = 8_000_000
+ARQUIVO_META = "meta.json"
+FORMATOS = ('ipc', 'parquet')
+
+
+def baixar_avaliacoes_se_necessario(tabela):
+    preparo.garantir((os.path.basename(CAMINHOS_AVALIACOES[tabela]),))
+
+
+def plano_avaliacoes(tabela, caminho):
+    """Plano lazy da leitura do CSV de `tabela`, já nos tipos compactos."""
+    plano = pl.scan_csv(caminho, schema=ESQUEMAS_CSV[tabela]).filter(
+        pl.col('user_id').is_not_null() & pl.col('anime_id').is_not_null()
+    )
+    if tabela == 'animelist':
+        plano = plano.with_columns(pl.col('watched_episodes').clip(upper_bound=65535).cast(pl.UInt16))
+    return plano
+
+
+def diretorio_avaliacoes(versao, tabela, formato='ipc', diretorio_cache=DIRETORIO_CACHE):
+    return os.path.join(diretorio_cache, versao, f"{tabela}-{formato}")
+
+
+def _particoes(diretorio, formato):
+    return sorted(os.path.join(diretorio, arquivo) for arquivo in os.listdir(diretorio) if arquivo.endswith(f".{formato}"))
+
+
+def ingerir_avaliacoes(tabela, caminho=None, formato='ipc', linhas_por_particao=LINHAS_POR_PARTICAO,
+                       diretorio_cache=DIRETORIO_CACHE):
+    """
+    Converte o CSV de `tabela` em partições de `formato` ('ipc' ou 'parquet') em streaming,
+    sem montar a tabela inteira em memória. Se a versão atual do CSV já foi convertida,
+    não faz nada. Retorna o diretório das partições.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconhecido: {formato}")
+    if caminho is None:
+        baixar_avaliacoes_se_necessario(tabela)
+        caminho = CAMINHOS_AVALIACOES[tabela]
+    destino = diretorio_avaliacoes(chave_arquivo(caminho, diretorio_cache), tabela, formato, diretorio_cache)
+    if os.path.exists(os.path.join(destino, ARQUIVO_META)):
+        return destino
+
+    # Grava num diretório temporário e renomeia no fim: leitores nunca veem uma conversão pela metade
+    tmp = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    try:
+        plano = plano_avaliacoes(tabela, caminho)
+        gravar = plano.sink_ipc if formato == 'ipc' else plano.sink_parquet
+        gravar(
+            pl.PartitionMaxSize(tmp, max_size=linhas_por_particao,
+                                file_path=lambda ctx: f"parte-{ctx.file_idx:05d}.{formato}"),
+            compression="uncompressed", mkdir=True,
+        )
+        particoes = _particoes(tmp, formato)
+        meta = {
+            'tabela': tabela,
+            'formato': formato,
+            'linhas': sum(_ler_particao(p, formato).height for p in particoes),
+            'particoes': len(particoes),
+            'esquema': {coluna: str(tipo) for coluna, tipo in plano_avaliacoes(tabela, caminho).collect_schema().items()},
+        }
+        with open(os.path.join(tmp, ARQUIVO_META), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        try:
+            os.replace(tmp, destino)
+        except OSError:
+            # outro processo terminou a mesma conversão primeiro
+            if not os.path.exists(os.path.join(destino, ARQUIVO_META)):
+                raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return destino
+
+
+def _ler_particao(caminho, formato):
+    if formato == 'ipc':
+        return pl.read_ipc(caminho, memory_map=True)
+    return pl.read_parquet(caminho)
+
+
+def carregar_avaliacoes(tabela, caminho=None, formato='ipc', diretorio_cache=DIRETORIO_CACHE):
+    """
+    DataFrame com todas as avaliações de `tabela` (convertendo o CSV antes, se preciso).
+    Em 'ipc' as colunas são views das partições mapeadas em memória: um chunk por partição, sem cópia.
+    """
+    destino = ingerir_avaliacoes(tabela, caminho, formato, diretorio_cache=diretorio_cache)
+    return pl.concat([_ler_particao(p, formato) for p in _particoes(destino, formato)], rechunk=False)
+
+
+def escanear_avaliacoes(tabela, caminho=None, formato='ipc', diretorio_cache=DIRETORIO_CACHE):
+    """LazyFrame sobre as partições de `tabela` (convertendo o CSV antes, se preciso)."""
+    destino = ingerir_avaliacoes(tabela, caminho, formato, diretorio_cache=diretorio_cache)
+    if formato == 'ipc':
+        return pl.scan_ipc(os.path.join(destino, "*.ipc"))
+    return pl.scan_parquet(os.path.join(destino, "*.parquet"))
+
+
+def meta_avaliacoes(tabela, caminho=None, formato='ipc', diretorio_cache=DIRETORIO_CACHE):
+    """Linhas, partições e esquema da conversão de `tabela`."""
+    destino = ingerir_avaliacoes(tabela, caminho, formato, diretorio_cache=diretorio_cache)
+    with open(os.path.join(destino, ARQUIVO_META), encoding="utf-8") as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Converte os CSVs de avaliações em partições Arrow IPC/Parquet.")
+    parser.add_argument("tabela", choices=list(CAMINHOS_AVALIACOES))
+    parser.add_argument("--caminho", default=None, help="CSV de origem (padrão: o do dataset do Kaggle)")
+    parser.add_argument("--formato", choices=FORMATOS, default='ipc')
+    parser.add_argument("--linhas-por-particao", type=int, default=LINHAS_POR_PARTICAO)
+    args = parser.parse_args()
+    print(ingerir_avaliacoes(args.tabela, args.caminho, args.formato, args.linhas_por_particao))
@@ -0,0 +1,972 @@
+"""
+Benchmarks do projeto.
+
+Os dados são gerados sinteticamente com o mesmo esquema do anime.csv do Kaggle,
+então os benchmarks rodam sem credenciais do kaggle. Uso:
+
+    python benchmark.py inicializacao [--fator 1]
+    python benchmark.py carga
+    python benchmark.py consultas [--fator 1]
+    python benchmark.py predicao [--fator 1]
+    python benchmark.py validacao [--fator 1] [--n-jobs 1 2 4 8]
+    python benchmark.py vizinhos [--fator 1]
+    python benchmark.py dispersao
+    python benchmark.py ingestao [--fator 0.1]
+    python benchmark.py similares [--fator 1]
+    python benchmark.py features [--fator 1]
+    python benchmark.py api [--fator 1]
+    python benchmark.py recarga [--fator 1]
+    python benchmark.py suite [--fatores 1 10 100] [--saida resultados.json] [--gravar-baseline]
+
+A suíte mede as funções públicas do app (carga, one-hot, treino, predição, consultas,
+filtros locais e agregados do dashboard) em catálogos de 1x/10x/100x o do Kaggle, grava
+o resultado em JSON e compara com benchmark_baseline.json, saindo com código 1 se algum
+tempo piorou mais que a tolerância.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import polars as pl
+
+DIRETORIO_PROJETO = os.path.dirname(os.path.abspath(__file__))
+
+# Gêneros presentes no anime.csv original (antes da troca Hentai -> Adult Content)
+GENEROS_KAGGLE = [
+    "Action", "Adventure", "Cars", "Comedy", "Dementia", "Demons", "Drama", "Ecchi", "Fantasy", "Game",
+    "Harem", "Hentai", "Historical", "Horror", "Josei", "Kids", "Magic", "Martial Arts", "Mecha",
+    "Military", "Music", "Mystery", "Parody", "Police", "Psychological", "Romance", "Samurai", "School",
+    "Sci-Fi", "Seinen", "Shoujo", "Shoujo Ai", "Shounen", "Shounen Ai", "Slice of Life", "Space",
+    "Sports", "Super Power", "Supernatural", "Thriller", "Vampire", "Yaoi", "Yuri",
+]
+LINHAS_KAGGLE = 17562
+
+
+# --------------- DADOS SINTÉTICOS ----------------
+def gerar_catalogo_sintetico(caminho, fator=1, semente=42):
+    """
+    Escreve em `caminho` um CSV com o esquema do anime.csv do Kaggle e
+    `fator` vezes o número de linhas do arquivo original.
+    """
+    rng = np.random.default_rng(semente)
+    n = int(LINHAS_KAGGLE * fator)
+    pesos = rng.dirichlet(np.ones(len(GENEROS_KAGGLE)) * 0.6)
+    qtd_generos = rng.integers(1, 7, size=n)
+    generos = [
+        ", ".join(rng.choice(GENEROS_KAGGLE, size=k, replace=False, p=pesos)) for k in qtd_generos
+    ]
+    generos = [g if rng.random() > 0.01 else "Unknown" for g in generos]
+    scores = np.round(np.clip(rng.normal(6.5, 0.9, size=n), 1.8, 9.2), 2).astype(str)
+    scores[rng.random(n) < 0.28] = "Unknown"
+    membros = rng.lognormal(8, 2.2, size=n).astype(np.int64) + 1
+    estudios = np.array(["Madhouse", "Sunrise", "Toei Animation", "Bones", "Production I.G",
+                         "J.C.Staff", "A-1 Pictures", "Kyoto Animation", "Madhouse, Sunrise", "Unknown"])
+    tipos = np.array(["TV", "Movie", "OVA", "ONA", "Special", "Music"])
+    fontes = np.array(["Manga", "Original", "Light novel", "Novel", "Game", "Unknown"])
+    ids = np.arange(1, n + 1) * 3
+    colunas = {
+        "MAL_ID": ids,
+        "Name": [f"Anime {i}" for i in ids],
+        "Score": scores,
+        "Genres": generos,
+        "English name": "Unknown",
+        "Japanese name": "Unknown",
+        "Type": rng.choice(tipos, size=n),
+        "Episodes": rng.integers(1, 100, size=n).astype(str),
+        "Aired": "Apr 3, 1998 to Apr 24, 1999",
+        "Premiered": "Spring 1998",
+        "Producers": "Bandai Visual",
+        "Licensors": "Funimation",
+        "Studios": rng.choice(estudios, size=n),
+        "Source": rng.choice(fontes, size=n),
+        "Duration": "24 min. per ep.",
+        "Rating": "PG-13 - Teens 13 or older",
+        "Ranked": rng.integers(1, 20000, size=n).astype(str),
+        "Popularity": rng.integers(1, 20000, size=n),
+        "Members": membros,
+        "Favorites": membros // 50,
+        "Watching": membros // 10,
+        "Completed": membros // 2,
+        "On-Hold": membros // 20,
+        "Dropped": membros // 20,
+        "Plan to Watch": membros // 4,
+    }
+    for nota in range(10, 0, -1):
+        colunas[f"Score-{nota}"] = (membros // (12 - nota)).astype(str)
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    pl.DataFrame(colunas).write_csv(caminho)
+    return caminho
+
+
+_PALAVRAS_SINOPSE = (
+    "school friends battle demon magic sword love city future robot pilot war family secret "
+    "power team tournament mystery detective ghost village island journey dream music band idol "
+    "space ship alien monster hunter king princess kingdom revenge memory time travel cafe club"
+).split()
+
+
+def gerar_sinopses_sinteticas(caminho_catalogo, caminho, semente=42):
+    """
+    Escreve em `caminho` um CSV com o esquema de anime_with_synopsis.csv para os animes do
+    catálogo em `caminho_catalogo`; as palavras de cada sinopse dependem dos gêneros do anime.
+    """
+    rng = np.random.default_rng(semente)
+    catalogo = pl.read_csv(caminho_catalogo, columns=["MAL_ID", "Name", "Score", "Genres"])
+    sinopses = []
+    for generos in catalogo["Genres"].to_list():
+        base = [_PALAVRAS_SINOPSE[hash(g) % len(_PALAVRAS_SINOPSE)] for g in generos.split(", ")]
+        sinopses.append(" ".join(rng.choice(base + _PALAVRAS_SINOPSE, size=int(rng.integers(20, 60)))))
+    catalogo.with_columns(pl.Series("sypnopsis", sinopses)).write_csv(caminho)
+    return caminho
+
+
+# rating_complete.csv tem ~57,6M avaliações de ~310k usuários
+LINHAS_AVALIACOES_KAGGLE = 57_633_278
+AVALIACOES_POR_USUARIO = 186
+
+
+def gerar_avaliacoes_sinteticas(caminho, tabela="rating_complete", fator=0.01, semente=42, linhas_por_bloco=1_000_000):
+    """
+    Escreve em `caminho` um CSV com o esquema de rating_complete.csv (ou animelist.csv) e
+    `fator` vezes o número de linhas do original, em blocos (o arquivo não é montado em memória).
+    Os animes avaliados seguem uma lei de potência, como no dataset real.
+    """
+    rng = np.random.default_rng(semente)
+    n = int(LINHAS_AVALIACOES_KAGGLE * fator)
+    ids_anime = np.arange(1, LINHAS_KAGGLE + 1) * 3
+    popularidade = 1.0 / np.arange(1, len(ids_anime) + 1) ** 0.9
+    popularidade /= popularidade.sum()
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    with open(caminho, "wb") as f:
+        for inicio in range(0, max(n, 1), linhas_por_bloco):
+            k = min(linhas_por_bloco, n - inicio)
+            colunas = {
+                "user_id": np.arange(inicio, inicio + k) // AVALIACOES_POR_USUARIO,
+                "anime_id": rng.choice(ids_anime, size=k, p=popularidade),
+                "rating": np.clip(np.round(rng.normal(7.5, 1.6, size=k)), 1, 10).astype(np.int64),
+            }
+            if tabela == "animelist":
+                colunas["rating"][rng.random(k) < 0.3] = 0
+                colunas["watching_status"] = rng.integers(1, 7, size=k)
+                colunas["watched_episodes"] = rng.integers(0, 100, size=k)
+            pl.DataFrame(colunas).write_csv(f, include_header=inicio == 0)
+    return caminho
+
+
+def preparar_diretorio(fator=1):
+    """Cria um diretório temporário com databases/anime.csv e anime_with_synopsis.csv sintéticos."""
+    diretorio = tempfile.mkdtemp(prefix="anime_bench_")
+    gerar_catalogo_sintetico(os.path.join(diretorio, "databases", "anime.csv"), fator=fator)
+    gerar_sinopses_sinteticas(os.path.join(diretorio, "databases", "anime.csv"),
+                              os.path.join(diretorio, "databases", "anime_with_synopsis.csv"))
+    return diretorio
+
+
+def executar_em_processo_novo(codigo, diretorio):
+    """Executa `codigo` num interpretador novo (cwd=diretorio) e devolve o JSON que ele imprimir."""
+    env = dict(os.environ, PYTHONPATH=DIRETORIO_PROJETO)
+    saida = subprocess.run([sys.executable, "-c", codigo], cwd=diretorio, env=env,
+                           capture_output=True, text=True, check=True)
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+# --------------- INICIALIZAÇÃO ----------------
+_CODIGO_LEGADO = """
+import json, time
+t0 = time.perf_counter()
+import anime
+# comportamento antigo do import: carga + one-hot + 10-fold completo
+df_clean = anime.carregar_dados_anime()
+df_ml = anime.one_hot_encode(df_clean.select(['MAL_ID', 'Name', 'Genres', 'Score']), 'Genres')
+anime.train_and_evaluate_knn(df_ml.drop('Name', 'MAL_ID'))
+t_import = time.perf_counter() - t0
+# hello_streamlit carregava os dados de novo via @st.cache_data
+df = anime.carregar_dados_anime()
+df.explode("Genres")
+t_render = time.perf_counter() - t0
+print(json.dumps({"import": t_import, "primeiro_render": t_render, "primeira_predicao": t_render}))
+"""
+
+_CODIGO_ATUAL = """
+import json, time
+t0 = time.perf_counter()
+import anime
+t_import = time.perf_counter() - t0
+anime.obter_recursos().df_clean.explode("Genres")
+t_render = time.perf_counter() - t0
+anime.predict_score_knn([True] + [False] * (anime.df_para_ml.width - 2))
+t_pred = time.perf_counter() - t0
+print(json.dumps({"import": t_import, "primeiro_render": t_render, "primeira_predicao": t_pred}))
+"""
+
+
+def bench_inicializacao(fator=1, repeticoes=3):
+    """Tempo até o primeiro render (dashboard) e a primeira predição num processo novo."""
+    diretorio = preparar_diretorio(fator)
+    resultados = {}
+    for nome, codigo in (("legado", _CODIGO_LEGADO), ("atual", _CODIGO_ATUAL)):
+        medicoes = [executar_em_processo_novo(codigo, diretorio) for _ in range(repeticoes)]
+        resultados[nome] = {chave: min(m[chave] for m in medicoes) for chave in medicoes[0]}
+    return resultados
+
+
+# --------------- CARGA DO CSV ----------------
+def _carregar_dados_legado(caminho):
+    # Implementação anterior de carregar_dados_anime (leitura eager + map_elements por linha)
+    df = pl.read_csv(caminho, null_values="Unknown")
+    df = df.filter(pl.col('Score').is_not_null() & pl.col('Genres').is_not_null())
+    df = df.with_columns([pl.col('Genres').str.split(', ').alias('Genres')])
+    df = df.with_columns([
+        pl.col('Genres').list.eval(
+            pl.when(pl.element() == pl.lit("Hentai")).then(pl.lit("Adult Content")).otherwise(pl.element())
+        ).alias("Genres")
+    ])
+    df = df.with_columns(
+        pl.col("Genres").map_elements(lambda genres: ", ".join(sorted(genres)), return_dtype=pl.String)
+        .alias("Genres_combination")
+    )
+    return df
+
+
+def cronometrar(funcao, repeticoes=5):
+    """Menor tempo (s) de `repeticoes` execuções de funcao()."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def bench_carga(fatores=(1, 10)):
+    """
+    Antes/depois de carregar_dados_anime. O fator 1 usa databases/anime.csv quando
+    ele existe (arquivo real do Kaggle); os demais usam réplicas sintéticas.
+    """
+    from anime import CAMINHO_ANIME_CSV, carregar_dados_anime
+
+    resultados = {}
+    for fator in fatores:
+        if fator == 1 and os.path.exists(CAMINHO_ANIME_CSV):
+            caminho, nome = CAMINHO_ANIME_CSV, "kaggle"
+        else:
+            caminho = os.path.join(tempfile.mkdtemp(prefix="anime_bench_"), "anime.csv")
+            gerar_catalogo_sintetico(caminho, fator=fator)
+            nome = f"sintetico_{fator}x"
+        legado = _carregar_dados_legado(caminho)
+        atual = carregar_dados_anime(caminho)
+        assert legado["Genres_combination"].equals(atual["Genres_combination"])
+        resultados[nome] = {
+            "legado": cronometrar(lambda: _carregar_dados_legado(caminho)),
+            "atual": cronometrar(lambda: carregar_dados_anime(caminho)),
+        }
+    return resultados
+
+
+# --------------- CONSULTAS POR GÊNERO ----------------
+def recursos_sinteticos(fator=1):
+    """Muda o diretório de trabalho para um catálogo sintético e constrói os recursos de anime.py."""
+    import anime
+
+    os.chdir(preparar_diretorio(fator))
+    return anime.construir_recursos()
+
+
+def consultas_aleatorias(n_generos, quantidade=200, semente=7):
+    rng = np.random.default_rng(semente)
+    consultas = []
+    for _ in range(quantidade):
+        marcados = rng.choice(n_generos, size=rng.integers(1, 4), replace=False)
+        booleans = np.zeros(n_generos, dtype=bool)
+        booleans[marcados] = True
+        consultas.append(booleans.tolist())
+    return consultas
+
+
+def _get_top_animes_by_genres_legado(generos_booleans, n, df_treino):
+    # Implementação anterior: máscaras sobre o DataFrame inteiro a cada consulta
+    generos_cols = df_treino.drop('Score', 'MAL_ID').columns
+    generos_array = np.array(df_treino[generos_cols]) == True
+    generos_booleans = np.array(generos_booleans, dtype=bool)
+    mask_exata = np.all(generos_array == generos_booleans, axis=1)
+    mask_contem = np.all(generos_array[:, generos_booleans] == True, axis=1)
+    df_exato = df_treino.filter(mask_exata).sort('Score', descending=True)
+    df_extra = df_treino.filter(mask_contem & ~mask_exata).sort('Score', descending=True)
+    return pl.concat([df_exato, df_extra]).head(n).select(['MAL_ID'])
+
+
+def consultas_por_segundo(funcao, consultas):
+    inicio = time.perf_counter()
+    for consulta in consultas:
+        funcao(consulta)
+    return len(consultas) / (time.perf_counter() - inicio)
+
+
+def bench_consultas(fator=1, n=10):
+    """Consultas por segundo das buscas por gênero: implementações anteriores x índices."""
+    import anime
+
+    recursos = recursos_sinteticos(fator)
+    anime.snapshots.trocar(recursos)
+    df = recursos.df_para_encontrar
+    consultas = consultas_aleatorias(len(recursos.indice_generos.colunas))
+    for consulta in consultas[:20]:
+        esperado = _get_top_animes_by_genres_legado(consulta, n, df).join(df, on='MAL_ID', how='left')
+        obtido = anime.get_top_animes_by_genres(consulta, n).join(df, on='MAL_ID', how='left')
+        assert sorted(esperado['Score'].to_list()) == sorted(obtido['Score'].to_list())
+        obtido = anime.get_top_animes(consulta, n).join(df, on='MAL_ID', how='left')
+        assert sorted(esperado['Score'].to_list()) == sorted(obtido['Score'].to_list())
+
+    # "contém algum gênero": varredura com list.contains (cópia do frame) x união das listas de postagem
+    from anime import obter_recomendacoes_por_filtros
+
+    df_clean = recursos.df_clean
+    df_copia = df_clean.clone()
+    generos = recursos.indice_invertido.generos
+    nomes = [[g for g, marcado in zip(generos, c) if marcado] for c in consultas]
+    for selecao in nomes[:20]:
+        esperado = obter_recomendacoes_por_filtros(df_copia, selecao, 6.0, n)
+        obtido = obter_recomendacoes_por_filtros(df_clean, selecao, 6.0, n)
+        assert esperado['Score'].to_list() == obtido['Score'].to_list()
+    return {
+        "get_top_animes_by_genres": {
+            "legado_qps": consultas_por_segundo(lambda c: _get_top_animes_by_genres_legado(c, n, df), consultas),
+            "bitset_qps": consultas_por_segundo(lambda c: anime.get_top_animes_by_genres(c, n), consultas),
+            "invertido_qps": consultas_por_segundo(lambda c: anime.get_top_animes(c, n), consultas),
+        },
+        "obter_recomendacoes_por_filtros": {
+            "varredura_qps": consultas_por_segundo(
+                lambda s: obter_recomendacoes_por_filtros(df_copia, s, 6.0, n), nomes),
+            "invertido_qps": consultas_por_segundo(
+                lambda s: obter_recomendacoes_por_filtros(df_clean, s, 6.0, n), nomes),
+        },
+    }
+
+
+# --------------- PREDIÇÃO ----------------
+def bench_predicao(fator=1, quantidade=2000):
+    """Predições por segundo: predict_score_knn chamada a chamada x predict_score_knn_lote."""
+    import contextlib
+    import io
+
+    import anime
+
+    recursos = recursos_sinteticos(fator)
+    anime.snapshots.trocar(recursos)
+    modelo, df = recursos.modelo, recursos.df_para_ml
+    consultas = np.array(consultas_aleatorias(df.width - 1, quantidade=quantidade), dtype=bool)
+    lote = anime.predict_score_knn_lote(consultas)
+    with contextlib.redirect_stdout(io.StringIO()):
+        # model/df_treino explícitos: sem o cache de resultados, para medir só a predição
+        unitario = [anime.predict_score_knn(c, model=modelo, df_treino=df) for c in consultas[:50]]
+        assert np.allclose(unitario, lote[:50])
+        return {
+            "predict_score_knn": {
+                "unitario_qps": consultas_por_segundo(
+                    lambda c: anime.predict_score_knn(c, model=modelo, df_treino=df), consultas[:200]),
+                "lote_qps": quantidade / cronometrar(lambda: anime.predict_score_knn_lote(consultas), 3),
+            }
+        }
+
+
+# --------------- VALIDAÇÃO CRUZADA ----------------
+def nucleos_disponiveis():
+    """Núcleos que este processo pode usar (a afinidade, quando o sistema informa; senão os da máquina)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def bench_validacao(fator=1, workers=None):
+    """
+    Tempo de parede do 10-fold e da varredura de n_neighbors com 1 a N processos, e a
+    aceleração de cada n_jobs sobre n_jobs=1 (tempo com 1 / tempo com n_jobs).
+    workers: valores de n_jobs (padrão: 1, 2, 4, ... até os núcleos disponíveis)
+    """
+    import anime
+
+    df = recursos_sinteticos(fator).df_para_ml
+    if workers is None:
+        nucleos = nucleos_disponiveis()
+        workers = {1, *[2 ** i for i in range(1, nucleos.bit_length())], nucleos}
+    resultados = {}
+    sequencial = None
+    for n_jobs in sorted({1, *workers}):
+        tempos = {
+            "train_and_evaluate_knn": cronometrar(lambda: anime.train_and_evaluate_knn(df, n_jobs=n_jobs), 1),
+            "varrer_n_neighbors": cronometrar(lambda: anime.varrer_n_neighbors(df, n_jobs=n_jobs), 1),
+        }
+        sequencial = sequencial or tempos
+        resultados[f"n_jobs={n_jobs}"] = {
+            **tempos, **{f"{nome}_aceleracao": sequencial[nome] / tempo for nome, tempo in tempos.items()},
+        }
+    return resultados
+
+
+# --------------- BACKENDS DE VIZINHOS ----------------
+def bench_vizinhos(fator=1, quantidade=1000):
+    """
+    Recall@k (contra o Hamming exato), MSE e latência de cada backend de vizinhos,
+    treinando no mesmo split do modelo do processo.
+    """
+    from sklearn.metrics import mean_squared_error
+    from sklearn.model_selection import KFold
+
+    from indices import empacotar_bits
+    from vizinhos import BACKENDS, criar_regressor, distancias_hamming
+
+    df = recursos_sinteticos(fator).df_para_ml
+    X, y = df.drop('Score').to_numpy(), df['Score'].to_numpy()
+    *_, (treino, teste) = KFold(n_splits=10, shuffle=True, random_state=42).split(X)
+    teste = teste[:quantidade]
+    X_treino, y_treino, X_teste, y_teste = X[treino], y[treino], X[teste], y[teste]
+    bits_treino, bits_teste = empacotar_bits(X_treino), empacotar_bits(X_teste)
+    exatas = np.sort(distancias_hamming(bits_teste, bits_treino), axis=1)[:, :5]
+
+    resultados = {}
+    for backend in BACKENDS:
+        modelo = criar_regressor(backend, 5)
+        t_fit = cronometrar(lambda: modelo.fit(X_treino, y_treino), 1)
+        t_pred = cronometrar(lambda: modelo.predict(X_teste), 3)
+        vizinhos = modelo.kneighbors(X_teste, return_distance=False)
+        obtidas = np.stack([distancias_hamming(bits_teste[i:i + 1], bits_treino[v])[0] for i, v in enumerate(vizinhos)])
+        # um vizinho conta como encontrado se está tão perto quanto o k-ésimo vizinho exato
+        recall = float(np.mean(obtidas <= exatas[:, -1:]))
+        resultados[backend] = {
+            "fit": t_fit,
+            "latencia_por_consulta": t_pred / len(X_teste),
+            "recall@5": recall,
+            "mse": mean_squared_error(y_teste, modelo.predict(X_teste)),
+        }
+    return resultados
+
+
+# --------------- SIMILARIDADE DE CONTEÚDO ----------------
+def bench_similares(fator=1, quantidade=500):
+    """Montagem da matriz de conteúdo e da tabela all-pairs, e consultas "mais como este" na hora x pré-calculadas."""
+    from similaridade import SimilaridadeConteudo, carregar_sinopses
+
+    recursos = recursos_sinteticos(fator)
+    sinopses = carregar_sinopses()
+    similaridade = SimilaridadeConteudo.construir(recursos.df_clean, recursos.generos_empacotados, sinopses)
+    tabela = similaridade.precomputar()
+    mal_ids = np.random.default_rng(7).choice(similaridade.mal_ids, size=quantidade)
+    return {
+        "montagem": {
+            "matriz": cronometrar(lambda: SimilaridadeConteudo.construir(
+                recursos.df_clean, recursos.generos_empacotados, sinopses), 1),
+            "all_pairs": cronometrar(similaridade.precomputar, 1),
+        },
+        "na_hora": {"consultas_qps": consultas_por_segundo(lambda m: similaridade.similares(m, 10), mal_ids)},
+        "lote": {"consultas_qps": quantidade / cronometrar(lambda: similaridade.similares_lote(mal_ids, 10), 3)},
+        "tabela": {"consultas_qps": consultas_por_segundo(lambda m: tabela.recomendar([m], 10), mal_ids)},
+    }
+
+
+# --------------- GRÁFICO DE DISPERSÃO ----------------
+def bench_dispersao(fatores=(1, 10, 100)):
+    """Tamanho do JSON e tempo de montagem da figura "Popularidade vs Nota" por tamanho de catálogo."""
+    from dashboard import figura_popularidade_vs_nota
+
+    df = recursos_sinteticos(1).df_clean
+    resultados = {}
+    for fator in fatores:
+        catalogo = pl.concat([df] * fator)
+        resultados[f"{fator}x ({catalogo.height} animes)"] = {
+            "montagem": cronometrar(lambda: figura_popularidade_vs_nota(catalogo).to_json(), 1),
+            "payload_kb": len(figura_popularidade_vs_nota(catalogo).to_json()) / 1024,
+        }
+    return resultados
+
+
+# --------------- INGESTÃO DAS AVALIAÇÕES ----------------
+_CODIGO_INGESTAO = """
+import json, sys, threading, time
+import polars as pl
+from avaliacoes import ESQUEMAS_CSV, carregar_avaliacoes
+
+# Pico de memória anônima (RssAnon): o ru_maxrss incluiria as páginas do CSV mapeado
+# em memória pelo polars, que são cache de arquivo e não memória do processo.
+pico = [0]
+def amostrar():
+    while True:
+        with open("/proc/self/status") as f:
+            kb = next(int(linha.split()[1]) for linha in f if linha.startswith("RssAnon"))
+        pico[0] = max(pico[0], kb)
+        time.sleep(0.005)
+threading.Thread(target=amostrar, daemon=True).start()
+time.sleep(0.05)
+
+t0 = time.perf_counter()
+if sys.argv[1] == "eager":
+    df = pl.read_csv("avaliacoes.csv", schema=ESQUEMAS_CSV["rating_complete"])
+else:
+    df = carregar_avaliacoes("rating_complete", "avaliacoes.csv", sys.argv[2])
+# soma em fatias: Series.sum() converteria a coluna inteira para Int64 antes de somar
+total = sum(int(fatia["rating"].sum()) for fatia in df.iter_slices(1_000_000))
+tempo = time.perf_counter() - t0
+time.sleep(0.05)
+print(json.dumps({"tempo": tempo, "pico_anon_mb": pico[0] / 1024, "total": total}))
+"""
+
+
+def bench_ingestao(fator=0.1):
+    """
+    Leitura eager do CSV x conversão em streaming para partições IPC/Parquet e releitura
+    delas, cada uma num processo novo para medir o pico de memória (Linux).
+    """
+    diretorio = tempfile.mkdtemp(prefix="anime_bench_")
+    gerar_avaliacoes_sinteticas(os.path.join(diretorio, "avaliacoes.csv"), fator=fator)
+    resultados = {}
+    # a primeira execução de cada formato converte o CSV; a segunda só reabre as partições
+    for nome, modo, formato in (("eager", "eager", ""), ("ipc", "streaming", "ipc"), ("ipc_releitura", "streaming", "ipc"),
+                                ("parquet", "streaming", "parquet"), ("parquet_releitura", "streaming", "parquet")):
+        codigo = f"import sys; sys.argv = ['', {modo!r}, {formato!r}]\n" + _CODIGO_INGESTAO
+        resultados[nome] = executar_em_processo_novo(codigo, diretorio)
+    assert len({r.pop("total") for r in resultados.values()}) == 1
+    return resultados
+
+
+# --------------- MATRIZ DE FEATURES ----------------
+_CODIGO_VALIDACAO_MEMORIA = """
+import json, threading, time
+import anime
+
+# Pico de memória anônima (RssAnon) do 10-fold, acima do que o processo já usava
+def rss():
+    with open("/proc/self/status") as f:
+        return next(int(linha.split()[1]) for linha in f if linha.startswith("RssAnon")) / 1024
+recursos = anime.construir_recursos()
+df = recursos.df_para_ml
+recursos.generos_empacotados
+base = rss()
+pico = [base]
+def amostrar():
+    while True:
+        pico[0] = max(pico[0], rss())
+        time.sleep(0.002)
+threading.Thread(target=amostrar, daemon=True).start()
+t0 = time.perf_counter()
+mse, _, _ = anime.train_and_evaluate_knn(df)
+tempo = time.perf_counter() - t0
+time.sleep(0.05)
+print(json.dumps({"tempo": tempo, "pico_anon_mb": pico[0] - base, "mse": mse}))
+"""
+
+
+def bench_features(fator=1):
+    """
+    Bytes de cada representação da matriz de gêneros (cópia float64 do sklearn, booleana,
+    CSR e bits empacotados) e pico de memória do 10-fold num processo novo (Linux).
+    """
+    recursos = recursos_sinteticos(fator)
+    generos = recursos.generos_empacotados
+    csr = generos.csr()
+    n, g = generos.shape
+    return {
+        "bytes": {
+            "float64_mb": n * g * 8 / 2 ** 20,
+            "bool_mb": n * g / 2 ** 20,
+            "csr_mb": (csr.data.nbytes + csr.indices.nbytes + csr.indptr.nbytes) / 2 ** 20,
+            "bits_mb": generos.nbytes / 2 ** 20,
+        },
+        "10-fold": executar_em_processo_novo(_CODIGO_VALIDACAO_MEMORIA, os.getcwd()),
+    }
+
+
+# --------------- API HTTP ----------------
+def _porta_livre():
+    import socket
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def iniciar_api(diretorio, porta, *argumentos, timeout=600):
+    """Sobe api.py num processo novo (cwd=diretorio) e espera /saude responder."""
+    from urllib.request import urlopen
+
+    env = dict(os.environ, PYTHONPATH=DIRETORIO_PROJETO)
+    processo = subprocess.Popen([sys.executable, os.path.join(DIRETORIO_PROJETO, "api.py"), "--porta", str(porta),
+                                 *argumentos], cwd=diretorio, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError("api.py terminou antes de responder")
+        try:
+            with urlopen(f"http://127.0.0.1:{porta}/saude", timeout=1) as resposta:
+                return processo, json.load(resposta)
+        except OSError:
+            time.sleep(0.2)
+    processo.terminate()
+    raise TimeoutError("api.py não respondeu a tempo")
+
+
+async def gerar_carga(url, corpos, concorrencia=64):
+    """
+    Envia cada um de `corpos` (JSON) por POST para `url`, com até `concorrencia` requisições
+    em voo. Retorna (latências em s, duração total em s).
+    """
+    from tornado.httpclient import AsyncHTTPClient
+
+    cliente = AsyncHTTPClient(force_instance=True, max_clients=concorrencia)
+    pendentes = iter(corpos)
+    latencias = []
+
+    async def trabalhador():
+        for corpo in pendentes:
+            inicio = time.perf_counter()
+            await cliente.fetch(url, method="POST", body=corpo)
+            latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    try:
+        await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+    finally:
+        cliente.close()
+    return latencias, time.perf_counter() - inicio
+
+
+def resumo_latencias(latencias, duracao):
+    return {
+        "p50": float(np.percentile(latencias, 50)),
+        "p99": float(np.percentile(latencias, 99)),
+        "vazao_qps": len(latencias) / duracao,
+    }
+
+
+def bench_api(fator=1, requisicoes=4000, concorrencia=64):
+    """
+    Latência (p50/p99) e vazão da API local (api.py) sob carga: /predicao com e sem o
+    agrupamento em lotes, e /top. Cada configuração roda num servidor novo.
+    """
+    diretorio = preparar_diretorio(fator)
+    consultas = consultas_aleatorias(len(GENEROS_KAGGLE), quantidade=requisicoes)
+    nomes = sorted(g if g != "Hentai" else "Adult Content" for g in GENEROS_KAGGLE)
+    corpos = [json.dumps({"generos": [g for g, marcado in zip(nomes, c) if marcado]}) for c in consultas]
+    resultados = {}
+    for nome, rota, argumentos in (("predicao_lote", "predicao", ()),
+                                   ("predicao_sem_lote", "predicao", ("--max-lote", "1")),
+                                   ("top", "top", ())):
+        porta = _porta_livre()
+        processo, _ = iniciar_api(diretorio, porta, *argumentos)
+        try:
+            url = f"http://127.0.0.1:{porta}/{rota}"
+            asyncio.run(gerar_carga(url, corpos[:200], concorrencia))
+            resultados[nome] = resumo_latencias(*asyncio.run(gerar_carga(url, corpos, concorrencia)))
+        finally:
+            processo.terminate()
+            processo.wait()
+    return resultados
+
+
+# --------------- RECARGA A QUENTE ----------------
+def _latencias_recarga(gerenciador, consultas, depois=200):
+    """
+    Consulta sem parar enquanto `gerenciador` recarrega e `depois` vezes após a troca.
+    consultas: conjuntos de colunas de gêneros. Retorna (latências durante, latências depois) em s.
+    """
+    import anime
+
+    def consultar(consulta):
+        inicio = time.perf_counter()
+        recursos = anime.obter_recursos()
+        # consultas por nome de coluna: o catálogo novo pode ter outro conjunto de gêneros
+        linha = [coluna in consulta for coluna in recursos.colunas_features]
+        anime.get_top_animes(linha, 10, recursos=recursos)
+        anime.predict_score_knn_lote([linha], recursos.modelo, recursos.df_para_ml)
+        return time.perf_counter() - inicio
+
+    durante = []
+    gerenciador.recarregar()
+    while gerenciador.recarregando:
+        durante.append(consultar(consultas[len(durante) % len(consultas)]))
+    return durante, [consultar(c) for c in consultas[:depois]]
+
+
+def bench_recarga(fator=1):
+    """
+    Latência das consultas (obter_recursos + top por gêneros + predição) enquanto um anime.csv
+    novo é recarregado em segundo plano e logo após a troca, com e sem o aquecimento do
+    snapshot novo. Confere também que o snapshot anterior foi liberado.
+    """
+    import gc
+
+    import anime
+    from snapshots import GerenciadorSnapshots
+
+    diretorio_original = os.getcwd()
+    gerenciador_original = anime.snapshots
+    resultados = {}
+    try:
+        for nome, aquecer in (("com_aquecimento", anime.aquecer_recursos), ("sem_aquecimento", None)):
+            recursos = recursos_sinteticos(fator)
+            gerenciador = GerenciadorSnapshots(anime.construir_recursos, aquecer, anime.versao_dados_atual)
+            anime.snapshots = gerenciador
+            anime.aquecer_recursos(recursos)
+            gerenciador.trocar(recursos)
+            colunas = recursos.colunas_features
+            consultas = [{c for c, marcado in zip(colunas, consulta) if marcado}
+                         for consulta in consultas_aleatorias(len(colunas))]
+            del recursos
+            gerar_catalogo_sintetico(os.path.join("databases", "anime.csv"), fator=fator, semente=43)
+            inicio = time.perf_counter()
+            durante, depois = _latencias_recarga(gerenciador, consultas)
+            if gerenciador.erro is not None:
+                raise gerenciador.erro
+            duracao = time.perf_counter() - inicio
+            gc.collect()
+            # ninguém mais segura o snapshot anterior: ele deve ter sido liberado
+            assert gerenciador.liberados == 1, "snapshot anterior não foi liberado"
+            resultados[nome] = {
+                "recarga": duracao,
+                "durante_p99": float(np.percentile(durante, 99)),
+                "durante_max": max(durante),
+                "depois_p50": float(np.percentile(depois, 50)),
+                "depois_max": max(depois),
+            }
+            diretorio_catalogo = os.getcwd()
+            os.chdir(diretorio_original)
+            shutil.rmtree(diretorio_catalogo, ignore_errors=True)
+    finally:
+        anime.snapshots = gerenciador_original
+        os.chdir(diretorio_original)
+    return resultados
+
+
+# --------------- SUÍTE DE REGRESSÃO ----------------
+FATORES_SUITE = (1, 10, 100)
+# 10 folds de KNN já levam ~3,5 min com 10x o catálogo: acima deste fator o caso é pulado
+FATOR_MAXIMO = {'train_and_evaluate_knn': 1}
+CAMINHO_BASELINE = os.path.join(DIRETORIO_PROJETO, "benchmark_baseline.json")
+# razão tempo atual / baseline acima de 1 + TOLERANCIA_REGRESSAO conta como regressão
+TOLERANCIA_REGRESSAO = 0.25
+
+
+def medir(funcao, repeticoes=5, antes=None, operacoes=1):
+    """
+    Menor tempo e mediana (s) de `repeticoes` execuções de funcao().
+    antes: chamada fora do cronômetro antes de cada execução (ex.: limpar caches)
+    operacoes: quantas operações cada execução faz (só informativo)
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        if antes is not None:
+            antes()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return {"min_s": min(tempos), "mediana_s": float(np.median(tempos)), "repeticoes": repeticoes,
+            "operacoes": operacoes}
+
+
+def casos_suite(recursos, quantidade=200):
+    """
+    Casos da suíte sobre os recursos de um catálogo (o diretório de trabalho deve ser o dele).
+    Retorna dict nome -> (funcao, repeticoes, antes, operacoes).
+    """
+    import contextlib
+    import io
+
+    import anime
+    from agregados import AgregadosDashboard
+    from anime import obter_recomendacoes_por_filtros
+
+    df_clean, df_ml = recursos.df_clean, recursos.df_para_ml
+    consultas = consultas_aleatorias(df_ml.width - 1, quantidade=quantidade)
+    generos = recursos.indice_invertido.generos
+    selecoes = [[g for g, marcado in zip(generos, c) if marcado] for c in consultas]
+    # as consultas passam pelo cache de resultados da versão: ele é limpo antes de cada repetição
+    limpar = recursos.cache_consultas.limpar
+
+    def predicoes():
+        # model/df_treino explícitos: sem o cache de predições; o print de predict_score_knn é descartado
+        with contextlib.redirect_stdout(io.StringIO()):
+            for consulta in consultas:
+                anime.predict_score_knn(consulta, model=recursos.modelo, df_treino=df_ml)
+
+    def agregados_dashboard():
+        # os agregados e as visões que cria_pagina_dashboard exibe
+        agregados = AgregadosDashboard.calcular(df_clean)
+        agregados.kpis()
+        for visao in (agregados.genero_freq, agregados.genero_score, agregados.combo_freq,
+                      agregados.studio_avg_simples, agregados.score_dist):
+            visao()
+
+    return {
+        "carregar_dados_anime": (anime.carregar_dados_anime, 5, None, 1),
+        "one_hot_encode": (
+            lambda: anime.one_hot_encode(df_clean.select(['MAL_ID', 'Genres', 'Score']), 'Genres'), 5, None, 1),
+        "train_and_evaluate_knn": (lambda: anime.train_and_evaluate_knn(df_ml), 1, None, 1),
+        "predict_score_knn": (predicoes, 3, lambda: recursos.modelo, len(consultas)),
+        "get_top_animes+get_anime_info": (
+            lambda: [anime.get_anime_info(anime.get_top_animes(c, 10)) for c in consultas], 5, limpar, len(consultas)),
+        "obter_recomendacoes_por_filtros": (
+            lambda: [obter_recomendacoes_por_filtros(df_clean, s, 6.0, 10) for s in selecoes], 5, limpar, len(selecoes)),
+        "agregados_dashboard": (agregados_dashboard, 5, None, 1),
+    }
+
+
+def ambiente():
+    """Versões e máquina em que a suíte rodou (gravados junto dos resultados)."""
+    import sklearn
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=DIRETORIO_PROJETO,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "polars": pl.__version__,
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "maquina": f"{platform.system()} {platform.machine()}",
+        "nucleos": os.cpu_count(),
+        "nucleos_disponiveis": nucleos_disponiveis(),
+    }
+
+
+def bench_suite(fatores=FATORES_SUITE):
+    """Roda os casos da suíte em catálogos sintéticos de cada fator; retorna o documento JSON dos resultados."""
+    import anime
+
+    diretorio_original = os.getcwd()
+    resultados = {}
+    for fator in fatores:
+        recursos = recursos_sinteticos(fator)
+        anime.snapshots.trocar(recursos)
+        try:
+            medidas = {}
+            for nome, (funcao, repeticoes, antes, operacoes) in casos_suite(recursos).items():
+                if fator > FATOR_MAXIMO.get(nome, float("inf")):
+                    continue
+                medidas[nome] = medir(funcao, repeticoes, antes, operacoes)
+            resultados[f"{fator:g}x"] = medidas
+        finally:
+            anime.snapshots.trocar(None)
+            diretorio_catalogo = os.getcwd()
+            os.chdir(diretorio_original)
+            shutil.rmtree(diretorio_catalogo, ignore_errors=True)
+    return {"ambiente": ambiente(), "resultados": resultados}
+
+
+def comparar_baseline(atual, baseline, tolerancia=TOLERANCIA_REGRESSAO):
+    """
+    Razão min_s atual / baseline de cada caso presente nos dois documentos.
+    Retorna lista de (catálogo, caso, razão, regrediu), na ordem dos resultados atuais.
+    """
+    comparacoes = []
+    for catalogo, medidas in atual["resultados"].items():
+        anteriores = baseline["resultados"].get(catalogo, {})
+        for caso, medida in medidas.items():
+            if caso in anteriores:
+                razao = medida["min_s"] / anteriores[caso]["min_s"]
+                comparacoes.append((catalogo, caso, razao, razao > 1 + tolerancia))
+    return comparacoes
+
+
+def gravar_json(documento, caminho):
+    tmp = f"{caminho}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(documento, f, indent=2)
+        f.write("\n")
+    os.replace(tmp, caminho)
+
+
+def executar_suite(fatores, saida=None, caminho_baseline=CAMINHO_BASELINE, tolerancia=TOLERANCIA_REGRESSAO,
+                   gravar_baseline=False):
+    """Roda a suíte, grava os resultados e compara com o baseline. Retorna o número de regressões."""
+    documento = bench_suite(fatores)
+    for catalogo, medidas in documento["resultados"].items():
+        print(f"--- {catalogo}")
+        for caso, m in medidas.items():
+            print(f"{caso:<32} min={m['min_s'] * 1000:10.3f} ms  mediana={m['mediana_s'] * 1000:10.3f} ms")
+    if saida:
+        gravar_json(documento, saida)
+    if gravar_baseline:
+        gravar_json(documento, caminho_baseline)
+        print(f"Baseline gravado em {caminho_baseline}")
+        return 0
+    if not os.path.exists(caminho_baseline):
+        print(f"Sem baseline em {caminho_baseline} (use --gravar-baseline)")
+        return 0
+    with open(caminho_baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline["ambiente"]["maquina"] != documento["ambiente"]["maquina"] or \
+            baseline["ambiente"]["nucleos"] != documento["ambiente"]["nucleos"]:
+        print("Aviso: o baseline foi medido em outra máquina; as razões são só indicativas")
+    regressoes = 0
+    print(f"--- comparação com o baseline ({baseline['ambiente'].get('commit')}, tolerância {tolerancia:.0%})")
+    for catalogo, caso, razao, regrediu in comparar_baseline(documento, baseline, tolerancia):
+        regressoes += regrediu
+        print(f"{catalogo:<6} {caso:<32} {razao:6.2f}x {'REGRESSÃO' if regrediu else 'ok'}")
+    return regressoes
+
+
+def imprimir_tabela(resultados):
+    for nome, medidas in resultados.items():
+        campos = "  ".join(
+            f"{chave}={valor:9.1f}" if chave.endswith("qps")
+            else f"{chave}={valor:7.4f}" if chave.startswith(("recall", "mse"))
+            else f"{chave}={valor:9.1f}" if chave.endswith(("kb", "mb"))
+            else f"{chave}={valor:6.2f}x" if chave.endswith("aceleracao")
+            else f"{chave}={valor * 1000:9.3f} ms"
+            for chave, valor in medidas.items()
+        )
+        print(f"{nome:<10} {campos}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks do anime_analysis")
+    parser.add_argument("bench", choices=["inicializacao", "carga", "consultas", "predicao", "validacao", "vizinhos",
+                                          "dispersao", "ingestao", "similares", "features", "api", "recarga", "suite"])
+    parser.add_argument("--fator", type=float, default=1, help="tamanho do catálogo sintético (x Kaggle)")
+    parser.add_argument("--fatores", type=float, nargs="+", default=FATORES_SUITE, help="catálogos da suíte (x Kaggle)")
+    parser.add_argument("--n-jobs", type=int, nargs="+", default=None,
+                        help="valores de n_jobs da validação (padrão: 1, 2, 4, ... até os núcleos disponíveis)")
+    parser.add_argument("--saida", default=None, help="arquivo JSON para os resultados da suíte")
+    parser.add_argument("--baseline", default=CAMINHO_BASELINE, help="resultados de referência da suíte")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_REGRESSAO)
+    parser.add_argument("--gravar-baseline", action="store_true", help="grava os resultados como novo baseline")
+    args = parser.parse_args()
+    if args.bench == "suite":
+        sys.exit(1 if executar_suite(args.fatores, args.saida, args.baseline, args.tolerancia,
+                                     args.gravar_baseline) else 0)
+    elif args.bench == "inicializacao":
+        imprimir_tabela(bench_inicializacao(args.fator))
+    elif args.bench == "carga":
+        imprimir_tabela(bench_carga())
+    elif args.bench == "consultas":
+        imprimir_tabela(bench_consultas(args.fator))
+    elif args.bench == "predicao":
+        imprimir_tabela(bench_predicao(args.fator))
+    elif args.bench == "validacao":
+        print(f"núcleos disponíveis: {nucleos_disponiveis()} (máquina: {os.cpu_count()})")
+        imprimir_tabela(bench_validacao(args.fator, args.n_jobs))
+    elif args.bench == "vizinhos":
+        imprimir_tabela(bench_vizinhos(args.fator))
+    elif args.bench == "dispersao":
+        imprimir_tabela(bench_dispersao())
+    elif args.bench == "similares":
+        imprimir_tabela(bench_similares(args.fator))
+    elif args.bench == "api":
+        imprimir_tabela(bench_api(args.fator))
+    elif args.bench == "recarga":
+        imprimir_tabela(bench_recarga(args.fator))
+    elif args.bench == "features":
+        imprimir_tabela(bench_features(args.fator))
+    elif args.bench == "ingestao":
+        imprimir_tabela(bench_ingestao(args.fator))
@@ -0,0 +1,97 @@
+"""
+Cache em disco de artefatos pré-processados.
+
+Os artefatos são gravados em Arrow IPC sem compressão e reabertos com memory map,
+então vários processos do Streamlit no mesmo host compartilham as mesmas páginas
+do cache do sistema operacional em vez de cada um manter sua cópia.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+import polars as pl
+
+DIRETORIO_CACHE = os.path.join("databases", "cache")
+# Incrementar quando o pré-processamento mudar, para invalidar os caches antigos
+VERSAO_PREPROCESSAMENTO = 5
+
+_indice_lock = threading.Lock()
+
+
+def _hash_arquivo(caminho):
+    h = hashlib.blake2b(digest_size=16)
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def chave_arquivo(caminho, diretorio_cache=DIRETORIO_CACHE):
+    """
+    Retorna o hash do conteúdo de `caminho` combinado com VERSAO_PREPROCESSAMENTO.
+    O hash é memorizado por (tamanho, mtime) em fontes.json para não reler o arquivo a cada início.
+    """
+    estado = os.stat(caminho)
+    assinatura = [estado.st_size, estado.st_mtime_ns]
+    caminho_indice = os.path.join(diretorio_cache, "fontes.json")
+    chave_indice = os.path.abspath(caminho)
+    with _indice_lock:
+        try:
+            with open(caminho_indice, encoding="utf-8") as f:
+                indice = json.load(f)
+        except (OSError, ValueError):
+            indice = {}
+        registro = indice.get(chave_indice)
+        if registro is None or registro["assinatura"] != assinatura:
+            registro = {"assinatura": assinatura, "hash": _hash_arquivo(caminho)}
+            indice[chave_indice] = registro
+            os.makedirs(diretorio_cache, exist_ok=True)
+            _substituir_atomicamente(caminho_indice, lambda tmp: _escrever_json(indice, tmp))
+    return f"v{VERSAO_PREPROCESSAMENTO}-{registro['hash']}"
+
+
+def _escrever_json(dados, caminho):
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(dados, f)
+
+
+def _substituir_atomicamente(caminho, escrever):
+    # Escreve num arquivo temporário e troca com os.replace: leitores nunca veem um arquivo pela metade
+    # e quem já tem o arquivo antigo mapeado em memória continua lendo o conteúdo antigo.
+    tmp = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        escrever(tmp)
+        os.replace(tmp, caminho)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def caminho_artefato(chave, nome, diretorio_cache=DIRETORIO_CACHE):
+    return os.path.join(diretorio_cache, chave, f"{nome}.arrow")
+
+
+def salvar_frames(chave, frames, diretorio_cache=DIRETORIO_CACHE):
+    """Grava cada DataFrame de `frames` (dict nome -> DataFrame) em <cache>/<chave>/<nome>.arrow."""
+    os.makedirs(os.path.join(diretorio_cache, chave), exist_ok=True)
+    for nome, df in frames.items():
+        _substituir_atomicamente(
+            caminho_artefato(chave, nome, diretorio_cache),
+            lambda tmp, df=df: df.write_ipc(tmp, compression="uncompressed"),
+        )
+
+
+def carregar_frames(chave, nomes, diretorio_cache=DIRETORIO_CACHE):
+    """
+    Reabre com memory map os frames gravados por salvar_frames.
+    Retorna None se algum deles não existir ou estiver ilegível.
+    """
+    caminhos = [caminho_artefato(chave, nome, diretorio_cache) for nome in nomes]
+    if not all(os.path.exists(c) for c in caminhos):
+        return None
+    try:
+        return {nome: pl.read_ipc(c, memory_map=True) for nome, c in zip(nomes, caminhos)}
+    except (OSError, pl.exceptions.PolarsError):
+        return None
@@ -0,0 +1,74 @@
+"""
+Cache entre sessões das figuras Plotly do dashboard, já serializadas em JSON.
+
+As figuras dependem só da versão dos dados, então a chave é (versão, id do gráfico); o tema
+do Streamlit é aplicado no navegador e não muda o JSON. Em memória fica também a go.Figure
+montada do JSON, que o dashboard passa ao st.plotly_chart sem rodar o Plotly Express de novo.
+Há dois níveis: memória do processo (LRU limitado em bytes) e, opcionalmente, disco em
+<cache>/<versão>/figuras/, para que um worker novo sirva o dashboard sem montar figura alguma.
+"""
+
+import os
+
+import plotly.io as pio
+
+from cache_disco import DIRETORIO_CACHE
+from cache_resultados import CacheLRU
+
+MAX_BYTES_FIGURAS = 64 * 1024 * 1024
+
+
+class CacheFiguras:
+    """
+    max_bytes: limite do nível em memória (soma dos JSONs)
+    diretorio_cache: raiz do nível em disco (None desliga o disco)
+    """
+
+    def __init__(self, max_bytes=MAX_BYTES_FIGURAS, diretorio_cache=DIRETORIO_CACHE):
+        # valores em memória: (json, go.Figure montada a partir dele); o custo é o tamanho do json
+        self.memoria = CacheLRU(max_itens=1024, max_custo=max_bytes, custo=lambda valor: len(valor[0]))
+        self.diretorio_cache = diretorio_cache
+        self.leituras_disco = 0
+
+    def _caminho(self, versao, grafico):
+        return os.path.join(self.diretorio_cache, versao, "figuras", f"{grafico}.json")
+
+    def _do_disco_ou_construir(self, versao, grafico, construir):
+        caminho = self._caminho(versao, grafico) if self.diretorio_cache else None
+        if caminho is not None and os.path.exists(caminho):
+            with open(caminho, encoding="utf-8") as f:
+                self.leituras_disco += 1
+                return f.read()
+        spec = construir().to_json()
+        if caminho is not None:
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            tmp = f"{caminho}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(spec)
+            os.replace(tmp, caminho)
+        return spec
+
+    def _entrada(self, versao, grafico, construir):
+        def carregar():
+            spec = self._do_disco_ou_construir(versao, grafico, construir)
+            return spec, pio.from_json(spec)
+
+        return self.memoria.obter((versao, grafico), carregar)
+
+    def spec(self, versao, grafico, construir):
+        """JSON da figura `grafico`; construir() (que devolve uma go.Figure) só roda se nenhum nível tiver a figura."""
+        return self._entrada(versao, grafico, construir)[0]
+
+    def figura(self, versao, grafico, construir):
+        """
+        go.Figure do gráfico, montada uma vez por processo a partir do JSON em cache.
+        É compartilhada entre sessões: quem a recebe não deve alterá-la.
+        """
+        return self._entrada(versao, grafico, construir)[1]
+
+    def estatisticas(self):
+        return dict(self.memoria.estatisticas(), leituras_disco=self.leituras_disco)
+
+
+# Instância do processo, compartilhada por todas as sessões do Streamlit
+cache_figuras = CacheFiguras()
@@ -0,0 +1,77 @@
+"""
+Cache de resultados em memória com limite de itens (LRU) e validade opcional (TTL).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheLRU:
+    """
+    max_itens: quantidade máxima de entradas; a usada há mais tempo é descartada primeiro
+    ttl: validade de cada entrada em segundos (None = sem validade)
+    max_custo / custo: limite opcional da soma de custo(valor) das entradas (ex.: bytes com custo=len)
+    """
+
+    def __init__(self, max_itens=1024, ttl=None, relogio=time.monotonic, max_custo=None, custo=None):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self.max_custo = max_custo
+        self._custo = custo or (lambda valor: 0)
+        self._relogio = relogio
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self.custo_total = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.despejos = 0
+
+    def __len__(self):
+        return len(self._itens)
+
+    def obter(self, chave, calcular):
+        """Retorna o valor de `chave`, chamando calcular() e guardando o resultado se não estiver no cache."""
+        agora = self._relogio()
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None and (self.ttl is None or agora - item[1] < self.ttl):
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return item[0]
+            if item is not None:
+                # expirado
+                self._remover(chave)
+                self.despejos += 1
+            self.falhas += 1
+        # calculado fora do lock: consultas diferentes não esperam umas pelas outras
+        valor = calcular()
+        custo = self._custo(valor)
+        with self._lock:
+            if chave in self._itens:
+                self._remover(chave)
+            self._itens[chave] = (valor, agora, custo)
+            self.custo_total += custo
+            while len(self._itens) > self.max_itens or (
+                    self.max_custo is not None and self.custo_total > self.max_custo and len(self._itens) > 1):
+                self._remover(next(iter(self._itens)))
+                self.despejos += 1
+        return valor
+
+    def _remover(self, chave):
+        self.custo_total -= self._itens.pop(chave)[2]
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self.custo_total = 0
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'despejos': self.despejos,
+                'itens': len(self._itens),
+                'custo_total': self.custo_total,
+            }
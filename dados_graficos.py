@@ -0,0 +1,66 @@
+"""
+Camada de dados dos gráficos do dashboard.
+
+Ordenação, corte (head) e seleção de colunas acontecem no polars, e o DataFrame polars
+resultante vai direto para o Plotly Express (suportado nativamente via narwhals), sem
+passar por pandas. Colunas numéricas sem nulos chegam ao Plotly como views NumPy dos
+buffers Arrow (zero cópia); as demais (texto, nulos) precisam ser copiadas, e essas
+cópias são contabilizadas por ContadorCopias.
+"""
+
+import logging
+
+import polars as pl
+
+logger = logging.getLogger(__name__)
+
+
+def bytes_copiados(serie):
+    """Bytes que a conversão da série para NumPy precisa copiar (0 se der para usar o buffer Arrow)."""
+    try:
+        serie.to_numpy(allow_copy=False)
+        return 0
+    except (RuntimeError, pl.exceptions.PolarsError, ValueError):
+        return serie.estimated_size()
+
+
+class ContadorCopias:
+    """Acumula, ao longo de um render, quantos bytes foram entregues ao Plotly com e sem cópia."""
+
+    def __init__(self):
+        self.bytes_copiados = 0
+        self.bytes_zero_copia = 0
+        self.por_grafico = {}
+
+    def registrar(self, nome, df):
+        copiados = sum(bytes_copiados(df[coluna]) for coluna in df.columns)
+        self.bytes_copiados += copiados
+        self.bytes_zero_copia += df.estimated_size() - copiados
+        self.por_grafico[nome] = copiados
+
+    def resumo(self):
+        return {
+            'bytes_copiados': self.bytes_copiados,
+            'bytes_zero_copia': self.bytes_zero_copia,
+            'por_grafico': dict(self.por_grafico),
+        }
+
+
+def dados_grafico(df, colunas, ordenar_por=None, decrescente=False, limite=None, nome=None, contador=None):
+    """
+    Prepara o DataFrame polars de um gráfico: ordena, corta e seleciona só as colunas usadas.
+    Se `contador` for informado, registra os bytes que serão copiados na entrega ao Plotly.
+    """
+    if ordenar_por is not None:
+        df = df.sort(ordenar_por, descending=decrescente)
+    if limite is not None:
+        df = df.head(limite)
+    df = df.select(colunas)
+    if contador is not None:
+        contador.registrar(nome or ', '.join(colunas), df)
+    return df
+
+
+def registrar_render(pagina, contador):
+    logger.info("render %s: %d bytes copiados, %d bytes sem cópia (%s)", pagina,
+                contador.bytes_copiados, contador.bytes_zero_copia, contador.por_grafico)
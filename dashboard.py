@@ -1,20 +1,115 @@
 import streamlit as st
 import polars as pl
 import plotly.express as px
+import plotly.graph_objects as go
+
+from agregados import AgregadosDashboard
+from cache_figuras import cache_figuras
+from dados_graficos import ContadorCopias, dados_grafico, registrar_render
+
+# Acima deste número de animes o gráfico "Popularidade vs Nota" passa a ser agregado em bins
+LIMITE_PONTOS_DISPERSAO = 20000
+BINS_DISPERSAO = (50, 30)  # (Score, log10 Members)
+TOP_K_DESTAQUES = 15
 
 # --------------- FUNÇÃO DE GRÁFICO EM CARD ----------------
-def grafico_card(title, fig):
+def grafico_card(title, fig, tema="streamlit"):
     with st.container():
         st.markdown(f"<div class='card'><h4 style='margin-bottom:10px'>{title}</h4>", unsafe_allow_html=True)
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True, theme=tema)
         st.markdown("</div>", unsafe_allow_html=True)
 
 
-def cria_pagina_dashboard(df_inicial, df_explodidos, generos_usados):
-    total_animes = df_inicial.shape[0]
-    total_membros = df_inicial.select(pl.col("Members")).sum()[0, 0]
-    total_generos = len(generos_usados)
-    media_nota = df_inicial.select(pl.col("Score").mean()).item()
+def dispersao_em_bins(df_inicial, bins=BINS_DISPERSAO, top_k=TOP_K_DESTAQUES):
+    """
+    Agrega Score x Members numa grade (Score linear, Members em escala log) e separa os
+    destaques: os top_k mais populares e os top_k de maior nota, que continuam rotulados.
+    Retorna (bins, destaques); o tamanho de ambos independe do tamanho do catálogo.
+    """
+    df = df_inicial.select(['Score', 'Members', 'Name']).filter(pl.col('Members') > 0)
+    n_score, n_membros = bins
+    log_membros = pl.col('Members').log10()
+    limites = df.select(
+        pl.col('Score').min().alias('s_min'), pl.col('Score').max().alias('s_max'),
+        log_membros.min().alias('m_min'), log_membros.max().alias('m_max'),
+    ).row(0, named=True)
+
+    def indice_bin(expr, minimo, maximo, n):
+        largura = (maximo - minimo) or 1.0
+        return ((expr - minimo) / largura * n).floor().clip(0, n - 1).cast(pl.Int32)
+
+    df_bins = df.group_by(
+        indice_bin(pl.col('Score'), limites['s_min'], limites['s_max'], n_score).alias('bin_score'),
+        indice_bin(log_membros, limites['m_min'], limites['m_max'], n_membros).alias('bin_membros'),
+    ).agg(
+        pl.len().alias('Animes'),
+        pl.col('Score').mean().alias('Score'),
+        # média geométrica: o centro do bin no eixo log
+        (10 ** log_membros.mean()).alias('Members'),
+    )
+    destaques = pl.concat([df.top_k(top_k, by='Members'), df.top_k(top_k, by='Score')]).unique(maintain_order=True)
+    return df_bins, destaques
+
+
+def figura_popularidade_vs_nota(df_inicial, limite_pontos=LIMITE_PONTOS_DISPERSAO, webgl=True, contador=None):
+    """
+    Até `limite_pontos` animes, um ponto por anime (como antes); acima disso, a versão
+    agregada de dispersao_em_bins. webgl=True usa traces WebGL (Scattergl).
+    """
+    if df_inicial.height <= limite_pontos:
+        relacao_pop = dados_grafico(df_inicial, ['Score', 'Members', 'Name'], nome='relacao_pop', contador=contador)
+        fig = px.scatter(relacao_pop, x='Score', y='Members',
+                         size='Members',
+                         color='Score',  # Mantém a cor baseada no Score
+                         hover_name='Name',
+                         color_continuous_scale=px.colors.sequential.Turbo,
+                         render_mode='webgl' if webgl else 'svg')
+        fig.update_traces(marker=dict(line=dict(width=1, color='white')))
+        return fig
+
+    df_bins, destaques = dispersao_em_bins(df_inicial)
+    if contador is not None:
+        contador.registrar('relacao_pop_bins', df_bins)
+        contador.registrar('relacao_pop_destaques', destaques)
+    trace = go.Scattergl if webgl else go.Scatter
+    fig = go.Figure()
+    fig.add_trace(trace(
+        x=df_bins['Score'].to_numpy(), y=df_bins['Members'].to_numpy(),
+        mode='markers', name='Animes (agrupados)',
+        customdata=df_bins['Animes'].to_numpy(),
+        hovertemplate='Nota ~%{x:.2f}<br>Membros ~%{y:,.0f}<br>%{customdata} animes<extra></extra>',
+        marker=dict(
+            size=df_bins['Animes'].to_numpy(), sizemode='area', sizemin=3,
+            sizeref=2.0 * df_bins['Animes'].max() / 40 ** 2,
+            color=df_bins['Score'].to_numpy(), colorscale='Turbo', showscale=True,
+            line=dict(width=1, color='white'),
+        ),
+    ))
+    fig.add_trace(go.Scatter(
+        x=destaques['Score'].to_numpy(), y=destaques['Members'].to_numpy(),
+        mode='markers+text', name='Destaques',
+        text=destaques['Name'].to_list(), textposition='top center',
+        marker=dict(size=8, color='white', symbol='star'),
+    ))
+    fig.update_layout(xaxis_title='Score', yaxis_title='Members', yaxis_type='log', showlegend=False)
+    return fig
+
+
+def cria_pagina_dashboard(df_inicial, agregados=None, versao=None, tema="streamlit"):
+    """
+    df_inicial: df_clean (usado apenas no gráfico de dispersão)
+    agregados: AgregadosDashboard da versão dos dados; calculado na hora se não for informado
+    versao: versão dos dados (RecursosAnime.versao); sem ela as figuras não usam o cache entre sessões
+    tema: tema do st.plotly_chart ("streamlit" ou None)
+    """
+    if agregados is None:
+        agregados = AgregadosDashboard.calcular(df_inicial)
+    contador = ContadorCopias()
+    kpis = agregados.kpis()
+    total_animes = kpis["total_animes"]
+    total_membros = kpis["total_membros"]
+    total_generos = kpis["total_generos"]
+    media_nota = kpis["media_nota"]
     st.subheader("Visão Geral")
     col1, col2, col3, col4 = st.columns(4)
     with col1:
@@ -46,69 +141,90 @@ def cria_pagina_dashboard(df_inicial, df_explodidos, generos_usados):
             <div class="kpi-label">Gêneros Únicos</div>
         </div>""", unsafe_allow_html=True)
     st.markdown("---")
-    # --------- Análises
-    genero_freq = df_explodidos.group_by("Genres").agg(pl.len().alias("Frequencia")).sort("Frequencia", descending=True)
-    genero_score = df_explodidos.group_by("Genres").agg(pl.col("Score").mean().alias("Nota Média")).sort("Nota Média",
-                                                                                                         descending=True)
-    combo_freq = df_inicial.filter(pl.col("Genres").list.len() > 1).group_by("Genres_combination").agg(
-        pl.len().alias("Frequencia")).sort("Frequencia", descending=True)
-    studio_avg = df_inicial.filter(pl.col("Studios").is_not_null()).group_by("Studios").agg(
-        [pl.col("Score").mean().alias("Nota Média"), pl.len().alias("Qtd")]).filter(pl.col("Qtd") >= 5).sort(
-        "Nota Média", descending=True)
-    studio_avg_simples = studio_avg.filter(~pl.col("Studios").str.contains(","))
-    relacao_pop = df_inicial.select(['Score', 'Members', 'Name']).to_pandas()
-    score_dist = df_inicial.with_columns(pl.col('Score').round(0).alias('ScoreArredondado')).group_by(
-        'ScoreArredondado').agg(pl.col('Members').sum().alias('TotalMembros')).sort('ScoreArredondado')
     # --------- Gráficos
-    colg1, colg2 = st.columns(2)
-    with colg1:
+    # Cada figura depende só da versão dos dados: com `versao`, vem do cache entre sessões
+    # (cache_figuras.py) e as funções abaixo só rodam quando a figura ainda não existe.
+    def figura(grafico, construir):
+        if versao is None:
+            return construir()
+        return cache_figuras.figura(versao, grafico, construir)
+
+    def fig_genero_freq():
         # Gráfico de barras com cores em sequência baseada nos valores
-        fig1 = px.bar(genero_freq.to_pandas().head(15), x='Genres', y='Frequencia',
+        fig1 = px.bar(dados_grafico(agregados.genero_freq(), ['Genres', 'Frequencia'], limite=15,
+                                    nome='genero_freq', contador=contador),
+                    x='Genres', y='Frequencia',
                     color='Frequencia',  # Cor baseada na frequência
                     color_continuous_scale=px.colors.sequential.Viridis_r)
-        fig1.update_layout(showlegend=False)  
-        grafico_card("Gêneros Mais Frequentes", fig1)
+        fig1.update_layout(showlegend=False)
+        return fig1
 
-        fig3 = px.bar(studio_avg_simples.head(15).to_pandas().sort_values("Nota Média"), 
+    def fig_studio_avg():
+        # top 15 por nota, exibidos em ordem crescente (barra horizontal: a maior fica no topo)
+        fig3 = px.bar(dados_grafico(agregados.studio_avg_simples().head(15), ['Nota Média', 'Studios'],
+                                    ordenar_por='Nota Média', nome='studio_avg_simples', contador=contador),
                     x='Nota Média', y='Studios',
-                    orientation='h', 
+                    orientation='h',
                     color='Nota Média',  # Cor baseada na nota média
                     color_continuous_scale=px.colors.sequential.Viridis_r)
         fig3.update_layout(showlegend=False)
-        grafico_card("Estúdios com Melhores Notas", fig3)
+        return fig3
+
+    def fig_genero_score():
+        fig2 = px.line(dados_grafico(agregados.genero_score(), ['Genres', 'Nota Média'], limite=15,
+                                     nome='genero_score', contador=contador),
+                    x='Genres', y='Nota Média',
+                    markers=True,
+                    color_discrete_sequence=['#FF6B6B'])
+        fig2.update_traces(mode='lines+markers+text', texttemplate='%{y:.2f}',
+                        textposition='top center',
+                        line=dict(width=3),
+                        marker=dict(size=8))
+        return fig2
+
+    def fig_combo_freq():
+        # Gráfico de pizza para combinações de gênero
+        fig4 = px.pie(dados_grafico(agregados.combo_freq(), ['Genres_combination', 'Frequencia'], limite=10,
+                                    nome='combo_freq', contador=contador),
+          values='Frequencia',
+          names='Genres_combination',
+          color_discrete_sequence=px.colors.qualitative.Set3)
+        fig4.update_traces(textposition='inside', textinfo='percent+label')
+        fig4.update_layout(showlegend=True)
+        return fig4
 
-        fig5 = px.scatter(relacao_pop, x='Score', y='Members', 
-                size='Members', 
-                color='Score',  # Mantém a cor baseada no Score
-                hover_name='Name',
-                color_continuous_scale=px.colors.sequential.Turbo)
-        fig5.update_traces(marker=dict(line=dict(width=1, color='white')))
-        grafico_card("Popularidade vs Nota", fig5)
+    def fig_score_dist():
+        # Gráfico de linha com gradiente de cores
+        fig6 = px.line(dados_grafico(agregados.score_dist(), ['ScoreArredondado', 'TotalMembros'],
+                                     nome='score_dist', contador=contador),
+                    x='ScoreArredondado', y='TotalMembros',
+                    markers=True,
+                    color_discrete_sequence=['#4ECDC4'])
+        fig6.update_traces(marker=dict(line=dict(width=1, color='white')))
+        return fig6
+
+    colg1, colg2 = st.columns(2)
+    with colg1:
+        grafico_card("Gêneros Mais Frequentes", figura("genero_freq", fig_genero_freq), tema)
+        grafico_card("Estúdios com Melhores Notas", figura("studio_avg", fig_studio_avg), tema)
+        grafico_card("Popularidade vs Nota",
+                     figura("relacao_pop", lambda: figura_popularidade_vs_nota(df_inicial, contador=contador)), tema)
 
     with colg2:
-            fig2 = px.line(genero_score.head(15).to_pandas(), x='Genres', y='Nota Média', 
-                        markers=True,
-                        color_discrete_sequence=['#FF6B6B']) 
-            fig2.update_traces(mode='lines+markers+text', texttemplate='%{y:.2f}', 
-                            textposition='top center',
-                            line=dict(width=3),  
-                            marker=dict(size=8)) 
-            grafico_card("Gêneros com Melhores Notas", fig2)
-
-            # Gráfico de pizza para combinações de gênero
-            fig4 = px.pie(combo_freq.head(10).to_pandas(), 
-              values='Frequencia',           
-              names='Genres_combination', 
-              color_discrete_sequence=px.colors.qualitative.Set3)
-            fig4.update_traces(textposition='inside', textinfo='percent+label')
-            fig4.update_layout(showlegend=True)
-            grafico_card("Combinações de Gêneros Mais Comuns", fig4)
-
-            # Scatter plot
-
-            # Gráfico de linha com gradiente de cores
-            fig6 = px.line(score_dist.to_pandas(), x='ScoreArredondado', y='TotalMembros', 
-                        markers=True,
-                        color_discrete_sequence=['#4ECDC4'])
-            fig6.update_traces(marker=dict(line=dict(width=1, color='white')))
-            grafico_card("Distribuição de Notas", fig6)
\ No newline at end of file
+        grafico_card("Gêneros com Melhores Notas", figura("genero_score", fig_genero_score), tema)
+        grafico_card("Combinações de Gêneros Mais Comuns", figura("combo_freq", fig_combo_freq), tema)
+        grafico_card("Distribuição de Notas", figura("score_dist", fig_score_dist), tema)
+
+    registrar_render("dashboard", contador)
+    resumo = contador.resumo()
+    with st.expander("🔎 Dados entregues aos gráficos neste render"):
+        st.caption("Bytes entregues ao Plotly copiados (texto, nulos) e sem cópia (views dos buffers Arrow).")
+        if not resumo['por_grafico']:
+            st.caption("Nenhuma figura foi montada neste render: todas vieram do cache de figuras.")
+        col_copiados, col_zero_copia = st.columns(2)
+        col_copiados.metric("Copiados", f"{resumo['bytes_copiados'] / 1024:,.1f} KB")
+        col_zero_copia.metric("Sem cópia", f"{resumo['bytes_zero_copia'] / 1024:,.1f} KB")
+        if resumo['por_grafico']:
+            st.dataframe([{'Gráfico': nome, 'Bytes copiados': copiados}
+                          for nome, copiados in resumo['por_grafico'].items()], hide_index=True)
+    return resumo
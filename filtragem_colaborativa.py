@@ -0,0 +1,227 @@
+"""
+Filtragem colaborativa item–item sobre as avaliações do Kaggle (ver avaliacoes.py).
+
+As avaliações viram uma matriz esparsa CSR itens x usuários, centrada na média de cada
+usuário e com as linhas normalizadas (similaridade de cosseno ajustada). Os k vizinhos
+mais parecidos de cada anime são pré-calculados em blocos de linhas: cada bloco é um
+produto esparso (bloco x usuários) @ (usuários x itens), densificado só na largura do
+bloco, então a memória de trabalho é limitada por tamanho_bloco x n_itens e não por
+n_itens². A tabela de vizinhos fica gravada em disco por versão das avaliações, e uma
+recomendação só soma as listas de vizinhos dos animes escolhidos (milissegundos).
+
+Uso:
+    python filtragem_colaborativa.py [--k 50] [--caminho rating_complete.csv]
+"""
+
+import argparse
+import os
+import threading
+import time
+
+import numpy as np
+import scipy.sparse as sp
+
+from avaliacoes import CAMINHOS_AVALIACOES, baixar_avaliacoes_se_necessario, carregar_avaliacoes
+from cache_disco import DIRETORIO_CACHE, chave_arquivo
+
+K_VIZINHOS = 50
+TAMANHO_BLOCO = 512
+# animes com menos avaliações que isso ficam fora da tabela (similaridades instáveis)
+MIN_AVALIACOES = 5
+LINHAS_POR_FATIA = 4_000_000
+# até este tamanho o bloco de consultas é densificado (atributos x bloco) e multiplicado pela
+# CSR inteira (esparsa @ densa, bem mais rápido); acima disso (ex.: ~300k usuários) o produto fica esparso @ esparso
+MAX_BYTES_CONSULTAS_DENSAS = 64 * 1024 * 1024
+
+
+def matriz_avaliacoes(avaliacoes, min_avaliacoes=MIN_AVALIACOES, linhas_por_fatia=LINHAS_POR_FATIA):
+    """
+    avaliacoes: DataFrame com user_id, anime_id e rating (ex.: avaliacoes.carregar_avaliacoes)
+    Retorna (matriz CSR float32 itens x usuários com as notas centradas na média de cada usuário,
+    anime_ids em ordem crescente, um por linha). A CSR é preenchida fatia a fatia: além dela
+    própria, só uma fatia de `linhas_por_fatia` avaliações fica em memória.
+    """
+    fatias = lambda: avaliacoes.iter_slices(linhas_por_fatia)
+    n_usuarios = int(avaliacoes['user_id'].max()) + 1
+    maior_anime = int(avaliacoes['anime_id'].max())
+
+    # 1ª passada: avaliações por anime e soma/contagem por usuário
+    por_anime = np.zeros(maior_anime + 1, dtype=np.int64)
+    soma_usuario = np.zeros(n_usuarios)
+    qtd_usuario = np.zeros(n_usuarios)
+    for fatia in fatias():
+        usuarios, notas = fatia['user_id'].to_numpy(), fatia['rating'].to_numpy()
+        por_anime += np.bincount(fatia['anime_id'].to_numpy(), minlength=maior_anime + 1)
+        soma_usuario += np.bincount(usuarios, weights=notas, minlength=n_usuarios)
+        qtd_usuario += np.bincount(usuarios, minlength=n_usuarios)
+    media_usuario = (soma_usuario / np.maximum(qtd_usuario, 1)).astype(np.float32)
+    anime_ids = np.flatnonzero(por_anime >= max(min_avaliacoes, 1))
+    linha_do_anime = np.full(maior_anime + 1, -1, dtype=np.int64)
+    linha_do_anime[anime_ids] = np.arange(len(anime_ids))
+
+    # 2ª passada: cada avaliação vai direto para a sua posição na CSR
+    indptr = np.zeros(len(anime_ids) + 1, dtype=np.int64)
+    np.cumsum(por_anime[anime_ids], out=indptr[1:])
+    indices = np.empty(indptr[-1], dtype=np.int32)
+    dados = np.empty(indptr[-1], dtype=np.float32)
+    cursor = indptr[:-1].copy()
+    for fatia in fatias():
+        linhas = linha_do_anime[fatia['anime_id'].to_numpy()]
+        manter = linhas >= 0
+        linhas = linhas[manter]
+        usuarios = fatia['user_id'].to_numpy()[manter]
+        notas = fatia['rating'].to_numpy()[manter]
+        ordem = np.argsort(linhas, kind='stable')
+        linhas = linhas[ordem]
+        # posição dentro do grupo de cada linha nesta fatia + o que as fatias anteriores já ocuparam
+        posicoes = cursor[linhas] + np.arange(len(linhas)) - np.searchsorted(linhas, linhas)
+        indices[posicoes] = usuarios[ordem]
+        dados[posicoes] = notas[ordem] - media_usuario[usuarios[ordem]]
+        cursor += np.bincount(linhas, minlength=len(anime_ids))
+    return sp.csr_matrix((dados, indices, indptr), shape=(len(anime_ids), n_usuarios)), anime_ids
+
+
+def normalizar_linhas(matriz):
+    """Divide cada linha da CSR (sem linhas vazias, como as de matriz_avaliacoes) pela sua norma L2, in-place."""
+    normas = np.sqrt(np.add.reduceat(matriz.data.astype(np.float64) ** 2, matriz.indptr[:-1]))
+    normas[normas == 0] = 1
+    matriz.data /= np.repeat(normas, np.diff(matriz.indptr)).astype(np.float32)
+    return matriz
+
+
+def top_k_vizinhos(matriz, k=K_VIZINHOS, tamanho_bloco=TAMANHO_BLOCO, linhas=None):
+    """
+    matriz: CSR (itens x atributos) com linhas normalizadas, então o produto escalar é o cosseno
+    linhas: linhas consultadas (padrão: todas, a tabela all-pairs)
+    Retorna (vizinhos (len(linhas), k) int32 com as linhas dos k itens mais parecidos com cada
+    consulta, similaridades (len(linhas), k) float32), da maior para a menor similaridade
+    (empates pela linha). O próprio item nunca é vizinho de si mesmo.
+    """
+    n = matriz.shape[0]
+    linhas = np.arange(n) if linhas is None else np.asarray(linhas)
+    k = min(k, n - 1)
+    densas = matriz.shape[1] * tamanho_bloco * matriz.dtype.itemsize <= MAX_BYTES_CONSULTAS_DENSAS
+    if not densas:
+        # atributos x itens em CSR, montada uma vez: o produto CSR @ CSC converteria a transposta a cada bloco
+        transposta = matriz.T.tocsr()
+    vizinhos = np.empty((len(linhas), k), dtype=np.int32)
+    similaridades = np.empty((len(linhas), k), dtype=np.float32)
+    for inicio in range(0, len(linhas), tamanho_bloco):
+        fim = min(inicio + tamanho_bloco, len(linhas))
+        consultas = linhas[inicio:fim]
+        if densas:
+            bloco = (matriz @ matriz[consultas].T.toarray()).T
+        else:
+            bloco = (matriz[consultas] @ transposta).toarray()
+        bloco[np.arange(len(consultas)), consultas] = -np.inf
+        melhores = np.argpartition(bloco, -k, axis=1)[:, -k:]
+        valores = np.take_along_axis(bloco, melhores, axis=1)
+        # similaridade decrescente e, nos empates, linha crescente (a mesma ordem de VizinhosItens.recomendar)
+        ordem = np.lexsort((melhores, -valores), axis=1)
+        vizinhos[inicio:fim] = np.take_along_axis(melhores, ordem, axis=1)
+        similaridades[inicio:fim] = np.take_along_axis(valores, ordem, axis=1)
+    return vizinhos, similaridades
+
+
+def linhas_por_id(ids_ordenados, mal_ids):
+    """Posições em `ids_ordenados` (crescentes) dos `mal_ids` que estão nele, na ordem de `mal_ids`."""
+    mal_ids = np.asarray(mal_ids, dtype=np.int64)
+    posicoes = np.searchsorted(ids_ordenados, mal_ids).clip(0, max(len(ids_ordenados) - 1, 0))
+    return posicoes[ids_ordenados[posicoes] == mal_ids]
+
+
+class VizinhosItens:
+    """
+    Tabela dos k vizinhos pré-calculados de cada anime (também usada pela similaridade de conteúdo, similaridade.py)
+    anime_ids: (n,) MAL_IDs das linhas da tabela, em ordem crescente
+    vizinhos: (n, k) linhas dos k animes mais parecidos com cada um
+    similaridades: (n, k) similaridade de cosseno ajustada correspondente
+    """
+
+    def __init__(self, anime_ids, vizinhos, similaridades):
+        self.anime_ids = anime_ids
+        self.vizinhos = vizinhos
+        self.similaridades = similaridades
+
+    def __len__(self):
+        return len(self.anime_ids)
+
+    @classmethod
+    def construir(cls, avaliacoes, k=K_VIZINHOS, tamanho_bloco=TAMANHO_BLOCO, min_avaliacoes=MIN_AVALIACOES):
+        matriz, anime_ids = matriz_avaliacoes(avaliacoes, min_avaliacoes)
+        vizinhos, similaridades = top_k_vizinhos(normalizar_linhas(matriz), k, tamanho_bloco)
+        return cls(anime_ids, vizinhos, similaridades)
+
+    def recomendar(self, mal_ids, n=10):
+        """
+        Animes mais parecidos com o conjunto `mal_ids`: a pontuação de cada candidato é a soma das
+        similaridades positivas com os animes do conjunto, que ficam de fora do resultado.
+        n: quantidade máxima (None = todos os candidatos, no máximo k por anime do conjunto)
+        Retorna (MAL_IDs, pontuações) em ordem decrescente de pontuação.
+        """
+        linhas = linhas_por_id(self.anime_ids, mal_ids)
+        if len(linhas) == 0:
+            return np.empty(0, dtype=self.anime_ids.dtype), np.empty(0, dtype=np.float32)
+        candidatos = self.vizinhos[linhas].ravel()
+        pesos = np.maximum(self.similaridades[linhas].ravel(), 0)
+        pontuacoes = np.bincount(candidatos, weights=pesos, minlength=len(self.anime_ids))
+        pontuacoes[linhas] = 0
+        positivos = np.flatnonzero(pontuacoes > 0)
+        if n is not None and len(positivos) > n:
+            positivos = positivos[np.argpartition(-pontuacoes[positivos], n - 1)[:n]]
+        melhores = positivos[np.argsort(-pontuacoes[positivos], kind='stable')]
+        return self.anime_ids[melhores], pontuacoes[melhores].astype(np.float32)
+
+    def salvar(self, caminho):
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        tmp = f"{caminho}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, anime_ids=self.anime_ids, vizinhos=self.vizinhos, similaridades=self.similaridades)
+        os.replace(tmp, caminho)
+
+    @classmethod
+    def carregar(cls, caminho):
+        with np.load(caminho) as arquivo:
+            return cls(arquivo['anime_ids'], arquivo['vizinhos'], arquivo['similaridades'])
+
+
+def caminho_vizinhos(versao, k, diretorio_cache=DIRETORIO_CACHE):
+    return os.path.join(diretorio_cache, versao, f"vizinhos_itens_k{k}.npz")
+
+
+def avaliacoes_disponiveis(caminho=None):
+    """True se o CSV de avaliações já está em disco (montar a tabela não vai precisar baixá-lo)."""
+    return os.path.exists(caminho or CAMINHOS_AVALIACOES['rating_complete'])
+
+
+_construcao_lock = threading.Lock()
+
+
+def obter_vizinhos_itens(caminho=None, k=K_VIZINHOS, diretorio_cache=DIRETORIO_CACHE):
+    """
+    Carrega a tabela de vizinhos da versão atual de rating_complete.csv (ou de `caminho`)
+    ou a constrói a partir das avaliações ingeridas e grava.
+    """
+    if caminho is None:
+        baixar_avaliacoes_se_necessario('rating_complete')
+        caminho = CAMINHOS_AVALIACOES['rating_complete']
+    destino = caminho_vizinhos(chave_arquivo(caminho, diretorio_cache), k, diretorio_cache)
+    with _construcao_lock:
+        if os.path.exists(destino):
+            try:
+                return VizinhosItens.carregar(destino)
+            except (OSError, ValueError, KeyError):
+                pass
+        avaliacoes = carregar_avaliacoes('rating_complete', caminho, diretorio_cache=diretorio_cache)
+        tabela = VizinhosItens.construir(avaliacoes, k)
+        tabela.salvar(destino)
+        return tabela
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pré-calcula a tabela de vizinhos item–item.")
+    parser.add_argument("--caminho", default=None, help="CSV de avaliações (padrão: rating_complete.csv do Kaggle)")
+    parser.add_argument("--k", type=int, default=K_VIZINHOS)
+    args = parser.parse_args()
+    inicio = time.perf_counter()
+    tabela = obter_vizinhos_itens(args.caminho, args.k)
+    print(f"{len(tabela)} animes, k={tabela.vizinhos.shape[1]}, {time.perf_counter() - inicio:.1f} s")
@@ -2,8 +2,11 @@ import streamlit as st
 from preditor import interface_predicao_nota
 from recomendacoes import mostrar_recomendacoes
 from dashboard import cria_pagina_dashboard
-from anime import carregar_dados_anime
+from anime import obter_recursos, recursos_carregados, snapshots
+from latencia import latencias
+from preparo_dados import ETAPAS, preparo
 import os
+import time
 
 # --------------- CONFIG DA PÁGINA ----------------
 st.set_page_config(page_title="MaoMao - Análise de Animes", layout="wide")
@@ -81,25 +84,56 @@ if os.path.exists(logo_path):
 # --------------- MENU LATERAL ----------------
 pagina = st.sidebar.radio("Navegue:", ["Dashboard", "Predição de Nota", "Recomendações"])
 
-# --------------- CARREGAMENTO DE DADOS ----------------
-@st.cache_data
-def carregar_dados():
-    return carregar_dados_anime()
-
-df_clean = carregar_dados()
-df_exploded = df_clean.explode("Genres")
-generos_unicos = sorted(df_exploded["Genres"].unique().to_list())
-
-
-# --------------- DASHBOARD ----------------
-if pagina == "Dashboard":
-    cria_pagina_dashboard(df_clean, df_exploded, generos_unicos)
-
-# --------------- PREDIÇÃO DE NOTA ----------------
-elif pagina == "Predição de Nota":
-    # Aqui estava o erro - agora chama a função corretamente
-    interface_predicao_nota(generos_unicos)
-
-# --------------- RECOMENDAÇÃO DE ANIMES ----------------
-elif pagina == "Recomendações":
-    mostrar_recomendacoes(df_clean, df_exploded)
\ No newline at end of file
+# --------------- PREPARO DOS DADOS ----------------
+# Na primeira execução o dataset é baixado, extraído e pré-processado em segundo plano;
+# todas as sessões acompanham o mesmo preparo (ver preparo_dados.py)
+if not recursos_carregados():
+    preparo.iniciar(preprocessar=obter_recursos)
+    barra = st.progress(0.0, text=ETAPAS['inativo'])
+    while preparo.em_andamento():
+        estado = preparo.estado()
+        texto = f"{ETAPAS[estado['etapa']]}... {estado['mensagem']}"
+        barra.progress(estado['fracao'] or 0.0, text=texto)
+        time.sleep(0.3)
+    estado = preparo.estado()
+    if estado['etapa'] == 'erro':
+        st.error(f"Não foi possível preparar os dados: {estado['erro']}")
+        st.stop()
+    barra.empty()
+
+# Um anime.csv novo é recarregado em segundo plano e trocado sem reiniciar o app;
+# reruns em andamento terminam no snapshot que já pegaram (ver snapshots.py)
+snapshots.monitorar()
+
+# Cada rerun (carregamento + página) é medido e registrado por página (ver latencia.py)
+with latencias.medir(pagina):
+    # --------------- CARREGAMENTO DE DADOS ----------------
+    # Registro do processo: carregado uma vez e compartilhado por todas as sessões;
+    # as visões derivadas (gêneros etc.) são montadas uma vez por versão dos dados
+    recursos = obter_recursos()
+    df_clean = recursos.df_clean
+    visoes = recursos.visoes
+
+    # --------------- DASHBOARD ----------------
+    if pagina == "Dashboard":
+        cria_pagina_dashboard(df_clean, recursos.agregados, versao=recursos.versao)
+
+    # --------------- PREDIÇÃO DE NOTA ----------------
+    elif pagina == "Predição de Nota":
+        # Aqui estava o erro - agora chama a função corretamente
+        interface_predicao_nota(visoes)
+
+    # --------------- RECOMENDAÇÃO DE ANIMES ----------------
+    elif pagina == "Recomendações":
+        mostrar_recomendacoes(df_clean, visoes)
+
+# --------------- DESEMPENHO ----------------
+# Latência dos reruns por página (todas as sessões do processo, amostras recentes)
+with st.sidebar.expander("⏱️ Latência por página"):
+    estatisticas = latencias.estatisticas()
+    if estatisticas:
+        st.dataframe(
+            [{'Página': p, 'Reruns': e['reruns'], 'p50 (ms)': round(e['p50_ms'], 1), 'p95 (ms)': round(e['p95_ms'], 1)}
+             for p, e in estatisticas.items()],
+            hide_index=True,
+        )
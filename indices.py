@@ -0,0 +1,305 @@
+"""
+Índices pré-computados sobre os gêneros dos animes.
+
+Construídos uma vez por versão dos dados (ver anime.RecursosAnime) para que as
+consultas de top-N não precisem varrer o DataFrame polars a cada requisição.
+GenerosEmpacotados é a matriz de features compacta (um bit por gênero) que alimenta
+esses índices e o treino dos regressores de vizinhos.
+"""
+
+import numpy as np
+import polars as pl
+import scipy.sparse as sp
+
+
+def empacotar_bits(matriz_bool):
+    """
+    Empacota cada linha de uma matriz booleana (n, g) em ceil(g / 64) palavras uint64.
+    O bit i da palavra w corresponde à coluna 64 * w + i.
+    """
+    matriz_bool = np.atleast_2d(np.asarray(matriz_bool, dtype=bool))
+    n, g = matriz_bool.shape
+    palavras = max(1, -(-g // 64))
+    preenchida = np.zeros((n, palavras * 64), dtype=bool)
+    preenchida[:, :g] = matriz_bool
+    return np.packbits(preenchida, axis=1, bitorder='little').view('<u8')
+
+
+def coluna_bits(bits, coluna):
+    """Bit `coluna` de cada linha empacotada (n, palavras), como uint64 0/1."""
+    return (bits[:, coluna // 64] >> np.uint64(coluna % 64)) & np.uint64(1)
+
+
+class GenerosEmpacotados:
+    """
+    Matriz de gêneros compacta: um bit por (anime, gênero), cada linha empacotada em
+    ceil(g / 64) palavras uint64 (ver empacotar_bits). São 8 bytes por anime com até 64
+    gêneros, contra g bytes da matriz booleana e 8 * g da cópia float64 do sklearn.
+
+    bits: (n, palavras) uint64
+    colunas: nomes das colunas de gênero ("Genres_<nome>") na ordem dos bits
+    """
+
+    def __init__(self, bits, colunas):
+        self.bits = bits
+        self.colunas = list(colunas)
+
+    def __len__(self):
+        return len(self.bits)
+
+    @property
+    def shape(self):
+        return len(self.bits), len(self.colunas)
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def __getitem__(self, linhas):
+        return GenerosEmpacotados(self.bits[linhas], self.colunas)
+
+    @classmethod
+    def de_listas(cls, generos, colunas=None, prefixo="Genres_"):
+        """
+        Monta a matriz numa passada pela coluna de listas `generos` (pl.Series list[str]).
+        colunas: ordem dos bits (padrão: um gênero por coluna, em ordem alfabética);
+        gêneros fora de `colunas` são ignorados
+        """
+        valores = (
+            pl.DataFrame({'generos': generos}).with_row_index('linha')
+            .explode('generos').drop_nulls('generos')
+        )
+        if colunas is None:
+            colunas = [f"{prefixo}{genero}" for genero in valores['generos'].unique().sort().to_list()]
+        nomes = [coluna.removeprefix(prefixo) for coluna in colunas]
+        codigos = valores['generos'].replace_strict(nomes, list(range(len(nomes))), default=None, return_dtype=pl.Int64)
+        presentes = codigos.is_not_null().to_numpy()
+        linhas = valores['linha'].to_numpy()[presentes]
+        codigos = codigos.to_numpy()[presentes]
+        bits = np.zeros((len(generos), max(1, -(-len(colunas) // 64))), dtype=np.uint64)
+        np.bitwise_or.at(bits, (linhas, codigos // 64), np.uint64(1) << (codigos % 64).astype(np.uint64))
+        return cls(bits, colunas)
+
+    @classmethod
+    def de_colunas(cls, df):
+        """Empacota as colunas booleanas de `df` (one-hot), uma de cada vez: nada do tamanho n x g é montado."""
+        bits = np.zeros((df.height, max(1, -(-df.width // 64))), dtype=np.uint64)
+        for j, coluna in enumerate(df.columns):
+            bits[:, j // 64] |= df[coluna].to_numpy().astype(np.uint64) << np.uint64(j % 64)
+        return cls(bits, df.columns)
+
+    def coluna(self, j):
+        """Coluna `j` como array booleano (n,)."""
+        return coluna_bits(self.bits, j).astype(bool)
+
+    def densa(self):
+        """Matriz booleana (n, g); só para quem não aceita outra entrada."""
+        return np.unpackbits(
+            self.bits.view(np.uint8).reshape(len(self.bits), -1), axis=1, bitorder='little'
+        )[:, :len(self.colunas)].astype(bool)
+
+    def csr(self, dtype=np.float32):
+        """CSR (n, g) com 1 nas posições marcadas, montada coluna a coluna."""
+        linhas = [np.flatnonzero(coluna_bits(self.bits, j)) for j in range(len(self.colunas))]
+        colunas = np.repeat(np.arange(len(self.colunas)), [len(l) for l in linhas])
+        linhas = np.concatenate(linhas) if linhas else np.empty(0, dtype=np.int64)
+        dados = np.ones(len(linhas), dtype=dtype)
+        return sp.csr_matrix((dados, (linhas, colunas)), shape=self.shape)
+
+
+class IndiceGeneros:
+    """
+    Máscara de bits dos gêneros de cada anime, com as linhas em ordem de Score decrescente.
+
+    df_para_encontrar: DataFrame com 'MAL_ID', 'Score' e uma coluna booleana por gênero
+    generos: GenerosEmpacotados das mesmas linhas (padrão: empacotados a partir das colunas)
+    """
+
+    def __init__(self, df_para_encontrar, generos=None):
+        self.colunas = df_para_encontrar.drop('Score', 'MAL_ID').columns
+        scores = df_para_encontrar['Score'].to_numpy()
+        # ordem estável: empates mantêm a ordem do DataFrame
+        self.ordem = np.argsort(-scores, kind='stable')
+        self.scores = scores[self.ordem]
+        self.mal_ids = df_para_encontrar['MAL_ID'].to_numpy()[self.ordem]
+        if generos is None:
+            generos = GenerosEmpacotados.de_colunas(df_para_encontrar.select(self.colunas))
+        # (palavras, n): cada palavra fica contígua na memória para as comparações vetorizadas
+        self.mascaras = np.ascontiguousarray(generos.bits[self.ordem].T)
+
+    def __len__(self):
+        return len(self.mal_ids)
+
+    def mascara_consulta(self, generos_booleans):
+        return empacotar_bits(np.asarray(generos_booleans, dtype=bool))[0]
+
+    def posicoes_top(self, generos_booleans, n=10):
+        """
+        Posições (na ordem por Score) dos "n" melhores animes que possuem todos os gêneros marcados:
+        primeiro as combinações exatas, depois as que têm gêneros extras.
+        """
+        consulta = self.mascara_consulta(generos_booleans)
+        exata = np.ones(len(self), dtype=bool)
+        contem = np.ones(len(self), dtype=bool)
+        for palavra, bits in zip(self.mascaras, consulta):
+            exata &= palavra == bits
+            contem &= (palavra & bits) == bits
+        posicoes_exatas = np.flatnonzero(exata)[:n]
+        if len(posicoes_exatas) == n:
+            return posicoes_exatas
+        posicoes_extras = np.flatnonzero(contem & ~exata)[:n - len(posicoes_exatas)]
+        return np.concatenate([posicoes_exatas, posicoes_extras])
+
+    def top_mal_ids(self, generos_booleans, n=10):
+        return self.mal_ids[self.posicoes_top(generos_booleans, n)]
+
+
+class IndicePorId:
+    """
+    MAL_ID -> linha do DataFrame, por busca binária nos MAL_IDs ordenados.
+
+    mal_ids: MAL_ID de cada linha do DataFrame (sem repetições)
+    """
+
+    def __init__(self, mal_ids):
+        mal_ids = np.asarray(mal_ids, dtype=np.int64)
+        self.ordem = np.argsort(mal_ids, kind='stable')
+        self.ids_ordenados = mal_ids[self.ordem]
+
+    def __len__(self):
+        return len(self.ids_ordenados)
+
+    def localizar(self, mal_ids):
+        """(linhas, presentes): linha de cada um de `mal_ids` e se ele existe (linhas dos ausentes são lixo)."""
+        mal_ids = np.asarray(mal_ids, dtype=np.int64)
+        if len(self) == 0:
+            return np.zeros(len(mal_ids), dtype=np.int64), np.zeros(len(mal_ids), dtype=bool)
+        posicoes = np.searchsorted(self.ids_ordenados, mal_ids).clip(0, len(self) - 1)
+        return self.ordem[posicoes], self.ids_ordenados[posicoes] == mal_ids
+
+    def linhas(self, mal_ids):
+        """Linhas dos `mal_ids` presentes, na ordem de `mal_ids` (os ausentes são ignorados)."""
+        linhas, presentes = self.localizar(mal_ids)
+        return linhas[presentes]
+
+    def linhas_lote(self, listas):
+        """linhas() de cada lista de MAL_IDs de `listas`, com uma única busca para todas."""
+        listas = [np.asarray(lista, dtype=np.int64) for lista in listas]
+        if not listas:
+            return []
+        linhas, presentes = self.localizar(np.concatenate(listas))
+        cortes = np.cumsum([len(lista) for lista in listas])[:-1]
+        return [l[p] for l, p in zip(np.split(linhas, cortes), np.split(presentes, cortes))]
+
+
+def chave_mascara(palavras):
+    """Converte as palavras uint64 de uma máscara num int python (chave canônica da combinação de gêneros)."""
+    return sum(int(palavra) << (64 * i) for i, palavra in enumerate(palavras))
+
+
+def chave_generos(generos_booleans):
+    """Chave canônica (int) de uma lista de booleans na ordem das colunas de gênero."""
+    return chave_mascara(empacotar_bits(generos_booleans)[0])
+
+
+class IndiceInvertido:
+    """
+    Listas de postagem por gênero, construídas a partir de um IndiceGeneros.
+
+    Cada lista guarda as posições na ordem por Score (crescentes = Score decrescente), de modo
+    que interseções e uniões podem parar assim que os "n" primeiros resultados forem encontrados.
+    indice.mal_ids[posicao] dá o MAL_ID e indice.ordem[posicao] a linha no DataFrame original.
+    """
+
+    def __init__(self, indice_generos, tamanho_bloco=256):
+        self.indice_generos = indice_generos
+        self.tamanho_bloco = tamanho_bloco
+        self.generos = [coluna.removeprefix('Genres_') for coluna in indice_generos.colunas]
+        self.posicao_genero = {genero: i for i, genero in enumerate(self.generos)}
+        linhas = np.ascontiguousarray(indice_generos.mascaras.T)
+        # direto dos bits, coluna a coluna (sem desempacotar a matriz n x g)
+        self.postagens = [np.flatnonzero(coluna_bits(linhas, g)).astype(np.int32) for g in range(len(self.generos))]
+        self.qtd_generos = np.bitwise_count(linhas).sum(axis=1, dtype=np.int64)
+        # Postagens por combinação exata de gêneros (chave: máscara canônica)
+        combinacoes, inversa = np.unique(linhas, axis=0, return_inverse=True)
+        inversa = inversa.ravel()
+        agrupadas = np.argsort(inversa, kind='stable').astype(np.int32)
+        cortes = np.cumsum(np.bincount(inversa, minlength=len(combinacoes)))[:-1]
+        self.postagens_exatas = {
+            chave_mascara(combinacao): posicoes
+            for combinacao, posicoes in zip(combinacoes, np.split(agrupadas, cortes))
+        }
+
+    @property
+    def mal_ids(self):
+        return self.indice_generos.mal_ids
+
+    @property
+    def ordem(self):
+        return self.indice_generos.ordem
+
+    def _intersecao(self, listas, n, filtro=None):
+        """Primeiras "n" posições presentes em todas as listas (e aceitas por filtro), percorrendo a menor em blocos."""
+        listas = sorted(listas, key=len)
+        menor, outras = listas[0], listas[1:]
+        encontrados, total = [], 0
+        for inicio in range(0, len(menor), max(self.tamanho_bloco, 4 * n)):
+            candidatos = menor[inicio:inicio + max(self.tamanho_bloco, 4 * n)]
+            for outra in outras:
+                if len(outra) == 0:
+                    return np.empty(0, dtype=np.int32)
+                idx = np.minimum(np.searchsorted(outra, candidatos), len(outra) - 1)
+                candidatos = candidatos[outra[idx] == candidatos]
+            if filtro is not None:
+                candidatos = candidatos[filtro(candidatos)]
+            encontrados.append(candidatos)
+            total += len(candidatos)
+            if total >= n:
+                break
+        if not encontrados:
+            return np.empty(0, dtype=np.int32)
+        return np.concatenate(encontrados)[:n]
+
+    def posicoes_contem_todos(self, generos_booleans, n=10):
+        """
+        Mesma semântica de IndiceGeneros.posicoes_top: combinações exatas primeiro,
+        depois os animes com gêneros extras, ambos por Score decrescente.
+        """
+        marcados = np.flatnonzero(np.asarray(generos_booleans, dtype=bool))
+        chave = chave_mascara(self.indice_generos.mascara_consulta(generos_booleans))
+        exatas = self.postagens_exatas.get(chave, np.empty(0, dtype=np.int32))[:n]
+        if len(exatas) == n:
+            return exatas
+        faltam = n - len(exatas)
+        if len(marcados) == 0:
+            todas = np.arange(len(self.qtd_generos), dtype=np.int32)
+            extras = todas[self.qtd_generos > 0][:faltam]
+        else:
+            extras = self._intersecao(
+                [self.postagens[g] for g in marcados], faltam,
+                filtro=lambda candidatos: self.qtd_generos[candidatos] > len(marcados),
+            )
+        return np.concatenate([exatas, extras])
+
+    def chave_nomes(self, generos):
+        """Chave canônica (int) de um conjunto de nomes de gêneros; nomes desconhecidos são ignorados."""
+        return sum(1 << self.posicao_genero[g] for g in set(generos) if g in self.posicao_genero)
+
+    def posicoes_contem_algum(self, generos, n=10, min_score=None):
+        """
+        Primeiras "n" posições (Score decrescente) de animes com pelo menos um dos gêneros
+        (nomes) e Score >= min_score. Gêneros desconhecidos são ignorados.
+        """
+        limite = len(self.qtd_generos)
+        if min_score is not None:
+            # scores em ordem decrescente: os que passam no filtro formam um prefixo
+            limite = np.searchsorted(-self.indice_generos.scores, -min_score, side='right')
+        cabecas = []
+        for genero in generos:
+            if genero in self.posicao_genero:
+                lista = self.postagens[self.posicao_genero[genero]]
+                # só as "n" primeiras de cada lista podem estar entre as "n" primeiras da união
+                cabecas.append(lista[:min(n, np.searchsorted(lista, limite))])
+        if not cabecas:
+            return np.empty(0, dtype=np.int32)
+        return np.unique(np.concatenate(cabecas))[:n]
@@ -0,0 +1,66 @@
+"""
+Latência dos reruns do Streamlit por página.
+
+O registro é do processo (compartilhado entre sessões) e guarda as últimas amostras de
+cada página, de onde saem contagem, média e percentis.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+AMOSTRAS_POR_PAGINA = 1000
+
+
+class RegistroLatencias:
+    """max_amostras: amostras mais recentes guardadas por página."""
+
+    def __init__(self, max_amostras=AMOSTRAS_POR_PAGINA):
+        self.max_amostras = max_amostras
+        self._amostras = {}
+        self._totais = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, pagina, segundos):
+        with self._lock:
+            if pagina not in self._amostras:
+                self._amostras[pagina] = deque(maxlen=self.max_amostras)
+                self._totais[pagina] = 0
+            self._amostras[pagina].append(segundos)
+            self._totais[pagina] += 1
+        logger.info("rerun %s: %.1f ms", pagina, segundos * 1000)
+
+    @contextmanager
+    def medir(self, pagina):
+        """Mede o bloco `with` como um rerun de `pagina` (também quando ele termina com exceção)."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(pagina, time.perf_counter() - inicio)
+
+    def estatisticas(self):
+        """Por página: reruns, média, p50, p95 e máximo (ms) das amostras recentes."""
+        with self._lock:
+            amostras = {pagina: np.array(valores) * 1000 for pagina, valores in self._amostras.items()}
+            totais = dict(self._totais)
+        return {
+            pagina: {
+                'reruns': totais[pagina],
+                'media_ms': float(valores.mean()),
+                'p50_ms': float(np.percentile(valores, 50)),
+                'p95_ms': float(np.percentile(valores, 95)),
+                'max_ms': float(valores.max()),
+            }
+            for pagina, valores in amostras.items()
+        }
+
+
+# Instância do processo, compartilhada por todas as sessões do Streamlit
+latencias = RegistroLatencias()
@@ -35,8 +35,12 @@ except ImportError:
     get_top_animes = fallback_get_top_animes
     get_anime_info = fallback_get_anime_info
 
-def interface_predicao_nota(generos_unicos):
-    """Interface para predição de nota de anime"""
+def interface_predicao_nota(visoes):
+    """
+    Interface para predição de nota de anime
+    visoes: VisoesDerivadas da versão dos dados (gêneros e conversão para booleans)
+    """
+    generos_unicos = visoes.generos_unicos
     st.subheader("🎯 Predição de Nota")
     st.markdown("Selecione os gêneros desejados para prever a nota do anime:")
     
@@ -60,8 +64,8 @@ def interface_predicao_nota(generos_unicos):
     # Botão de predição
     if st.button("🔮 Prever Nota", type="primary"):
         if generos_selecionados:
-            # Cria o array de booleans
-            booleans = [g in generos_selecionados for g in generos_unicos]
+            # Cria o array de booleans, na ordem das colunas do modelo
+            booleans = visoes.booleans(generos_selecionados)
             
             try:
                 # Faz a predição
@@ -0,0 +1,230 @@
+"""
+Preparo do dataset do Kaggle em segundo plano: download, extração e pré-processamento.
+
+Um único PreparoDataset por processo (`preparo`) roda o trabalho numa thread; chamadas
+concorrentes recebem o mesmo preparo em andamento em vez de começar outro. Entre processos,
+um lock de arquivo (flock) em databases/.preparo.lock garante que só um baixa e extrai; os
+outros esperam o lock acompanhando o progresso que o dono grava em databases/.preparo.json
+e, ao pegá-lo, encontram os arquivos prontos.
+
+A extração é feita membro a membro, em blocos, direto para o disco (nada do arquivo é
+montado em memória), num temporário renomeado no fim. A origem do .zip é trocável:
+FonteKaggle (padrão) ou FonteArquivoLocal, escolhida com a variável de ambiente
+ANIME_DATASET_ARQUIVO ou passada ao PreparoDataset.
+"""
+
+import fcntl
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+
+DIRETORIO_DADOS = "databases"
+DATASET_KAGGLE = 'hernan4444/anime-recommendation-database-2020'
+# arquivos sem os quais o app não abre; os demais (avaliações, sinopses) saem do mesmo .zip
+ARQUIVOS_APP = ("anime.csv",)
+TAMANHO_BLOCO_EXTRACAO = 1 << 20
+# intervalo mínimo entre gravações do progresso em disco
+INTERVALO_PROGRESSO = 0.25
+
+ETAPAS = {
+    'inativo': "Aguardando",
+    'aguardando': "Outro processo está preparando os dados",
+    'baixando': "Baixando o dataset",
+    'extraindo': "Extraindo arquivos",
+    'preprocessando': "Pré-processando os dados",
+    'pronto': "Pronto",
+    'erro': "Erro",
+}
+
+
+class FonteKaggle:
+    """Baixa o .zip do dataset pela API do Kaggle (precisa das credenciais do kaggle)."""
+
+    def __init__(self, dataset=DATASET_KAGGLE):
+        self.dataset = dataset
+
+    def obter_arquivo(self, diretorio_tmp):
+        import kaggle
+        kaggle.api.dataset_download_files(self.dataset, path=diretorio_tmp, unzip=False, quiet=True)
+        return os.path.join(diretorio_tmp, self.dataset.split('/')[-1] + ".zip")
+
+
+class FonteArquivoLocal:
+    """Usa um .zip já em disco com os mesmos arquivos do dataset (espelho local, testes)."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+
+    def obter_arquivo(self, diretorio_tmp):
+        return self.caminho
+
+
+def fonte_padrao():
+    caminho = os.environ.get("ANIME_DATASET_ARQUIVO")
+    return FonteArquivoLocal(caminho) if caminho else FonteKaggle()
+
+
+def extrair(caminho_zip, destino, membros=None, progresso=None):
+    """
+    Extrai de `caminho_zip` para `destino` os arquivos de `membros` (nomes base; None = todos),
+    em blocos de TAMANHO_BLOCO_EXTRACAO. progresso(fração, nome) é chamado a cada bloco.
+    """
+    with zipfile.ZipFile(caminho_zip) as arquivo:
+        infos = [info for info in arquivo.infolist()
+                 if not info.is_dir() and (membros is None or os.path.basename(info.filename) in membros)]
+        total = sum(info.file_size for info in infos) or 1
+        extraidos = 0
+        for info in infos:
+            # só o nome base: o dataset é plano e isso impede caminhos fora de `destino`
+            alvo = os.path.join(destino, os.path.basename(info.filename))
+            tmp = f"{alvo}.{os.getpid()}.tmp"
+            try:
+                with arquivo.open(info) as origem, open(tmp, "wb") as saida:
+                    while bloco := origem.read(TAMANHO_BLOCO_EXTRACAO):
+                        saida.write(bloco)
+                        extraidos += len(bloco)
+                        if progresso is not None:
+                            progresso(extraidos / total, info.filename)
+                os.replace(tmp, alvo)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+
+
+class PreparoDataset:
+    """
+    fonte: de onde vem o .zip (padrão: fonte_padrao())
+    diretorio: onde os arquivos do dataset ficam
+    """
+
+    def __init__(self, fonte=None, diretorio=DIRETORIO_DADOS):
+        self.fonte = fonte
+        self.diretorio = diretorio
+        self._lock = threading.Lock()
+        self._thread = None
+        self._estado = {'etapa': 'inativo', 'fracao': None, 'mensagem': '', 'erro': None}
+        self._ultima_gravacao = 0.0
+
+    @property
+    def caminho_lock(self):
+        return os.path.join(self.diretorio, ".preparo.lock")
+
+    @property
+    def caminho_progresso(self):
+        return os.path.join(self.diretorio, ".preparo.json")
+
+    def faltando(self, arquivos=ARQUIVOS_APP):
+        return [nome for nome in arquivos if not os.path.exists(os.path.join(self.diretorio, nome))]
+
+    def estado(self):
+        """Cópia do estado: etapa (ver ETAPAS), fracao (0-1 ou None), mensagem e erro."""
+        with self._lock:
+            return dict(self._estado)
+
+    def em_andamento(self):
+        with self._lock:
+            return self._thread is not None and self._thread.is_alive()
+
+    def iniciar(self, arquivos=ARQUIVOS_APP, preprocessar=None):
+        """
+        Começa o preparo numa thread, se não houver um em andamento neste processo
+        (quem chega depois acompanha o mesmo). preprocessar() roda depois da extração,
+        ainda com o lock entre processos.
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return self
+            self._estado = {'etapa': 'inativo', 'fracao': None, 'mensagem': '', 'erro': None}
+            self._thread = threading.Thread(target=self._executar, args=(tuple(arquivos), preprocessar),
+                                            name="preparo-dataset", daemon=True)
+            self._thread.start()
+        return self
+
+    def aguardar(self, timeout=None):
+        """Espera o preparo em andamento terminar; levanta RuntimeError se ele falhou."""
+        with self._lock:
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        estado = self.estado()
+        if estado['etapa'] == 'erro':
+            raise RuntimeError(f"Falha ao preparar o dataset: {estado['erro']}")
+        return estado
+
+    def garantir(self, arquivos=ARQUIVOS_APP):
+        """Versão bloqueante: retorna assim que os `arquivos` existirem, preparando-os se preciso."""
+        if not self.faltando(arquivos):
+            return
+        self.iniciar(arquivos).aguardar()
+        faltando = self.faltando(arquivos)
+        if faltando:
+            raise FileNotFoundError(f"O dataset não contém: {', '.join(faltando)}")
+
+    # --------- Execução (thread do preparo)
+    def _atualizar(self, etapa, fracao=None, mensagem='', erro=None, gravar=True):
+        with self._lock:
+            self._estado = {'etapa': etapa, 'fracao': fracao, 'mensagem': mensagem, 'erro': erro}
+        agora = time.monotonic()
+        # o progresso em disco é o que os outros processos acompanham
+        if gravar and (etapa != 'extraindo' or agora - self._ultima_gravacao >= INTERVALO_PROGRESSO):
+            self._ultima_gravacao = agora
+            tmp = f"{self.caminho_progresso}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(dict(self.estado(), pid=os.getpid()), f)
+            os.replace(tmp, self.caminho_progresso)
+
+    def _acompanhar_outro_processo(self):
+        try:
+            with open(self.caminho_progresso, encoding="utf-8") as f:
+                outro = json.load(f)
+        except (OSError, ValueError):
+            outro = {}
+        mensagem = ETAPAS.get(outro.get('etapa'), '')
+        self._atualizar('aguardando', outro.get('fracao'), mensagem, gravar=False)
+
+    def _executar(self, arquivos, preprocessar):
+        try:
+            os.makedirs(self.diretorio, exist_ok=True)
+            with open(self.caminho_lock, "a+") as lock:
+                while True:
+                    try:
+                        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        self._acompanhar_outro_processo()
+                        time.sleep(0.5)
+                try:
+                    # quem segurava o lock antes pode já ter deixado tudo pronto
+                    if self.faltando(arquivos):
+                        self._baixar_e_extrair()
+                    if preprocessar is not None:
+                        self._atualizar('preprocessando')
+                        preprocessar()
+                    self._atualizar('pronto', 1.0)
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+        except Exception as e:
+            self._atualizar('erro', erro=str(e), gravar=False)
+
+    def _baixar_e_extrair(self):
+        fonte = self.fonte or fonte_padrao()
+        tmp = tempfile.mkdtemp(prefix=".download-", dir=self.diretorio)
+        try:
+            self._atualizar('baixando')
+            caminho_zip = fonte.obter_arquivo(tmp)
+            with zipfile.ZipFile(caminho_zip) as arquivo:
+                membros = {os.path.basename(info.filename) for info in arquivo.infolist() if not info.is_dir()}
+            # só o que ainda não existe: arquivos já em uso por outros processos não são trocados
+            self._atualizar('extraindo', 0.0)
+            extrair(caminho_zip, self.diretorio, [m for m in membros if m in self.faltando(membros)],
+                    lambda fracao, nome: self._atualizar('extraindo', fracao, nome))
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+# Instância do processo, compartilhada por todas as sessões do Streamlit
+preparo = PreparoDataset()
@@ -16,43 +16,80 @@ def fallback_get_anime_info(top_ids):
         'Genres_combination': []
     })
 
+def fallback_obter_recomendacoes_por_filtros(df_clean, generos_selecionados, min_score=6.0, max_results=10):
+    """Função de fallback para as recomendações por filtros locais (varredura com list.contains)"""
+    # Animes com pelo menos um dos gêneros selecionados (um OR por gênero)
+    filtro_generos = pl.lit(False)
+    for genero in generos_selecionados:
+        filtro_generos = filtro_generos | pl.col("Genres").list.contains(genero)
+    # Filtra por nota mínima e ordena por score
+    return (
+        df_clean.filter(filtro_generos & (pl.col("Score") >= min_score))
+        .sort("Score", descending=True)
+        .head(max_results)
+    )
+
 # Tenta importar as funções reais, se não conseguir, usa as de fallback
 try:
-    from anime import get_top_animes, get_anime_info
+    from anime import get_top_animes, get_anime_info, obter_recomendacoes_por_filtros, obter_recursos
 except ImportError:
     st.warning("Arquivo anime.py não encontrado. Usando funções de fallback para recomendações.")
     get_top_animes = fallback_get_top_animes
     get_anime_info = fallback_get_anime_info
+    obter_recomendacoes_por_filtros = fallback_obter_recomendacoes_por_filtros
+    obter_recursos = None
+
+from filtragem_colaborativa import avaliacoes_disponiveis
 
-def obter_recomendacoes_por_filtros(df_clean, generos_selecionados, min_score=6.0, max_results=10):
+MODO_GENEROS = "Por gêneros"
+MODO_COLABORATIVO = "Parecidos com animes que você gostou"
+
+def obter_recomendacoes_colaborativas(df_clean, mal_ids_escolhidos, min_score=6.0, max_results=10):
     """
-    Função auxiliar para obter recomendações baseadas em filtros locais
-    quando as funções do anime.py não estão disponíveis
+    Animes parecidos com os de `mal_ids_escolhidos` segundo a tabela de vizinhos item–item
+    (filtragem_colaborativa.py), com nota >= min_score, em ordem decrescente de afinidade
     """
-    try:
-        # Cria o filtro inicial com o primeiro gênero
-        filtro_generos = pl.col("Genres").list.contains(generos_selecionados[0])
+    mal_ids, afinidades = obter_recursos().vizinhos_itens.recomendar(mal_ids_escolhidos, n=None)
+    candidatos = pl.DataFrame({'MAL_ID': mal_ids, 'Afinidade': afinidades}).cast({'MAL_ID': df_clean.schema['MAL_ID']})
+    return (
+        candidatos.join(df_clean, on='MAL_ID', how='inner', maintain_order='left')
+        .filter(pl.col('Score') >= min_score)
+        .head(max_results)
+    )
 
-        # Adiciona os demais gêneros com OR
-        for genero in generos_selecionados[1:]:
-            filtro_generos = filtro_generos | pl.col("Genres").list.contains(genero)
+def mostrar_recomendacoes_colaborativas(df_clean, num_recomendacoes, nota_minima):
+    """Modo colaborativo: a partir dos animes que o usuário gostou, os que os mesmos usuários do MAL avaliaram parecido"""
+    if obter_recursos is None or not avaliacoes_disponiveis():
+        st.info("O modo colaborativo usa as avaliações do dataset do Kaggle (rating_complete.csv). "
+                "Baixe o dataset e monte a tabela de vizinhos com `python filtragem_colaborativa.py`.")
+        return
 
-        # Filtra animes que contenham pelo menos um dos gêneros selecionados
-        df_filtrado = df_clean.filter(filtro_generos)
+    visoes = obter_recursos().visoes
+    escolhidos = st.multiselect(
+        "🎞️ Animes que você gostou:", visoes.animes_por_popularidade,
+        format_func=visoes.nomes_animes.__getitem__,
+        placeholder="Digite o nome de um anime",
+    )
 
-        # Filtra por nota mínima e ordena por score
-        df_recomendacoes = df_filtrado.filter(
-            pl.col("Score") >= min_score
-        ).sort("Score", descending=True).head(max_results)
-        
-        return df_recomendacoes
-    except Exception as e:
-        st.error(f"Erro ao buscar recomendações locais: {str(e)}")
-        return pl.DataFrame()
+    if st.button("🔍 Buscar Recomendações", type="primary", use_container_width=True, key="buscar_colaborativo"):
+        if escolhidos:
+            with st.spinner("🔄 Buscando animes parecidos (a tabela de vizinhos é montada só na primeira vez)..."):
+                try:
+                    top_info = obter_recomendacoes_colaborativas(df_clean, escolhidos, nota_minima, num_recomendacoes)
+                    nomes = ', '.join(visoes.nomes_animes[mal_id] for mal_id in escolhidos)
+                    mostra_resultados(top_info, f"Parecidos com: {nomes}",
+                                      dica="Tente escolher outros animes ou diminuir a nota mínima.")
+                except Exception as e:
+                    st.error(f"Erro ao buscar recomendações: {str(e)}")
+        else:
+            st.warning("⚠️ Escolha pelo menos um anime para obter recomendações!")
 
-def mostrar_recomendacoes(df_clean, df_exploded):
-    """Interface principal para recomendações de animes"""
-    generos_unicos = sorted(df_exploded["Genres"].unique().to_list())
+def mostrar_recomendacoes(df_clean, visoes):
+    """
+    Interface principal para recomendações de animes
+    visoes: VisoesDerivadas da versão dos dados (gêneros e conversão para booleans)
+    """
+    generos_unicos = visoes.generos_unicos
 
     # Título e descrição
     st.markdown("""
@@ -72,6 +109,12 @@ def mostrar_recomendacoes(df_clean, df_exploded):
         with col_config2:
             nota_minima = st.slider("Nota mínima", 1.0, 10.0, 6.0, 0.5)
 
+    # Por gêneros a lista é a mesma para todos; o modo colaborativo parte dos animes que o usuário gostou
+    modo = st.radio("Modo de recomendação:", [MODO_GENEROS, MODO_COLABORATIVO], horizontal=True)
+    if modo == MODO_COLABORATIVO:
+        mostrar_recomendacoes_colaborativas(df_clean, num_recomendacoes, nota_minima)
+        return
+
     # Seleção de gêneros
     st.markdown("### 📋 Selecione os gêneros desejados:")
     
@@ -120,7 +163,7 @@ def mostrar_recomendacoes(df_clean, df_exploded):
             with st.spinner("🔄 Buscando os melhores animes para você..."):
                 try:
                     # Tenta usar as funções do anime.py
-                    booleans = [g in generos_selecionados for g in generos_unicos]
+                    booleans = visoes.booleans(generos_selecionados)
                     top_ids = get_top_animes(booleans, n=num_recomendacoes)
                     top_info = get_anime_info(top_ids)
                     
@@ -132,114 +175,7 @@ def mostrar_recomendacoes(df_clean, df_exploded):
                             nota_minima, num_recomendacoes
                         )
                     
-                    if not top_info.is_empty():
-                        # Cabeçalho dos resultados
-                        st.markdown(f"""
-                        <div style='background: linear-gradient(135deg, #2c3e50, #34495e); 
-                                   padding: 20px; 
-                                   border-radius: 15px; 
-                                   text-align: center; 
-                                   margin: 20px 0;'>
-                            <h3 style='color: #1abc9c; margin: 0;'>
-                                🎬 {len(top_info)} Animes Recomendados
-                            </h3>
-                            <p style='color: #bdc3c7; margin: 10px 0 0 0;'>
-                                Baseado nos gêneros: {', '.join(generos_selecionados)}
-                            </p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Exibe os animes recomendados
-                        for idx, row in enumerate(top_info.iter_rows(named=True)):
-                            # Calcula a cor do card baseada na nota
-                            score = row['Score']
-                            if score >= 8.5:
-                                border_color = "#f1c40f"  # Ouro
-                                score_color = "#f39c12"
-                            elif score >= 7.5:
-                                border_color = "#1abc9c"  # Verde
-                                score_color = "#16a085"
-                            elif score >= 6.5:
-                                border_color = "#3498db"  # Azul
-                                score_color = "#2980b9"
-                            else:
-                                border_color = "#95a5a6"  # Cinza
-                                score_color = "#7f8c8d"
-                            
-                            # Cor alternada para o fundo
-                            bg_color = "#2c3e50" if idx % 2 == 0 else "#34495e"
-                            
-                            st.markdown(f"""
-                            <div style='background: {bg_color}; 
-                                       border-radius: 15px; 
-                                       margin: 15px 0; 
-                                       padding: 25px;
-                                       border-left: 5px solid {border_color};
-                                       box-shadow: 0 6px 20px rgba(0,0,0,0.3);
-                                       transition: all 0.3s ease;'>
-                                <div style='display: flex; justify-content: space-between; align-items: flex-start; margin-bottom: 15px;'>
-                                    <h4 style='color: #ecf0f1; margin: 0; font-size: 1.3em; flex: 1;'>
-                                        <span style='color: #1abc9c; font-weight: normal;'>#{idx + 1}</span> 
-                                        {row['Name']}
-                                    </h4>
-                                    <div style='background: {score_color}; 
-                                               color: white; 
-                                               padding: 8px 15px; 
-                                               border-radius: 25px; 
-                                               font-weight: bold;
-                                               font-size: 1.1em;
-                                               margin-left: 15px;'>
-                                        ⭐ {score:.2f}
-                                    </div>
-                                </div>
-                                <div style='color: #bdc3c7; font-size: 0.95em; line-height: 1.4;'>
-                                    <i class='fas fa-tags'></i> 
-                                    <strong>Gêneros:</strong> {row['Genres_combination']}
-                                </div>
-                            </div>
-                            """, unsafe_allow_html=True)
-                        
-                        # Estatísticas dos resultados
-                        scores = [row['Score'] for row in top_info.iter_rows(named=True)]
-                        avg_score = sum(scores) / len(scores)
-                        max_score = max(scores)
-                        min_score = min(scores)
-                        
-                        st.markdown(f"""
-                        <div style='background: #34495e; 
-                                   padding: 20px; 
-                                   border-radius: 15px; 
-                                   margin: 20px 0;'>
-                            <h4 style='color: #1abc9c; margin: 0 0 15px 0;'>📊 Estatísticas das Recomendações</h4>
-                            <div style='display: flex; justify-content: space-around; text-align: center;'>
-                                <div>
-                                    <div style='color: #f39c12; font-size: 1.5em; font-weight: bold;'>{avg_score:.2f}</div>
-                                    <div style='color: #bdc3c7; font-size: 0.9em;'>Nota Média</div>
-                                </div>
-                                <div>
-                                    <div style='color: #27ae60; font-size: 1.5em; font-weight: bold;'>{max_score:.2f}</div>
-                                    <div style='color: #bdc3c7; font-size: 0.9em;'>Melhor Nota</div>
-                                </div>
-                                <div>
-                                    <div style='color: #e74c3c; font-size: 1.5em; font-weight: bold;'>{min_score:.2f}</div>
-                                    <div style='color: #bdc3c7; font-size: 0.9em;'>Menor Nota</div>
-                                </div>
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                    else:
-                        st.markdown("""
-                        <div style='background: #e74c3c; 
-                                   padding: 20px; 
-                                   border-radius: 15px; 
-                                   text-align: center;'>
-                            <h4 style='color: white; margin: 0;'>😔 Nenhum anime encontrado</h4>
-                            <p style='color: #ecf0f1; margin: 10px 0 0 0;'>
-                                Tente selecionar diferentes gêneros ou diminuir a nota mínima.
-                            </p>
-                        </div>
-                        """, unsafe_allow_html=True)
+                    mostra_resultados(top_info, f"Baseado nos gêneros: {', '.join(generos_selecionados)}")
                 
                 except Exception as e:
                     st.error(f"Erro ao buscar recomendações: {str(e)}")
@@ -258,6 +194,7 @@ def mostrar_recomendacoes(df_clean, df_exploded):
         **2. Algoritmo de Recomendação:** O sistema usa diferentes métodos:
         - **Método Principal:** Algoritmo KNN baseado em similaridade
         - **Método Auxiliar:** Filtragem por gêneros e ordenação por nota
+        - **Modo Colaborativo:** Animes que os mesmos usuários do MyAnimeList avaliaram de forma parecida com os que você escolheu
         
         **3. Configurações Personalizáveis:**
         - Número de recomendações (5-20)
@@ -276,6 +213,122 @@ def mostrar_recomendacoes(df_clean, df_exploded):
         """)
 
 
+def mostra_resultados(top_info, descricao, dica="Tente selecionar diferentes gêneros ou diminuir a nota mínima."):
+    """
+    Cards dos animes recomendados (colunas Name, Score e Genres_combination) e estatísticas das notas
+    descricao: subtítulo do cabeçalho (ex.: "Baseado nos gêneros: ...")
+    dica: sugestão exibida quando não há resultados
+    """
+    if not top_info.is_empty():
+        # Cabeçalho dos resultados
+        st.markdown(f"""
+        <div style='background: linear-gradient(135deg, #2c3e50, #34495e); 
+                   padding: 20px; 
+                   border-radius: 15px; 
+                   text-align: center; 
+                   margin: 20px 0;'>
+            <h3 style='color: #1abc9c; margin: 0;'>
+                🎬 {len(top_info)} Animes Recomendados
+            </h3>
+            <p style='color: #bdc3c7; margin: 10px 0 0 0;'>
+                {descricao}
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
+
+        # Exibe os animes recomendados
+        for idx, row in enumerate(top_info.iter_rows(named=True)):
+            # Calcula a cor do card baseada na nota
+            score = row['Score']
+            if score >= 8.5:
+                border_color = "#f1c40f"  # Ouro
+                score_color = "#f39c12"
+            elif score >= 7.5:
+                border_color = "#1abc9c"  # Verde
+                score_color = "#16a085"
+            elif score >= 6.5:
+                border_color = "#3498db"  # Azul
+                score_color = "#2980b9"
+            else:
+                border_color = "#95a5a6"  # Cinza
+                score_color = "#7f8c8d"
+
+            # Cor alternada para o fundo
+            bg_color = "#2c3e50" if idx % 2 == 0 else "#34495e"
+
+            st.markdown(f"""
+            <div style='background: {bg_color}; 
+                       border-radius: 15px; 
+                       margin: 15px 0; 
+                       padding: 25px;
+                       border-left: 5px solid {border_color};
+                       box-shadow: 0 6px 20px rgba(0,0,0,0.3);
+                       transition: all 0.3s ease;'>
+                <div style='display: flex; justify-content: space-between; align-items: flex-start; margin-bottom: 15px;'>
+                    <h4 style='color: #ecf0f1; margin: 0; font-size: 1.3em; flex: 1;'>
+                        <span style='color: #1abc9c; font-weight: normal;'>#{idx + 1}</span> 
+                        {row['Name']}
+                    </h4>
+                    <div style='background: {score_color}; 
+                               color: white; 
+                               padding: 8px 15px; 
+                               border-radius: 25px; 
+                               font-weight: bold;
+                               font-size: 1.1em;
+                               margin-left: 15px;'>
+                        ⭐ {score:.2f}
+                    </div>
+                </div>
+                <div style='color: #bdc3c7; font-size: 0.95em; line-height: 1.4;'>
+                    <i class='fas fa-tags'></i> 
+                    <strong>Gêneros:</strong> {row['Genres_combination']}
+                </div>
+            </div>
+            """, unsafe_allow_html=True)
+
+        # Estatísticas dos resultados
+        scores = [row['Score'] for row in top_info.iter_rows(named=True)]
+        avg_score = sum(scores) / len(scores)
+        max_score = max(scores)
+        min_score = min(scores)
+
+        st.markdown(f"""
+        <div style='background: #34495e; 
+                   padding: 20px; 
+                   border-radius: 15px; 
+                   margin: 20px 0;'>
+            <h4 style='color: #1abc9c; margin: 0 0 15px 0;'>📊 Estatísticas das Recomendações</h4>
+            <div style='display: flex; justify-content: space-around; text-align: center;'>
+                <div>
+                    <div style='color: #f39c12; font-size: 1.5em; font-weight: bold;'>{avg_score:.2f}</div>
+                    <div style='color: #bdc3c7; font-size: 0.9em;'>Nota Média</div>
+                </div>
+                <div>
+                    <div style='color: #27ae60; font-size: 1.5em; font-weight: bold;'>{max_score:.2f}</div>
+                    <div style='color: #bdc3c7; font-size: 0.9em;'>Melhor Nota</div>
+                </div>
+                <div>
+                    <div style='color: #e74c3c; font-size: 1.5em; font-weight: bold;'>{min_score:.2f}</div>
+                    <div style='color: #bdc3c7; font-size: 0.9em;'>Menor Nota</div>
+                </div>
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+
+    else:
+        st.markdown(f"""
+        <div style='background: #e74c3c; 
+                   padding: 20px; 
+                   border-radius: 15px; 
+                   text-align: center;'>
+            <h4 style='color: white; margin: 0;'>😔 Nenhum anime encontrado</h4>
+            <p style='color: #ecf0f1; margin: 10px 0 0 0;'>
+                {dica}
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
+
+
 def mostra_badges(generos_selecionados):
     st.markdown("**🎯 Gêneros selecionados:**")
     # Cria distintivos para os gêneros selecionados
@@ -0,0 +1,183 @@
+"""
+Similaridade de conteúdo ("mais como este") entre animes.
+
+Cada anime vira uma linha de uma matriz esparsa com blocos de atributos: gêneros (os bits de
+GenerosEmpacotados), estúdios, tipo, fonte e o TF-IDF da sinopse (anime_with_synopsis.csv
+do mesmo arquivo do Kaggle). Cada bloco é normalizado e pesado por PESOS_CONTEUDO, e a
+matriz inteira é normalizada (L2) uma vez ao ser montada, então a similaridade de cosseno
+entre dois animes é só o produto escalar das linhas. As consultas de top-k usam os produtos
+em blocos de filtragem_colaborativa.top_k_vizinhos: com poucos atributos (ao contrário dos
+~300k usuários das avaliações), o bloco de consultas é densificado e multiplicado pela CSR
+inteira (esparsa @ densa). A tabela all-pairs pode ser pré-calculada e gravada (VizinhosItens).
+
+Animes sem nada em comum (similaridade <= 0) não contam como parecidos, tanto na consulta
+na hora quanto na tabela pré-calculada (VizinhosItens.recomendar).
+"""
+
+import os
+
+import numpy as np
+import polars as pl
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from cache_disco import DIRETORIO_CACHE, chave_arquivo
+from filtragem_colaborativa import VizinhosItens, linhas_por_id, top_k_vizinhos
+
+CAMINHO_SINOPSES = os.path.join("databases", "anime_with_synopsis.csv")
+
+# Peso de cada bloco no cosseno final (com os blocos normalizados, o cosseno é a média
+# ponderada dos cossenos por bloco entre os blocos que o anime tem)
+PESOS_CONTEUDO = {'generos': 1.0, 'estudios': 0.5, 'tipo': 0.25, 'fonte': 0.25, 'sinopse': 1.0}
+MAX_TERMOS_SINOPSE = 20000
+TAMANHO_BLOCO = 256
+K_SIMILARES = 20
+
+
+def carregar_sinopses(caminho=CAMINHO_SINOPSES):
+    """MAL_ID e sinopse (a coluna se chama "sypnopsis" no CSV do Kaggle), ou None se o arquivo não existir."""
+    if not os.path.exists(caminho):
+        return None
+    return (
+        pl.scan_csv(caminho)
+        .select(pl.col('MAL_ID'), pl.col('sypnopsis').alias('Sinopse'))
+        .filter(pl.col('Sinopse').is_not_null())
+        .collect()
+    )
+
+
+def _multi_hot(valores_por_linha):
+    """CSR (linhas x valores distintos) a partir de uma lista de listas de valores (None = linha vazia)."""
+    vocabulario = {}
+    linhas, colunas = [], []
+    for linha, valores in enumerate(valores_por_linha):
+        for valor in valores or ():
+            linhas.append(linha)
+            colunas.append(vocabulario.setdefault(valor, len(vocabulario)))
+    dados = np.ones(len(linhas), dtype=np.float32)
+    return sp.csr_matrix((dados, (linhas, colunas)), shape=(len(valores_por_linha), max(len(vocabulario), 1)))
+
+
+def matriz_conteudo(df_clean, generos, sinopses=None, pesos=PESOS_CONTEUDO):
+    """
+    Matriz CSR float32 (animes x atributos) com linhas L2-normalizadas, na ordem de MAL_ID crescente.
+    generos: indices.GenerosEmpacotados com uma linha por linha de df_clean (RecursosAnime.generos_empacotados)
+    sinopses: DataFrame MAL_ID, Sinopse (carregar_sinopses); None deixa o bloco de sinopse de fora
+    Retorna (matriz, mal_ids).
+    """
+    ordem = df_clean['MAL_ID'].arg_sort().to_numpy()
+    df = df_clean.select(['MAL_ID', 'Studios', 'Type', 'Source'])[ordem]
+    blocos = {
+        # direto dos bits para a CSR: a matriz one-hot densa nunca é montada
+        'generos': generos.csr()[ordem],
+        'estudios': _multi_hot(df['Studios'].str.split(', ').to_list()),
+        'tipo': _multi_hot([[valor] if valor else None for valor in df['Type'].to_list()]),
+        'fonte': _multi_hot([[valor] if valor else None for valor in df['Source'].to_list()]),
+    }
+    if sinopses is not None:
+        textos = df.select('MAL_ID').join(sinopses, on='MAL_ID', how='left', maintain_order='left')['Sinopse']
+        tfidf = TfidfVectorizer(max_features=MAX_TERMOS_SINOPSE, min_df=2, stop_words='english',
+                                sublinear_tf=True, dtype=np.float32)
+        blocos['sinopse'] = tfidf.fit_transform(textos.fill_null('').to_list())
+    matriz = sp.hstack(
+        [normalize(bloco) * np.float32(np.sqrt(pesos[nome])) for nome, bloco in blocos.items()], format='csr'
+    )
+    return normalize(matriz).astype(np.float32), df['MAL_ID'].to_numpy()
+
+
+class SimilaridadeConteudo:
+    """
+    matriz: CSR (animes x atributos) com linhas normalizadas (matriz_conteudo)
+    mal_ids: MAL_ID de cada linha, em ordem crescente
+    """
+
+    def __init__(self, matriz, mal_ids):
+        self.matriz = matriz
+        self.mal_ids = mal_ids
+
+    def __len__(self):
+        return len(self.mal_ids)
+
+    @classmethod
+    def construir(cls, df_clean, generos, sinopses=None):
+        return cls(*matriz_conteudo(df_clean, generos, sinopses))
+
+    def similares_lote(self, mal_ids, k=10, tamanho_bloco=TAMANHO_BLOCO):
+        """
+        Top-k por cosseno para cada um de `mal_ids` (os que não estão na matriz são ignorados).
+        Retorna (mal_ids consultados, vizinhos (m, k) em MAL_IDs, similaridades (m, k)).
+        """
+        linhas = linhas_por_id(self.mal_ids, mal_ids)
+        vizinhos, similaridades = top_k_vizinhos(self.matriz, k, tamanho_bloco, linhas)
+        return self.mal_ids[linhas], self.mal_ids[vizinhos], similaridades
+
+    def similares(self, mal_id, k=10):
+        """
+        (MAL_IDs, similaridades) dos até k animes mais parecidos com `mal_id`, só os de similaridade
+        positiva (vazios se ele não estiver na matriz).
+        """
+        _, vizinhos, similaridades = self.similares_lote([mal_id], k)
+        if len(vizinhos) == 0:
+            return np.empty(0, dtype=self.mal_ids.dtype), np.empty(0, dtype=np.float32)
+        positivos = similaridades[0] > 0
+        return vizinhos[0][positivos], similaridades[0][positivos]
+
+    def precomputar(self, k=K_SIMILARES, tamanho_bloco=TAMANHO_BLOCO):
+        """Tabela all-pairs com os k mais parecidos de cada anime."""
+        vizinhos, similaridades = top_k_vizinhos(self.matriz, k, tamanho_bloco)
+        return VizinhosItens(self.mal_ids, vizinhos, similaridades)
+
+    def salvar(self, caminho):
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        tmp = f"{caminho}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, data=self.matriz.data, indices=self.matriz.indices, indptr=self.matriz.indptr,
+                 shape=self.matriz.shape, mal_ids=self.mal_ids)
+        os.replace(tmp, caminho)
+
+    @classmethod
+    def carregar(cls, caminho):
+        with np.load(caminho) as arquivo:
+            matriz = sp.csr_matrix((arquivo['data'], arquivo['indices'], arquivo['indptr']), shape=tuple(arquivo['shape']))
+            return cls(matriz, arquivo['mal_ids'])
+
+
+def _chave_sinopses(diretorio_cache=DIRETORIO_CACHE):
+    # parte do nome dos artefatos: muda quando o CSV de sinopses muda (ou aparece)
+    if not os.path.exists(CAMINHO_SINOPSES):
+        return "sem-sinopse"
+    return chave_arquivo(CAMINHO_SINOPSES, diretorio_cache).split('-', 1)[1][:12]
+
+
+def caminho_matriz(versao, diretorio_cache=DIRETORIO_CACHE):
+    return os.path.join(diretorio_cache, versao, f"conteudo_{_chave_sinopses(diretorio_cache)}.npz")
+
+
+def caminho_similares(versao, k, diretorio_cache=DIRETORIO_CACHE):
+    return os.path.join(diretorio_cache, versao, f"similares_conteudo_{_chave_sinopses(diretorio_cache)}_k{k}.npz")
+
+
+def obter_similaridade(versao, df_clean, generos, diretorio_cache=DIRETORIO_CACHE):
+    """Matriz de conteúdo da versão `versao` dos dados: lida do cache em disco ou montada e gravada."""
+    caminho = caminho_matriz(versao, diretorio_cache)
+    if os.path.exists(caminho):
+        try:
+            return SimilaridadeConteudo.carregar(caminho)
+        except (OSError, ValueError, KeyError):
+            pass
+    similaridade = SimilaridadeConteudo.construir(df_clean, generos, carregar_sinopses())
+    similaridade.salvar(caminho)
+    return similaridade
+
+
+def obter_similares(versao, similaridade, k=K_SIMILARES, diretorio_cache=DIRETORIO_CACHE):
+    """Tabela all-pairs top-k da versão `versao`: lida do cache em disco ou pré-calculada e gravada."""
+    caminho = caminho_similares(versao, k, diretorio_cache)
+    if os.path.exists(caminho):
+        try:
+            return VizinhosItens.carregar(caminho)
+        except (OSError, ValueError, KeyError):
+            pass
+    tabela = similaridade.precomputar(k)
+    tabela.salvar(caminho)
+    return tabela
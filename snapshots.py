@@ -0,0 +1,136 @@
+"""
+Troca a quente dos dados, índices e modelo do processo, sem reiniciar os workers.
+
+O processo enxerga o snapshot atual (anime.RecursosAnime) por uma única referência. Uma
+recarga monta e aquece o próximo snapshot numa thread enquanto o atual continua servindo
+e só então troca a referência (uma atribuição, atômica). Quem já pegou o snapshot antigo
+(um rerun do Streamlit, uma requisição da API) termina nele; sem mais referências, ele é
+liberado. São dois "buffers": o snapshot em uso e o que está sendo montado.
+"""
+
+import threading
+import time
+import weakref
+
+# Intervalo entre as verificações de dados novos na origem (monitorar)
+INTERVALO_MONITORAMENTO = 30
+
+
+class GerenciadorSnapshots:
+    """
+    construir(): monta um snapshot novo (ex.: anime.construir_recursos)
+    aquecer(novo, atual): materializa no snapshot novo o que a primeira requisição usaria (atual pode ser None)
+    versao_fonte(): versão dos dados na origem agora, comparada com snapshot.versao (None: sem verificação)
+    """
+
+    def __init__(self, construir, aquecer=None, versao_fonte=None):
+        self._construir = construir
+        self._aquecer = aquecer
+        self._versao_fonte = versao_fonte
+        self._atual = None
+        self._lock = threading.Lock()
+        self._lock_recarga = threading.Lock()
+        self._thread = None
+        self._monitor = None
+        self.trocas = 0
+        self.liberados = 0
+        self.erro = None
+
+    def atual(self):
+        """O snapshot atual, construído na primeira chamada. Quem o recebe pode usá-lo até o fim, mesmo após uma troca."""
+        snapshot = self._atual
+        if snapshot is None:
+            with self._lock:
+                if self._atual is None:
+                    self._atual = self._construir()
+                snapshot = self._atual
+        return snapshot
+
+    @property
+    def carregado(self):
+        return self._atual is not None
+
+    @property
+    def recarregando(self):
+        thread = self._thread
+        return thread is not None and thread.is_alive()
+
+    def trocar(self, novo):
+        """Publica `novo` como snapshot atual e retorna o anterior (liberado quando ninguém mais o usar)."""
+        with self._lock:
+            antigo, self._atual = self._atual, novo
+        if antigo is not None and antigo is not novo:
+            self.trocas += 1
+            weakref.finalize(antigo, self._contar_liberado)
+        return antigo
+
+    def _contar_liberado(self):
+        self.liberados += 1
+
+    def recarregar(self, esperar=False):
+        """
+        Monta e aquece o próximo snapshot numa thread e troca ao terminar; se já houver uma
+        recarga em andamento, acompanha a mesma. esperar=True bloqueia até a troca e levanta
+        RuntimeError se a recarga falhou (o snapshot atual continua servindo).
+        """
+        with self._lock_recarga:
+            if not self.recarregando:
+                self._thread = threading.Thread(target=self._recarregar, name="recarga-snapshot", daemon=True)
+                self._thread.start()
+            thread = self._thread
+        if esperar:
+            thread.join()
+            if self.erro is not None:
+                raise RuntimeError(f"Falha ao recarregar os dados: {self.erro}")
+        return thread
+
+    def _recarregar(self):
+        try:
+            novo = self._construir()
+            if self._aquecer is not None:
+                self._aquecer(novo, self._atual)
+            self.trocar(novo)
+            self.erro = None
+        except Exception as e:
+            self.erro = e
+
+    def desatualizado(self):
+        """True se os dados na origem já não são os do snapshot atual."""
+        atual = self._atual
+        if atual is None or self._versao_fonte is None:
+            return False
+        try:
+            return self._versao_fonte() != atual.versao
+        except OSError:
+            # origem ausente ou sendo trocada: fica com o snapshot atual
+            return False
+
+    def verificar(self):
+        """Dispara uma recarga em segundo plano se os dados na origem mudaram. Retorna True se disparou."""
+        if self.recarregando or not self.desatualizado():
+            return False
+        self.recarregar()
+        return True
+
+    def monitorar(self, intervalo=INTERVALO_MONITORAMENTO):
+        """Chama verificar() a cada `intervalo` segundos numa thread (uma por gerenciador)."""
+        with self._lock_recarga:
+            if self._monitor is None:
+                self._monitor = threading.Thread(target=self._monitorar, args=(intervalo,),
+                                                 name="monitor-snapshot", daemon=True)
+                self._monitor.start()
+
+    def _monitorar(self, intervalo):
+        while True:
+            time.sleep(intervalo)
+            self.verificar()
+
+    def estatisticas(self):
+        atual = self._atual
+        return {
+            'versao': getattr(atual, 'versao', None),
+            'trocas': self.trocas,
+            'liberados': self.liberados,
+            'recarregando': self.recarregando,
+            'erro': None if self.erro is None else str(self.erro),
+        }
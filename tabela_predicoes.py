@@ -0,0 +1,93 @@
+"""
+Preditor "compilado": tabela de notas pré-calculadas por combinação de gêneros.
+
+O KNN só enxerga o vetor one-hot de gêneros, então a nota prevista depende apenas da
+combinação. As combinações observadas no catálogo (e, opcionalmente, todas as que têm
+até k gêneros) são previstas uma vez, gravadas em disco e consultadas em O(1) pela
+chave canônica da máscara; as demais continuam indo para o KNN.
+"""
+
+import os
+from itertools import combinations
+
+import numpy as np
+
+from cache_disco import DIRETORIO_CACHE
+from indices import chave_mascara, empacotar_bits
+
+
+def combinacoes_ate_k(n_generos, k):
+    """Matriz booleana com todas as combinações de 1 a k gêneros."""
+    linhas = [c for tamanho in range(1, k + 1) for c in combinations(range(n_generos), tamanho)]
+    matriz = np.zeros((len(linhas), n_generos), dtype=bool)
+    for i, combinacao in enumerate(linhas):
+        matriz[i, list(combinacao)] = True
+    return matriz
+
+
+class TabelaPredicoes:
+    """
+    mascaras: (m, palavras) uint64, uma linha por combinação (ver indices.empacotar_bits)
+    notas: (m,) notas previstas
+    """
+
+    def __init__(self, mascaras, notas):
+        self.mascaras = mascaras
+        self.notas = notas
+        self._posicoes = {chave_mascara(m): i for i, m in enumerate(mascaras)}
+
+    def __len__(self):
+        return len(self.notas)
+
+    def get(self, chave):
+        """Nota prevista para a combinação `chave` (indices.chave_generos), ou None se não foi compilada."""
+        posicao = self._posicoes.get(chave)
+        return None if posicao is None else self.notas[posicao]
+
+    @classmethod
+    def compilar(cls, mascaras_observadas, n_generos, prever_lote, max_generos=0):
+        """
+        mascaras_observadas: máscaras empacotadas das combinações do catálogo (podem repetir)
+        prever_lote: função matriz booleana -> notas (ex.: anime.predict_score_knn_lote)
+        max_generos: inclui também todas as combinações de até `max_generos` gêneros
+        """
+        mascaras = mascaras_observadas
+        if max_generos:
+            mascaras = np.concatenate([mascaras, empacotar_bits(combinacoes_ate_k(n_generos, max_generos))])
+        mascaras = np.unique(mascaras, axis=0)
+        matriz = np.unpackbits(
+            np.ascontiguousarray(mascaras).view(np.uint8).reshape(len(mascaras), -1), axis=1, bitorder='little'
+        )[:, :n_generos].astype(bool)
+        return cls(mascaras, prever_lote(matriz))
+
+    def salvar(self, caminho):
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        tmp = f"{caminho}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, mascaras=self.mascaras, notas=self.notas)
+        os.replace(tmp, caminho)
+
+    @classmethod
+    def carregar(cls, caminho):
+        with np.load(caminho) as arquivo:
+            return cls(arquivo['mascaras'], arquivo['notas'])
+
+
+def caminho_tabela(versao, nome_modelo, max_generos, diretorio_cache=DIRETORIO_CACHE):
+    return os.path.join(diretorio_cache, versao, f"predicoes_{nome_modelo}_k{max_generos}.npz")
+
+
+def obter_tabela(versao, mascaras_observadas, n_generos, prever_lote, nome_modelo, max_generos=0,
+                 diretorio_cache=DIRETORIO_CACHE):
+    """
+    Carrega a tabela gravada para esta versão dos dados/modelo ou a compila e grava.
+    nome_modelo: identifica o modelo (backend, n_neighbors e artefato publicado) no nome do arquivo
+    """
+    caminho = caminho_tabela(versao, nome_modelo, max_generos, diretorio_cache)
+    if os.path.exists(caminho):
+        try:
+            return TabelaPredicoes.carregar(caminho)
+        except (OSError, ValueError, KeyError):
+            pass
+    tabela = TabelaPredicoes.compilar(mascaras_observadas, n_generos, prever_lote, max_generos)
+    tabela.salvar(caminho)
+    return tabela
@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+# os módulos do projeto ficam na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import anime
+from benchmark import gerar_catalogo_sintetico
+
+# ~900 animes: o suficiente para os índices e o KNN, rápido de processar
+FATOR_CATALOGO = 0.05
+
+
+@pytest.fixture(scope="module")
+def recursos(tmp_path_factory):
+    """Recursos de anime.py sobre um anime.csv sintético, publicados como o snapshot do processo."""
+    diretorio = tmp_path_factory.mktemp("catalogo")
+    gerar_catalogo_sintetico(os.path.join(diretorio, "databases", "anime.csv"), fator=FATOR_CATALOGO)
+    diretorio_original = os.getcwd()
+    os.chdir(diretorio)
+    try:
+        recursos = anime.construir_recursos()
+        anime.aquecer_recursos(recursos)
+        anime.snapshots.trocar(recursos)
+        yield recursos
+    finally:
+        anime.snapshots.trocar(None)
+        os.chdir(diretorio_original)
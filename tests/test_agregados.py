@@ -0,0 +1,59 @@
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from agregados import TABELAS, AgregadosDashboard, diferenca_linhas, obter_agregados
+
+
+def catalogo_alterado(df_clean):
+    """df_clean com linhas removidas (inclusive uma combinação inteira), reavaliadas e novas."""
+    combinacao_removida = df_clean['Genres_combination'].value_counts(sort=True)['Genres_combination'][-1]
+    df = df_clean.filter(pl.col('Genres_combination') != combinacao_removida)
+    df = df.with_row_index('i')
+    removidas = pl.col('i') % 29 == 0
+    reavaliadas = pl.col('i') % 17 == 0
+    df = df.filter(~removidas).with_columns(
+        pl.when(reavaliadas).then(pl.col('Score') + 0.37).otherwise(pl.col('Score')).alias('Score'),
+        pl.when(reavaliadas).then(pl.col('Members') + 1000).otherwise(pl.col('Members')).alias('Members'),
+        pl.when(pl.col('i') % 51 == 0).then(None).otherwise(pl.col('Studios')).alias('Studios'),
+    ).drop('i')
+    novas = df_clean.head(25).with_columns(
+        (pl.col('MAL_ID') + df_clean['MAL_ID'].max()).alias('MAL_ID'),
+        pl.col('Genres').list.concat(pl.lit(["Gênero Novo"])),
+        pl.lit("Estúdio Novo").alias('Studios'),
+    ).with_columns(pl.col('Genres').list.sort().list.join(', ').alias('Genres_combination'))
+    return pl.concat([df, novas])
+
+
+def assert_agregados_iguais(obtidos, esperados):
+    for nome, chaves in TABELAS.items():
+        assert_frame_equal(obtidos.tabelas[nome], esperados.tabelas[nome], check_row_order=chaves is None,
+                           check_exact=False, rtol=1e-9)
+    assert obtidos.kpis() == pytest.approx(esperados.kpis())
+
+
+def test_atualizar_igual_a_recalcular(recursos):
+    df_anterior = recursos.df_clean
+    df_atual = catalogo_alterado(df_anterior)
+    adicionadas, removidas = diferenca_linhas(df_anterior, df_atual)
+    # 25 novas, as reavaliadas nas duas, as removidas só em `removidas`
+    assert adicionadas.height > 25 and removidas.height > adicionadas.height - 25
+    incremental = AgregadosDashboard.calcular(df_anterior).atualizar(adicionadas, removidas)
+    assert_agregados_iguais(incremental, AgregadosDashboard.calcular(df_atual))
+    assert "Gênero Novo" in incremental.genero_freq()['Genres'].to_list()
+
+
+def test_atualizar_sem_mudancas(recursos):
+    agregados = AgregadosDashboard.calcular(recursos.df_clean)
+    adicionadas, removidas = diferenca_linhas(recursos.df_clean, recursos.df_clean)
+    assert adicionadas.is_empty() and removidas.is_empty()
+    assert_agregados_iguais(agregados.atualizar(adicionadas, removidas), agregados)
+
+
+def test_obter_agregados_incremental(recursos):
+    df_atual = catalogo_alterado(recursos.df_clean)
+    anteriores = AgregadosDashboard.calcular(recursos.df_clean)
+    agregados = obter_agregados("teste-agregados-incremental", df_atual, anteriores, recursos.df_clean)
+    assert_agregados_iguais(agregados, AgregadosDashboard.calcular(df_atual))
+    # gravados no cache em disco: a próxima leitura nem olha os DataFrames
+    assert_agregados_iguais(obter_agregados("teste-agregados-incremental", None), agregados)
@@ -0,0 +1,78 @@
+import asyncio
+import json
+
+import pytest
+from tornado.testing import AsyncHTTPTestCase
+
+import api
+
+
+@pytest.mark.usefixtures("recursos")
+class TestAPI(AsyncHTTPTestCase):
+    # servidor de criar_aplicacao numa porta efêmera; janela larga para os pedidos concorrentes caírem juntos
+    def get_app(self):
+        return api.criar_aplicacao(janela=0.05)
+
+    def post(self, rota, corpo):
+        return self.fetch(rota, method="POST", body=corpo if isinstance(corpo, str) else json.dumps(corpo),
+                          raise_error=False)
+
+    def estatisticas_lotes(self):
+        return json.loads(self.fetch("/saude").body)['lotes']
+
+    def test_predicoes_concorrentes_saem_em_lotes(self):
+        corpos = [json.dumps({"generos": generos}) for generos in
+                  (["Action"], ["Comedy"], ["Drama"], ["Action", "Comedy"], ["Romance"], ["Sci-Fi"]) * 5]
+
+        async def disparar():
+            return await asyncio.gather(*(
+                self.http_client.fetch(self.get_url("/predicao"), method="POST", body=corpo) for corpo in corpos
+            ))
+
+        respostas = self.io_loop.run_sync(disparar)
+        notas = [json.loads(r.body)['nota'] for r in respostas]
+        assert all(0 <= nota <= 10 for nota in notas)
+        lotes = self.estatisticas_lotes()
+        assert lotes['predicoes'] == len(corpos)
+        assert lotes['lotes'] < lotes['predicoes']
+
+    def test_predicao_por_booleans_igual_a_por_nomes(self):
+        colunas = api.obter_recursos().colunas_features
+        booleans = [coluna in ("Genres_Action", "Genres_Comedy") for coluna in colunas]
+        por_nomes = json.loads(self.post("/predicao", {"generos": ["Action", "Comedy"]}).body)
+        por_booleans = json.loads(self.post("/predicao", {"booleans": booleans}).body)
+        assert por_nomes == por_booleans
+
+    def test_top_e_recomendacoes(self):
+        top = json.loads(self.post("/top", {"generos": ["Action"], "n": 3}).body)['animes']
+        assert len(top) == 3
+        assert all("Action" in anime['Genres_combination'] for anime in top)
+        recomendacoes = json.loads(self.post("/recomendacoes", {"generos": ["Action"], "nota_minima": 7.0}).body)
+        assert all(anime['Score'] >= 7.0 for anime in recomendacoes['animes'])
+
+    def test_pedidos_invalidos_respondem_400(self):
+        invalidos = [
+            ("/predicao", "não é json"),
+            ("/predicao", [1, 2]),
+            ("/predicao", {"generos": ["Gênero Inexistente"]}),
+            ("/predicao", {"booleans": [True]}),
+            ("/top", {"generos": [1, 2]}),
+            ("/top", {"generos": ["Action"], "n": "muitos"}),
+            ("/recomendacoes", {"generos": []}),
+            ("/recomendacoes", {"generos": [["Action"]]}),
+            ("/recomendacoes", {"generos": ["Gênero Inexistente"]}),
+            ("/recomendacoes", {"generos": ["Action"], "nota_minima": "alta"}),
+        ]
+        for rota, corpo in invalidos:
+            with self.subTest(rota=rota, corpo=corpo):
+                resposta = self.post(rota, corpo)
+                assert resposta.code == 400
+                assert json.loads(resposta.body)['erro']
+
+    def test_string_solta_nao_vira_lista_de_letras(self):
+        for rota, corpo in (("/predicao", {"generos": "Action"}), ("/predicao", {"booleans": "Action"}),
+                            ("/top", {"generos": "Action"}), ("/recomendacoes", {"generos": "Action"})):
+            with self.subTest(rota=rota, corpo=corpo):
+                resposta = self.post(rota, corpo)
+                assert resposta.code == 400
+                assert "lista" in json.loads(resposta.body)['erro']
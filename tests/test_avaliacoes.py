@@ -0,0 +1,62 @@
+import math
+import os
+
+import polars as pl
+import pytest
+
+import avaliacoes
+from benchmark import gerar_avaliacoes_sinteticas
+
+# ~29 mil linhas em partições de 5 mil: várias partições, a última incompleta
+FATOR_AVALIACOES = 0.0005
+LINHAS_POR_PARTICAO = 5000
+
+
+@pytest.fixture(scope="module", params=list(avaliacoes.ESQUEMAS_CSV))
+def csv_avaliacoes(request, tmp_path_factory):
+    """(tabela, caminho) de um CSV sintético com o esquema de `tabela`."""
+    caminho = tmp_path_factory.mktemp("avaliacoes") / f"{request.param}.csv"
+    gerar_avaliacoes_sinteticas(str(caminho), request.param, fator=FATOR_AVALIACOES, linhas_por_bloco=7000)
+    return request.param, str(caminho)
+
+
+def esperado(tabela, caminho):
+    """O CSV lido de uma vez com pl.read_csv, nos tipos da ingestão."""
+    df = pl.read_csv(caminho, schema=avaliacoes.ESQUEMAS_CSV[tabela])
+    if tabela == 'animelist':
+        df = df.with_columns(pl.col('watched_episodes').cast(pl.UInt16))
+    return df
+
+
+@pytest.mark.parametrize("formato", avaliacoes.FORMATOS)
+def test_ingestao_igual_a_read_csv(csv_avaliacoes, formato, tmp_path):
+    tabela, caminho = csv_avaliacoes
+    destino = avaliacoes.ingerir_avaliacoes(tabela, caminho, formato, LINHAS_POR_PARTICAO, diretorio_cache=str(tmp_path))
+    df_esperado = esperado(tabela, caminho)
+
+    meta = avaliacoes.meta_avaliacoes(tabela, caminho, formato, diretorio_cache=str(tmp_path))
+    particoes = [arquivo for arquivo in os.listdir(destino) if arquivo.endswith(f".{formato}")]
+    assert meta['linhas'] == df_esperado.height
+    assert meta['particoes'] == len(particoes) == math.ceil(df_esperado.height / LINHAS_POR_PARTICAO)
+
+    df = avaliacoes.carregar_avaliacoes(tabela, caminho, formato, diretorio_cache=str(tmp_path))
+    assert df.schema == df_esperado.schema
+    assert meta['esquema'] == {coluna: str(tipo) for coluna, tipo in df_esperado.schema.items()}
+    assert df.equals(df_esperado)
+    assert avaliacoes.escanear_avaliacoes(tabela, caminho, formato, diretorio_cache=str(tmp_path)).collect().equals(df_esperado)
+
+
+def test_versao_ja_ingerida_nao_reconverte(csv_avaliacoes, tmp_path):
+    tabela, caminho = csv_avaliacoes
+    destino = avaliacoes.ingerir_avaliacoes(tabela, caminho, linhas_por_particao=LINHAS_POR_PARTICAO,
+                                            diretorio_cache=str(tmp_path))
+    meta = os.path.join(destino, avaliacoes.ARQUIVO_META)
+    modificado = os.stat(meta).st_mtime_ns
+    assert avaliacoes.ingerir_avaliacoes(tabela, caminho, diretorio_cache=str(tmp_path)) == destino
+    assert os.stat(meta).st_mtime_ns == modificado
+
+
+def test_formato_desconhecido(csv_avaliacoes, tmp_path):
+    tabela, caminho = csv_avaliacoes
+    with pytest.raises(ValueError):
+        avaliacoes.ingerir_avaliacoes(tabela, caminho, formato='csv', diretorio_cache=str(tmp_path))
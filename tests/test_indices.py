@@ -0,0 +1,67 @@
+import numpy as np
+import polars as pl
+import pytest
+
+from indices import IndiceGeneros, IndiceInvertido
+
+
+def consultas_generos(recursos, quantidade=40, semente=3):
+    """Combinações de 0 a 3 gêneros sorteadas entre as colunas do catálogo, mais as combinações de animes reais."""
+    rng = np.random.default_rng(semente)
+    nomes = [coluna.removeprefix('Genres_') for coluna in recursos.colunas_features]
+    consultas = [[]]
+    consultas += [list(rng.choice(nomes, size=rng.integers(1, 4), replace=False)) for _ in range(quantidade)]
+    consultas += recursos.df_clean['Genres'].head(10).to_list()
+    return consultas
+
+
+def top_por_varredura(df_clean, generos, n):
+    """Referência: combinações exatas e depois as com gêneros extras, por list.contains e Score decrescente."""
+    contem_todos = pl.lit(True)
+    for genero in generos:
+        contem_todos = contem_todos & pl.col('Genres').list.contains(genero)
+    exata = contem_todos & (pl.col('Genres').list.len() == len(generos))
+    ordenar = dict(by='Score', descending=True, maintain_order=True)
+    exatas = df_clean.filter(exata).sort(**ordenar)
+    extras = df_clean.filter(contem_todos & ~exata).sort(**ordenar)
+    return pl.concat([exatas, extras])['MAL_ID'].head(n).to_list()
+
+
+def algum_por_varredura(df_clean, generos, n, min_score):
+    """Referência: pelo menos um dos gêneros (list.contains) e Score >= min_score, por Score decrescente."""
+    contem_algum = pl.lit(False)
+    for genero in generos:
+        contem_algum = contem_algum | pl.col('Genres').list.contains(genero)
+    return (
+        df_clean.filter(contem_algum & (pl.col('Score') >= min_score))
+        .sort('Score', descending=True, maintain_order=True)['MAL_ID'].head(n).to_list()
+    )
+
+
+@pytest.mark.parametrize("n", [1, 10, 50])
+def test_top_igual_a_varredura(recursos, n):
+    indice = IndiceGeneros(recursos.df_para_encontrar, recursos.generos_empacotados)
+    invertido = IndiceInvertido(indice, tamanho_bloco=16)
+    for generos in consultas_generos(recursos):
+        booleans = recursos.visoes.booleans(generos)
+        esperado = top_por_varredura(recursos.df_clean, generos, n)
+        assert indice.top_mal_ids(booleans, n).tolist() == esperado, generos
+        assert invertido.mal_ids[invertido.posicoes_contem_todos(booleans, n)].tolist() == esperado, generos
+
+
+def test_indice_empacotado_igual_ao_das_colunas(recursos):
+    por_bits = IndiceGeneros(recursos.df_para_encontrar, recursos.generos_empacotados)
+    por_colunas = IndiceGeneros(recursos.df_para_encontrar)
+    assert np.array_equal(por_bits.mascaras, por_colunas.mascaras)
+    assert np.array_equal(por_bits.mal_ids, por_colunas.mal_ids)
+
+
+@pytest.mark.parametrize("n, min_score", [(10, None), (10, 7.0), (100, 5.5), (5, 100.0)])
+def test_contem_algum_igual_a_varredura(recursos, n, min_score):
+    invertido = recursos.indice_invertido
+    for generos in consultas_generos(recursos)[1:] + [["Gênero Inexistente"], ["Action", "Gênero Inexistente"]]:
+        posicoes = invertido.posicoes_contem_algum(generos, n, min_score)
+        esperado = algum_por_varredura(recursos.df_clean, generos, n, -np.inf if min_score is None else min_score)
+        assert invertido.mal_ids[posicoes].tolist() == esperado, generos
+        # indice.ordem leva de volta às linhas do DataFrame
+        assert recursos.df_clean['MAL_ID'].to_numpy()[invertido.ordem[posicoes]].tolist() == esperado
@@ -0,0 +1,15 @@
+import logging
+
+import numpy as np
+
+import anime
+
+
+def test_predicao_unica_sem_print_e_igual_ao_lote(recursos, capsys, caplog):
+    booleans = recursos.visoes.booleans(["Action", "Comedy"])
+    with caplog.at_level(logging.DEBUG, logger="anime"):
+        nota = anime.predict_score_knn(booleans, recursos.modelo, recursos.df_para_ml)
+    assert capsys.readouterr().out == ""
+    assert "Genres_Action" in caplog.text
+    lote = anime.predict_score_knn_lote(np.array([booleans]), recursos.modelo, recursos.df_para_ml)
+    assert nota == lote[0]
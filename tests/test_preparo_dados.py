@@ -0,0 +1,147 @@
+import fcntl
+import json
+import os
+import time
+import zipfile
+
+import pytest
+
+import preparo_dados
+from preparo_dados import ETAPAS, FonteArquivoLocal, PreparoDataset
+
+ARQUIVOS = {
+    "anime.csv": b"MAL_ID,Name,Score,Genres\n1,Cowboy Bebop,8.78,\"Action, Sci-Fi\"\n",
+    "rating_complete.csv": b"user_id,anime_id,rating\n" + b"".join(b"%d,1,8\n" % i for i in range(2000)),
+}
+
+
+class PreparoRegistrado(PreparoDataset):
+    """PreparoDataset que guarda cada (etapa, fração) por que passa."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.historico = []
+
+    def _atualizar(self, etapa, fracao=None, mensagem='', erro=None, gravar=True):
+        self.historico.append((etapa, fracao))
+        super()._atualizar(etapa, fracao, mensagem, erro, gravar)
+
+
+def criar_zip(caminho, arquivos=ARQUIVOS):
+    # dentro de uma pasta, como no .zip do Kaggle
+    with zipfile.ZipFile(caminho, "w") as arquivo:
+        for nome, conteudo in arquivos.items():
+            arquivo.writestr(f"dataset/{nome}", conteudo)
+    return str(caminho)
+
+
+def lock_livre(caminho):
+    with open(caminho, "a+") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        fcntl.flock(lock, fcntl.LOCK_UN)
+        return True
+
+
+def esperar_etapa(preparo, etapa, timeout=5):
+    limite = time.monotonic() + timeout
+    while preparo.estado()['etapa'] != etapa:
+        assert time.monotonic() < limite, f"etapa {etapa!r} não chegou: {preparo.estado()}"
+        time.sleep(0.01)
+    return preparo.estado()
+
+
+@pytest.fixture
+def diretorio(tmp_path):
+    return str(tmp_path / "databases")
+
+
+def test_extrai_do_arquivo_local_com_progresso(tmp_path, diretorio, monkeypatch):
+    # blocos pequenos: a extração reporta várias frações
+    monkeypatch.setattr(preparo_dados, "TAMANHO_BLOCO_EXTRACAO", 1024)
+    preprocessados = []
+    preparo = PreparoRegistrado(FonteArquivoLocal(criar_zip(tmp_path / "dataset.zip")), diretorio)
+    assert preparo.estado()['etapa'] == 'inativo'
+
+    estado = preparo.iniciar(ARQUIVOS, preprocessar=lambda: preprocessados.append(True)).aguardar(timeout=10)
+
+    assert estado['etapa'] == 'pronto' and estado['fracao'] == 1.0
+    assert preprocessados == [True]
+    etapas = [etapa for etapa, _ in preparo.historico]
+    assert etapas[0] == 'baixando' and etapas[-2:] == ['preprocessando', 'pronto']
+    assert set(etapas) <= set(ETAPAS)
+    fracoes = [fracao for etapa, fracao in preparo.historico if etapa == 'extraindo']
+    assert len(fracoes) > 2
+    assert fracoes == sorted(fracoes) and fracoes[0] == 0.0 and fracoes[-1] == 1.0
+
+    for nome, conteudo in ARQUIVOS.items():
+        with open(os.path.join(diretorio, nome), "rb") as f:
+            assert f.read() == conteudo
+    assert preparo.faltando(ARQUIVOS) == []
+    # sem temporários do download nem da extração; o lock fica, livre
+    assert sorted(os.listdir(diretorio)) == sorted([*ARQUIVOS, ".preparo.lock", ".preparo.json"])
+    assert lock_livre(preparo.caminho_lock)
+    with open(preparo.caminho_progresso, encoding="utf-8") as f:
+        assert json.load(f)['etapa'] == 'pronto'
+
+
+def test_so_extrai_o_que_falta(tmp_path, diretorio):
+    os.makedirs(diretorio)
+    with open(os.path.join(diretorio, "anime.csv"), "wb") as f:
+        f.write(b"em uso")
+    preparo = PreparoDataset(FonteArquivoLocal(criar_zip(tmp_path / "dataset.zip")), diretorio)
+    preparo.garantir(("anime.csv", "rating_complete.csv"))
+    with open(os.path.join(diretorio, "anime.csv"), "rb") as f:
+        assert f.read() == b"em uso"
+    assert os.path.exists(os.path.join(diretorio, "rating_complete.csv"))
+
+
+def test_aguarda_o_lock_de_outro_processo(tmp_path, diretorio):
+    os.makedirs(diretorio)
+    preparo = PreparoDataset(FonteArquivoLocal(str(tmp_path / "nao-existe.zip")), diretorio)
+    # outro descritor no mesmo arquivo disputa o flock como um outro processo
+    with open(preparo.caminho_lock, "a+") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        with open(preparo.caminho_progresso, "w", encoding="utf-8") as f:
+            json.dump({'etapa': 'extraindo', 'fracao': 0.5}, f)
+        preparo.iniciar()
+        estado = esperar_etapa(preparo, 'aguardando')
+        assert estado['fracao'] == 0.5 and estado['mensagem'] == ETAPAS['extraindo']
+        # chamadas concorrentes acompanham o mesmo preparo
+        assert preparo.iniciar() is preparo and preparo.em_andamento()
+
+        # o "outro processo" deixa o arquivo pronto e solta o lock: nada é baixado
+        with open(os.path.join(diretorio, "anime.csv"), "wb") as f:
+            f.write(ARQUIVOS["anime.csv"])
+        fcntl.flock(lock, fcntl.LOCK_UN)
+        assert preparo.aguardar(timeout=5)['etapa'] == 'pronto'
+    assert lock_livre(preparo.caminho_lock)
+
+
+@pytest.mark.parametrize("conteudo", [None, b"isto n\xe3o \xe9 um zip"])
+def test_arquivo_ausente_ou_corrompido_vira_erro(tmp_path, diretorio, conteudo):
+    caminho = tmp_path / "dataset.zip"
+    if conteudo is not None:
+        caminho.write_bytes(conteudo)
+    preparo = PreparoDataset(FonteArquivoLocal(str(caminho)), diretorio)
+
+    with pytest.raises(RuntimeError, match="Falha ao preparar o dataset"):
+        preparo.iniciar().aguardar(timeout=5)
+    estado = preparo.estado()
+    assert estado['etapa'] == 'erro' and estado['erro']
+    assert not preparo.em_andamento()
+    assert preparo.faltando() == ["anime.csv"]
+    assert [nome for nome in os.listdir(diretorio) if nome.startswith(".download-")] == []
+    assert lock_livre(preparo.caminho_lock)
+
+    # um novo preparo com a fonte corrigida se recupera do erro
+    preparo.fonte = FonteArquivoLocal(criar_zip(caminho))
+    assert preparo.iniciar().aguardar(timeout=5)['etapa'] == 'pronto'
+
+
+def test_garantir_sem_o_arquivo_no_zip(tmp_path, diretorio):
+    caminho = criar_zip(tmp_path / "dataset.zip", {"rating_complete.csv": ARQUIVOS["rating_complete.csv"]})
+    with pytest.raises(FileNotFoundError, match="anime.csv"):
+        PreparoDataset(FonteArquivoLocal(caminho), diretorio).garantir()
@@ -0,0 +1,32 @@
+from streamlit.testing.v1 import AppTest
+
+import anime
+from recomendacoes import fallback_obter_recomendacoes_por_filtros
+
+
+def pagina_resultados_vazios():
+    import polars as pl
+
+    from recomendacoes import mostra_resultados
+
+    vazio = pl.DataFrame({'Name': [], 'Score': [], 'Genres_combination': []})
+    mostra_resultados(vazio, "Baseado nos gêneros: Action", dica="Tente outra combinação de gêneros.")
+
+
+def test_resultado_vazio_mostra_a_dica():
+    app = AppTest.from_function(pagina_resultados_vazios).run()
+    assert not app.exception
+    textos = [elemento.value for elemento in app.markdown]
+    assert any("Nenhum anime encontrado" in texto and "Tente outra combinação de gêneros." in texto
+               for texto in textos)
+    assert not any("{dica}" in texto for texto in textos)
+
+
+def test_fallback_dos_filtros_igual_ao_anime(recursos):
+    # um DataFrame que não é o do snapshot: anime.py também faz a varredura
+    df = recursos.df_clean.clone()
+    for generos, nota in ((["Action"], 6.0), (["Comedy", "Drama"], 7.5), (["Gênero Inexistente"], 0.0)):
+        esperado = anime.obter_recomendacoes_por_filtros(df, generos, nota, 10, recursos=recursos)
+        obtido = fallback_obter_recomendacoes_por_filtros(df, generos, nota, 10)
+        assert obtido.equals(esperado)
+    assert not fallback_obter_recomendacoes_por_filtros(df, ["Action"], 0.0, 10).is_empty()
@@ -0,0 +1,18 @@
+import numpy as np
+import polars as pl
+from sklearn.preprocessing import normalize
+
+from similaridade import PESOS_CONTEUDO, matriz_conteudo
+
+
+def test_bloco_de_generos_igual_ao_one_hot(recursos):
+    # só o bloco de gêneros pesa: a matriz normalizada é o one-hot normalizado
+    pesos = dict.fromkeys(PESOS_CONTEUDO, 0.0) | {'generos': 1.0}
+    matriz, mal_ids = matriz_conteudo(recursos.df_clean, recursos.generos_empacotados, pesos=pesos)
+    one_hot = recursos.df_para_encontrar.sort('MAL_ID')
+    assert np.array_equal(mal_ids, one_hot['MAL_ID'].to_numpy())
+    esperado = normalize(one_hot.select(pl.selectors.starts_with('Genres_')).to_numpy().astype(np.float32))
+    n_generos = len(recursos.colunas_features)
+    assert matriz.dtype == np.float32
+    np.testing.assert_allclose(matriz[:, :n_generos].toarray(), esperado, rtol=1e-6)
+    assert matriz[:, n_generos:].count_nonzero() == 0
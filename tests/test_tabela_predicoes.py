@@ -0,0 +1,28 @@
+import os
+
+import numpy as np
+
+import anime
+import artefatos_modelo
+from tabela_predicoes import caminho_tabela
+
+
+def test_modelo_publicado_depois_compila_outra_tabela(recursos, monkeypatch):
+    tabela = anime.compilar_preditor(recursos)
+    assert recursos.artefato_modelo is not None
+    nome = f"{anime.BACKEND_VIZINHOS}_knn{anime.N_NEIGHBORS}_{recursos.artefato_modelo}"
+    assert os.path.exists(caminho_tabela(recursos.versao, nome, 0))
+
+    # um modelo diferente publicado para os mesmos dados (carimbo posterior ao do primeiro)
+    monkeypatch.setattr(artefatos_modelo.time, "strftime", lambda formato: "29991231-235959")
+    outro = anime.treinar_modelo_knn(recursos.df_para_ml.head(200))
+    artefatos_modelo.publicar_modelo(outro, recursos.versao, recursos.colunas_features, anime.BACKEND_VIZINHOS)
+
+    novos = anime.construir_recursos()
+    tabela_nova = anime.compilar_preditor(novos)
+    assert novos.artefato_modelo.startswith("29991231-235959")
+    matriz = np.unpackbits(tabela_nova.mascaras.view(np.uint8).reshape(len(tabela_nova), -1), axis=1,
+                           bitorder='little')[:, :len(novos.colunas_features)].astype(bool)
+    esperado = anime.predict_score_knn_lote(matriz, novos.modelo, novos.df_para_ml)
+    np.testing.assert_allclose(tabela_nova.notas, esperado)
+    assert not np.allclose(tabela.notas, tabela_nova.notas)
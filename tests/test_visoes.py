@@ -0,0 +1,21 @@
+import polars as pl
+
+from visoes import VisoesDerivadas
+
+
+def test_generos_explodidos_sob_demanda(recursos):
+    visoes = VisoesDerivadas(recursos.df_clean, recursos.colunas_features)
+    assert 'generos_explodidos' not in vars(visoes)
+    explodidos = visoes.generos_explodidos
+    assert explodidos is visoes.generos_explodidos
+    assert explodidos.equals(recursos.df_clean.explode("Genres"))
+    assert explodidos.schema['Genres'] == pl.String
+    assert set(explodidos['Genres'].drop_nulls()) == set(visoes.generos_unicos)
+
+
+def test_booleans_na_ordem_do_modelo(recursos):
+    visoes = recursos.visoes
+    booleans = visoes.booleans(["Action", "Comedy"])
+    assert len(booleans) == len(recursos.colunas_features)
+    assert [coluna for coluna, marcado in zip(recursos.colunas_features, booleans) if marcado] == \
+        sorted(["Genres_Action", "Genres_Comedy"], key=recursos.colunas_features.index)
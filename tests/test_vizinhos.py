@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from sklearn.neighbors import NearestNeighbors
+
+from indices import empacotar_bits
+from vizinhos import RegressorHamming, RegressorLSH, distancias_hamming
+
+K = 5
+
+
+def distancias_exatas(base, consultas, k=K):
+    """Referência: distâncias dos k vizinhos pela força bruta do sklearn (euclidiana² = bits diferentes)."""
+    busca = NearestNeighbors(n_neighbors=k, algorithm='brute').fit(base.astype(np.float64))
+    distancias, _ = busca.kneighbors(consultas.astype(np.float64))
+    return np.rint(distancias ** 2).astype(np.int64)
+
+
+def distancias_retornadas(modelo, base, consultas):
+    """Distâncias devolvidas pelo modelo, conferidas contra os índices que ele devolveu."""
+    distancias, indices = modelo.kneighbors(consultas)
+    reais = (base[indices] != consultas[:, None, :]).sum(axis=2)
+    assert np.array_equal(distancias.astype(np.int64), reais)
+    return np.sort(reais, axis=1)
+
+
+@pytest.fixture(scope="module")
+def generos(recursos):
+    """(GenerosEmpacotados do catálogo, matriz densa, consultas: linhas do catálogo + combinações sorteadas)."""
+    empacotados = recursos.generos_empacotados
+    densa = empacotados.densa()
+    rng = np.random.default_rng(11)
+    consultas = np.concatenate([densa[:200], rng.random((100, densa.shape[1])) < 0.08])
+    return empacotados, densa, consultas
+
+
+@pytest.mark.parametrize("tamanho_bloco, tamanho_faixa", [(256, 16384), (7, 64), (1, 3)])
+def test_hamming_em_faixas_igual_a_forca_bruta(generos, tamanho_bloco, tamanho_faixa):
+    empacotados, densa, consultas = generos
+    modelo = RegressorHamming(K, tamanho_bloco=tamanho_bloco, tamanho_faixa=tamanho_faixa)
+    modelo.fit(empacotados, np.zeros(len(densa)))
+    assert np.array_equal(distancias_retornadas(modelo, densa, consultas), distancias_exatas(densa, consultas))
+
+
+def test_hamming_com_mais_de_uma_palavra():
+    # 150 colunas: três palavras uint64 por linha
+    rng = np.random.default_rng(5)
+    base = rng.random((400, 150)) < 0.3
+    consultas = rng.random((50, 150)) < 0.3
+    assert np.array_equal(distancias_hamming(empacotar_bits(consultas), empacotar_bits(base)),
+                          (consultas[:, None, :] != base[None, :, :]).sum(axis=2))
+    modelo = RegressorHamming(K, tamanho_bloco=16, tamanho_faixa=100).fit(base, np.zeros(len(base)))
+    assert np.array_equal(distancias_retornadas(modelo, base, consultas), distancias_exatas(base, consultas))
+
+
+def test_lsh_perto_da_forca_bruta(generos):
+    empacotados, densa, consultas = generos
+    modelo = RegressorLSH(K).fit(empacotados, np.zeros(len(densa)))
+    obtidas = distancias_retornadas(modelo, densa, consultas)
+    exatas = distancias_exatas(densa, consultas)
+    # aproximado: nunca melhor que o exato, e igual na grande maioria das consultas
+    assert (obtidas >= exatas).all()
+    assert (obtidas == exatas).all(axis=1).mean() >= 0.8
+
+
+@pytest.mark.parametrize("n_tabelas", [2, 8])
+def test_lsh_sem_candidatos_cai_na_forca_bruta(generos, n_tabelas):
+    empacotados, densa, consultas = generos
+    # um candidato por balde e por tabela: com 2 tabelas nenhuma consulta junta K candidatos,
+    # com 8 só parte delas; as que ficam sem K vão para a força bruta
+    modelo = RegressorLSH(K, n_tabelas=n_tabelas, max_candidatos=1).fit(empacotados, np.zeros(len(densa)))
+    incompletas = (modelo._candidatos(empacotar_bits(consultas)) >= 0).sum(axis=1) < K
+    assert incompletas.any()
+    obtidas = distancias_retornadas(modelo, densa, consultas)
+    exatas = distancias_exatas(densa, consultas)
+    assert np.array_equal(obtidas[incompletas], exatas[incompletas])
+    assert (obtidas >= exatas).all()
+
+
+def test_predict_media_dos_vizinhos(generos):
+    empacotados, densa, consultas = generos
+    y = np.random.default_rng(2).random(len(densa))
+    modelo = RegressorHamming(K, tamanho_faixa=64).fit(empacotados, y)
+    indices = modelo.kneighbors(consultas, return_distance=False)
+    np.testing.assert_allclose(modelo.predict(consultas), y[indices].mean(axis=1))
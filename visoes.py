@@ -0,0 +1,52 @@
+"""
+Visões derivadas do catálogo usadas pelas páginas do Streamlit.
+
+São montadas uma vez por versão dos dados (ficam em RecursosAnime, compartilhado por todas
+as sessões) e só no primeiro acesso: uma página que não usa o frame explodido não o monta.
+Quem as recebe não deve alterá-las.
+"""
+
+from functools import cached_property
+
+
+class VisoesDerivadas:
+    """
+    df_clean: catálogo limpo (anime.carregar_dados_anime)
+    colunas_generos: colunas one-hot de gêneros ("Genres_<nome>") na ordem do modelo
+    """
+
+    def __init__(self, df_clean, colunas_generos):
+        self.df_clean = df_clean
+        self.colunas_generos = list(colunas_generos)
+
+    @cached_property
+    def generos_explodidos(self):
+        """df_clean com uma linha por (anime, gênero)."""
+        return self.df_clean.explode("Genres")
+
+    @cached_property
+    def generos_unicos(self):
+        """Gêneros em ordem alfabética (tupla); sai das colunas one-hot, sem explodir o catálogo."""
+        return tuple(sorted(coluna.removeprefix("Genres_") for coluna in self.colunas_generos))
+
+    @cached_property
+    def indice_colunas(self):
+        """Gênero -> posição da coluna correspondente na matriz de gêneros do modelo."""
+        return {coluna.removeprefix("Genres_"): i for i, coluna in enumerate(self.colunas_generos)}
+
+    @cached_property
+    def animes_por_popularidade(self):
+        """MAL_IDs do catálogo, do mais para o menos popular (Members)."""
+        return tuple(self.df_clean.sort('Members', descending=True)['MAL_ID'].to_list())
+
+    @cached_property
+    def nomes_animes(self):
+        """MAL_ID -> Name."""
+        return dict(zip(self.df_clean['MAL_ID'].to_list(), self.df_clean['Name'].to_list()))
+
+    def booleans(self, generos_selecionados):
+        """Lista de booleans na ordem das colunas do modelo, marcando `generos_selecionados`."""
+        booleans = [False] * len(self.colunas_generos)
+        for genero in generos_selecionados:
+            booleans[self.indice_colunas[genero]] = True
+        return booleans
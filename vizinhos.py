@@ -0,0 +1,200 @@
+"""
+Backends de vizinhos mais próximos para o preditor de notas.
+
+Os vetores de entrada são flags 0/1 de gênero, então a distância de Hamming (bits
+diferentes) ordena os vizinhos como a euclidiana do KNeighborsRegressor padrão, mas pode
+ser calculada com XOR + popcount sobre linhas empacotadas em uint64.
+
+O treino recebe os gêneros como indices.GenerosEmpacotados e cada backend os consome no
+formato que aceita (entrada_regressor): o "sklearn" guarda uma CSR esparsa, "hamming" e
+"lsh" usam direto os bits; só o "arvore" (BallTree) precisa da matriz densa.
+
+Backends (ver criar_regressor):
+- "sklearn": KNeighborsRegressor com as configurações padrão (comportamento original)
+- "hamming": força bruta exata sobre bits empacotados
+- "arvore": KNeighborsRegressor com BallTree e métrica de Hamming
+- "lsh": aproximado, LSH por amostragem de bits + Hamming exato nos candidatos
+"""
+
+import numpy as np
+from sklearn.neighbors import KNeighborsRegressor
+
+from indices import GenerosEmpacotados, coluna_bits, empacotar_bits
+
+BACKENDS = ("sklearn", "hamming", "arvore", "lsh")
+
+
+def distancias_hamming(consultas, base):
+    """Matriz (len(consultas), len(base)) de bits diferentes entre linhas empacotadas (uint64)."""
+    # com uma palavra (até 64 gêneros) a contagem cabe em uint8 e dispensa o acumulador
+    distancias = np.bitwise_count(consultas[:, 0, None] ^ base[None, :, 0])
+    if base.shape[1] > 1:
+        distancias = distancias.astype(np.uint16)
+        for palavra in range(1, base.shape[1]):
+            distancias += np.bitwise_count(consultas[:, palavra, None] ^ base[None, :, palavra])
+    return distancias
+
+
+def _bits(X):
+    """Linhas empacotadas de X (GenerosEmpacotados ou matriz booleana) e o número de colunas."""
+    if isinstance(X, GenerosEmpacotados):
+        return X.bits, X.shape[1]
+    X = np.atleast_2d(np.asarray(X, dtype=bool))
+    return empacotar_bits(X), X.shape[1]
+
+
+class RegressorHamming:
+    """
+    KNN exato por força bruta com distância de Hamming sobre bits empacotados.
+    As consultas vão em blocos de `tamanho_bloco` e a base em faixas de `tamanho_faixa`
+    linhas, mantendo os k melhores de cada consulta entre as faixas: a memória temporária
+    é de tamanho_bloco x tamanho_faixa, não importa o tamanho do catálogo.
+    """
+
+    def __init__(self, n_neighbors=5, tamanho_bloco=256, tamanho_faixa=16384):
+        self.n_neighbors = n_neighbors
+        self.tamanho_bloco = tamanho_bloco
+        self.tamanho_faixa = tamanho_faixa
+
+    def fit(self, X, y):
+        self.bits_, self.n_colunas_ = _bits(X)
+        self.y_ = np.asarray(y, dtype=np.float64)
+        return self
+
+    def _vizinhos_bloco(self, consultas):
+        k = min(self.n_neighbors, len(self.bits_))
+        faixa = max(self.tamanho_faixa, k)
+        melhores_d = melhores_i = None
+        for inicio in range(0, len(self.bits_), faixa):
+            distancias = distancias_hamming(consultas, self.bits_[inicio:inicio + faixa]).astype(np.uint16)
+            kf = min(k, distancias.shape[1])
+            indices = np.argpartition(distancias, kf - 1, axis=1)[:, :kf]
+            distancias = np.take_along_axis(distancias, indices, axis=1)
+            indices += inicio
+            if melhores_d is not None:
+                # os k melhores até aqui disputam com os k melhores desta faixa
+                distancias = np.concatenate([melhores_d, distancias], axis=1)
+                indices = np.concatenate([melhores_i, indices], axis=1)
+                selecionados = np.argpartition(distancias, k - 1, axis=1)[:, :k]
+                distancias = np.take_along_axis(distancias, selecionados, axis=1)
+                indices = np.take_along_axis(indices, selecionados, axis=1)
+            melhores_d, melhores_i = distancias, indices
+        return melhores_d, melhores_i
+
+    def kneighbors(self, X, return_distance=True):
+        consultas, _ = _bits(X)
+        partes = [self._vizinhos_bloco(consultas[i:i + self.tamanho_bloco])
+                  for i in range(0, len(consultas), self.tamanho_bloco)]
+        distancias = np.concatenate([d for d, _ in partes])
+        indices = np.concatenate([i for _, i in partes])
+        return (distancias, indices) if return_distance else indices
+
+    def predict(self, X):
+        return self.y_[self.kneighbors(X, return_distance=False)].mean(axis=1)
+
+
+class RegressorLSH(RegressorHamming):
+    """
+    KNN aproximado: `n_tabelas` tabelas de hash, cada uma com `bits_por_tabela` posições
+    sorteadas; os candidatos de uma consulta são as linhas que caem no mesmo balde em alguma
+    tabela (até `max_candidatos` por balde). Sem candidatos suficientes, cai na força bruta.
+    """
+
+    def __init__(self, n_neighbors=5, n_tabelas=8, bits_por_tabela=10, max_candidatos=256, semente=42):
+        super().__init__(n_neighbors)
+        self.n_tabelas = n_tabelas
+        self.bits_por_tabela = bits_por_tabela
+        self.max_candidatos = max_candidatos
+        self.semente = semente
+
+    def _chaves(self, bits, posicoes):
+        # o bit posicoes[i] de cada linha vai para o bit i da chave
+        chaves = np.zeros(len(bits), dtype=np.int64)
+        for i, posicao in enumerate(posicoes):
+            chaves |= coluna_bits(bits, posicao).astype(np.int64) << i
+        return chaves
+
+    def fit(self, X, y):
+        super().fit(X, y)
+        rng = np.random.default_rng(self.semente)
+        # embaralha as linhas para que o corte de max_candidatos não favoreça a ordem do DataFrame
+        permutacao = rng.permutation(len(self.bits_))
+        self.tabelas_ = []
+        for _ in range(self.n_tabelas):
+            posicoes = rng.choice(self.n_colunas_, size=min(self.bits_por_tabela, self.n_colunas_), replace=False)
+            chaves = self._chaves(self.bits_[permutacao], posicoes)
+            ordem = np.argsort(chaves, kind='stable')
+            self.tabelas_.append((posicoes, chaves[ordem], permutacao[ordem]))
+        return self
+
+    def _candidatos(self, consultas):
+        """
+        Matriz (len(consultas), n_tabelas * max_candidatos) com as linhas que caem no mesmo
+        balde de cada consulta, em ordem crescente; posições vazias ou repetidas valem -1.
+        """
+        passos = np.arange(self.max_candidatos)
+        faixas = []
+        for posicoes, chaves, linhas in self.tabelas_:
+            chaves_consulta = self._chaves(consultas, posicoes)
+            inicio = np.searchsorted(chaves, chaves_consulta, side='left')
+            fim = np.minimum(np.searchsorted(chaves, chaves_consulta, side='right'), inicio + self.max_candidatos)
+            posicoes_balde = inicio[:, None] + passos
+            faixas.append(np.where(posicoes_balde < fim[:, None],
+                                   linhas[np.minimum(posicoes_balde, len(linhas) - 1)], -1))
+        candidatos = np.sort(np.concatenate(faixas, axis=1), axis=1)
+        # a mesma linha vinda de tabelas diferentes conta uma vez só
+        candidatos[:, 1:][candidatos[:, 1:] == candidatos[:, :-1]] = -1
+        return candidatos
+
+    def _vizinhos_lsh(self, consultas):
+        k = min(self.n_neighbors, len(self.y_))
+        candidatos = self._candidatos(consultas)
+        if candidatos.shape[1] < k:
+            # nem cabem k candidatos por consulta (n_tabelas * max_candidatos < k): força bruta
+            return self._vizinhos_bloco(consultas)
+        validos = candidatos >= 0
+        distancias = np.bitwise_count(consultas[:, None, :] ^ self.bits_[candidatos]).sum(axis=2, dtype=np.uint16)
+        distancias[~validos] = np.iinfo(np.uint16).max
+        melhores = np.argpartition(distancias, k - 1, axis=1)[:, :k]
+        indices = np.take_along_axis(candidatos, melhores, axis=1)
+        distancias = np.take_along_axis(distancias, melhores, axis=1)
+        # sem candidatos suficientes: força bruta
+        incompletas = validos.sum(axis=1) < k
+        if incompletas.any():
+            distancias[incompletas], indices[incompletas] = self._vizinhos_bloco(consultas[incompletas])
+        return distancias, indices
+
+    def kneighbors(self, X, return_distance=True):
+        consultas, _ = _bits(X)
+        partes = [self._vizinhos_lsh(consultas[i:i + self.tamanho_bloco])
+                  for i in range(0, len(consultas), self.tamanho_bloco)]
+        distancias = np.concatenate([d for d, _ in partes])
+        indices = np.concatenate([i for _, i in partes])
+        return (distancias, indices) if return_distance else indices
+
+
+def criar_regressor(backend="sklearn", n_neighbors=5):
+    """Cria o regressor de vizinhos do backend escolhido (ver BACKENDS)."""
+    if backend == "sklearn":
+        return KNeighborsRegressor(n_neighbors=n_neighbors)
+    if backend == "hamming":
+        return RegressorHamming(n_neighbors=n_neighbors)
+    if backend == "arvore":
+        return KNeighborsRegressor(n_neighbors=n_neighbors, algorithm='ball_tree', metric='hamming')
+    if backend == "lsh":
+        return RegressorLSH(n_neighbors=n_neighbors)
+    raise ValueError(f"Backend de vizinhos desconhecido: {backend!r} (opções: {', '.join(BACKENDS)})")
+
+
+def entrada_regressor(backend, generos, consultas=False):
+    """
+    GenerosEmpacotados no formato que o regressor de `backend` recebe em fit (consultas=False)
+    ou em predict/kneighbors (consultas=True).
+    """
+    if backend == "sklearn":
+        # treinado com CSR, o KNeighborsRegressor guarda a matriz esparsa e usa força bruta;
+        # os lotes de consulta densos (float32) saem bem mais rápidos que CSR x CSR
+        return generos.densa().astype(np.float32) if consultas else generos.csr()
+    if backend == "arvore":
+        return generos.densa()
+    return generos